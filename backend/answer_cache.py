@@ -0,0 +1,195 @@
+"""
+Answer cache for retrieval turns: identical product questions reuse an earlier answer instead of
+calling the answer LLM again.
+
+An entry is keyed on the normalized condensed question, the turn's resolved entities (part,
+model, order), the namespace and the IDs of the retrieved documents, in retrieval order. With
+ANSWER_CACHE_SIMILARITY > 0, a question that misses the exact key can still hit an entry with the
+same entities/namespace/documents whose question embedding has at least that cosine similarity
+("how do I install PS2375646" vs "how to install PS2375646?").
+
+Entries expire after ANSWER_CACHE_TTL seconds, and the least recently used go once there are
+more than ANSWER_CACHE_MAX_ENTRIES. Each entry also stores a fingerprint of the retrieved
+documents' content: a lookup retrieves fresh documents, so when ingestion changed their text or
+metadata the fingerprint no longer matches and the stale answer is dropped.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "10000"))
+# 0 = exact key matches only
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))
+
+PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(PUNCT_RE.sub(" ", question.casefold()).split())
+
+
+def document_id(doc) -> str:
+    metadata = doc.metadata or {}
+    return (doc.id or metadata.get("part_number_norm") or metadata.get("order_id_norm")
+            or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest())
+
+
+def fingerprint(docs) -> str:
+    """Hash of the retrieved documents' text and metadata."""
+    h = hashlib.sha1()
+    for doc in docs:
+        h.update(doc.page_content.encode("utf-8"))
+        h.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class _Entry:
+    __slots__ = ("answer", "fingerprint", "expires", "context", "embedding")
+
+    def __init__(self, answer, fingerprint, expires, context, embedding):
+        self.answer = answer
+        self.fingerprint = fingerprint
+        self.expires = expires
+        self.context = context
+        self.embedding = embedding
+
+
+class AnswerCache:
+    def __init__(self, ttl_seconds: float | None = ANSWER_CACHE_TTL, max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 similarity: float = ANSWER_CACHE_SIMILARITY, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict()
+        # (entities, namespace, doc ids) -> keys of the entries with that context, for similarity lookups
+        self._by_context: dict = {}
+        self._lock = threading.Lock()
+        self.hits = {"exact": 0, "similar": 0}
+        self.misses = 0
+        self.evictions = {"ttl": 0, "lru": 0, "stale": 0}
+
+    @staticmethod
+    def context(entities, namespace: str, docs) -> tuple:
+        return tuple(entities), namespace, tuple(document_id(doc) for doc in docs)
+
+    @classmethod
+    def key(cls, question: str, entities, namespace: str, docs) -> tuple:
+        return normalize_question(question), cls.context(entities, namespace, docs)
+
+    def _drop(self, key, reason: str | None = None):
+        entry = self._entries.pop(key)
+        keys = self._by_context.get(entry.context)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_context[entry.context]
+        if reason:
+            self.evictions[reason] += 1
+
+    def _valid(self, key, entry, docs_fingerprint, now) -> bool:
+        if entry.expires is not None and entry.expires <= now:
+            self._drop(key, "ttl")
+            return False
+        if entry.fingerprint != docs_fingerprint:
+            self._drop(key, "stale")
+            return False
+        return True
+
+    def _similar(self, context, embedding, docs_fingerprint, now):
+        best, best_score = None, self.similarity
+        for key in list(self._by_context.get(context, ())):
+            entry = self._entries[key]
+            if entry.embedding is None or not self._valid(key, entry, docs_fingerprint, now):
+                continue
+            score = float(np.dot(entry.embedding, embedding))
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    @staticmethod
+    def _unit(embedding):
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        length = np.linalg.norm(vector)
+        return vector / length if length else vector
+
+    def get(self, question: str, entities, namespace: str, docs, embedding=None):
+        """Cached answer for the turn, or None. `embedding` is the question's, for similarity lookups."""
+        key = self.key(question, entities, namespace, docs)
+        context = key[1]
+        docs_fingerprint = fingerprint(docs)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._valid(key, entry, docs_fingerprint, now):
+                self._entries.move_to_end(key)
+                self.hits["exact"] += 1
+                return entry.answer
+            if self.similarity and embedding is not None:
+                match = self._similar(context, self._unit(embedding), docs_fingerprint, now)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self.hits["similar"] += 1
+                    return self._entries[match].answer
+            self.misses += 1
+            return None
+
+    def put(self, question: str, entities, namespace: str, docs, answer: str, embedding=None):
+        if not answer:
+            return
+        key = self.key(question, entities, namespace, docs)
+        context = key[1]
+        now = self._clock()
+        expires = now + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(answer, fingerprint(docs), expires, context, self._unit(embedding))
+            self._by_context.setdefault(context, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)), "lru")
+
+    def clear(self) -> int:
+        with self._lock:
+            n = len(self._entries)
+            self._entries.clear()
+            self._by_context.clear()
+            return n
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        hits = sum(self.hits.values())
+        lookups = hits + self.misses
+        return {"entries": len(self._entries), "hits": dict(self.hits), "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else None, "evictions": dict(self.evictions),
+                "ttl_seconds": self.ttl_seconds, "max_entries": self.max_entries, "similarity": self.similarity}
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    global _answer_cache
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = AnswerCache()
+    return _answer_cache
+
+
+def set_answer_cache(cache: AnswerCache | None):
+    global _answer_cache
+    with _answer_cache_lock:
+        _answer_cache = cache
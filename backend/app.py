@@ -1,21 +1,45 @@
 from fastapi import FastAPI
-from langchain.memory import ConversationBufferMemory
 from pydantic import BaseModel
-from backend.core import build_chain, transactions_search_order
+from backend.core import build_chain, atransactions_search_order
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import uuid
 import json
+import logging
 import os
+from contextlib import asynccontextmanager
 from langchain.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
-from fastapi.responses import JSONResponse
-from pinecone import Pinecone
-from langchain_openai import OpenAIEmbeddings
-from typing import Dict, Optional
-from backend.utils import norm, resolve_entities, route_intent, static_policies #get_order_status, cancel_order, initiate_return, route_intent, format_order_answer
-
-app = FastAPI(title="PartSelect Chat Agent")
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from backend.answer_cache import get_answer_cache
+from backend.bm25_index import get_bm25_index
+from backend.compat_index import get_compat_index
+from backend.intent_classifier import get_intent_router
+from backend.metrics import current_trace, get_metrics
+from backend.order_store import get_order_store
+from backend.part_catalog import get_part_catalog
+from backend.resources import INDEX_NAME, get_resources
+from backend.session_store import get_session_store
+from backend.single_flight import get_single_flight
+from backend.utils import extract, extract_model_number, norm, resolve_entities, standalone_question, static_policies #get_order_status, cancel_order, initiate_return, route_intent, format_order_answer
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the shared clients and prompts once, before the first request comes in
+    get_resources().warm()
+    get_order_store()
+    get_compat_index()
+    get_part_catalog()
+    if RETRIEVAL_MODE != "vector":
+        get_bm25_index()
+    get_intent_router().warm()
+    yield
+
+app = FastAPI(title="PartSelect Chat Agent", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,8 +53,24 @@ app.add_middleware(
 def read_root():
     return {"message": "PartSelect Chat Agent Backend Running!"}
 
-chat_sessions: Dict[str, any] = dict()
-chat_memories: Dict[str, ConversationBufferMemory] = dict()
+# Upper bound on chat turns waiting on the LLM/vector services at once; turns beyond it queue
+# here instead of piling more requests onto the upstream APIs.
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "64"))
+upstream_slots = asyncio.Semaphore(CHAT_MAX_CONCURRENCY)
+# Set CONDENSE_FAST_PATH=0 to always let the LLM condense follow-up questions
+CONDENSE_FAST_PATH = os.getenv("CONDENSE_FAST_PATH", "1") == "1"
+# Set COMPAT_FAST_PATH=0 to send compatibility questions through retrieval + LLM as well
+COMPAT_FAST_PATH = os.getenv("COMPAT_FAST_PATH", "1") == "1"
+# Set PART_CATALOG_FAST_PATH=0 to look named parts up through the vector store instead of the catalog
+PART_CATALOG_FAST_PATH = os.getenv("PART_CATALOG_FAST_PATH", "1") == "1"
+# Products retrieval: "hybrid" (vector + BM25, fused), "lexical" (BM25 only) or "vector"
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Token budget for the retrieved documents in the answer prompt, after near-duplicates are
+# collapsed (backend/context_packer.py); 0 renders every retrieved document in full
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+# Set ANSWER_CACHE=0 to always call the answer LLM; ANSWER_CACHE_NAMESPACES lists where answers are reused
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "1") == "1"
+ANSWER_CACHE_NAMESPACES = set(os.getenv("ANSWER_CACHE_NAMESPACES", "products").split(","))
 
 class ChatRequest(BaseModel):
     session_id: Optional[str] = None
@@ -40,178 +80,287 @@ class ChatResponse(BaseModel):
     session_id: str
     answer: str
 
-## Creating the endpoints
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    print("entered chatpoint")
-    try:
-        # print("try first")
-        session_id = request.session_id or str(uuid.uuid4())
-        message = request.message
-
-        print(f"Received question: {message}")
-
-        # ======ENTITY EXTRACTION AND INTENT========
-        # part_number = extract_part_number(message)
-        # model_number = extract_model_number(message)
-        part_number, model_number, order_id, ctx = resolve_entities(session_id, message)
-        # print("@@@@@@The session is this:", ctx)
-        # Reuse session context for follow-ups if the current turn has no explicit entities
-        if not order_id and ctx and ctx.get("active_order"):
-            order_id = ctx["active_order"]
-        if not part_number and ctx and ctx.get("active_part"):
-            part_number = ctx["active_part"]
-        if not model_number and ctx and ctx.get("active_model"):
-            model_number = ctx["active_model"]
-
-        # print("====++++&&&===this is our entities=======++++&&&", part_number, model_number, order_id)
-
-
-        user_intent = route_intent(message, session_id)
-
-        # ======Metadata filter===========
-        
-        ## Building namespaces
-        metadata_filter = {}
-        if user_intent == "products":
-            namespace = "products"
-            if part_number:
-                metadata_filter["part_number_norm"] = {"$eq": norm(part_number)}
-            # elif manufacturer_part_number:
-            #     metadata_filter["manufacturer_part_number_norm"] = {"$eq": norm(manufacturer_part_number)}
-            elif model_number:
-                metadata_filter["compatible_models_norm"] = {"$in": [norm(model_number)]}
-
-        elif user_intent == "transactions_policy":
-            namespace = "transactions"
-            policies = static_policies()
-            for key, value in policies.items():
-                if key in message.lower():
-                    return ChatResponse(session_id=session_id, answer=value)
-
-        elif user_intent == "transactions_order":
-            order_id = order_id or (ctx.get("active_order") if ctx else None)
-            if not order_id:
-                return ChatResponse(session_id=session_id, answer="I might need an Order number here. To help with your order, please provide your Order ID (e.g., PSO1234).")
-            msg = message.lower()
-            if any(k in msg for k in ["status", "track", "tracking"]):
-                # Use Pinecone for status
-                meta = transactions_search_order(order_id)
-                if meta:
-                    status = meta.get("status", "unknown")
-                    carrier = meta.get("carrier", "the carrier")
-                    city = meta.get("address_city", "your address")
-                    return ChatResponse(session_id=session_id, answer=f"Your order {order_id} is currently {status} with {carrier}, shipping to {city}.")
-                else:
-                    return ChatResponse(session_id=session_id, answer="Order not found.")
-                
-            elif "cancel" in msg:
-                meta = transactions_search_order(order_id)
-                if meta and meta.get("status") == "order_placed":
-                    return ChatResponse(session_id=session_id, answer=f"Order {order_id} cancellation request submitted.")
-                elif meta:
-                    return ChatResponse(session_id=session_id, answer=f"Order {order_id} cannot be cancelled because status is '{meta.get('status')}'.")
-                else:
-                    return ChatResponse(session_id=session_id, answer="Order not found.")
-                
-            elif any(k in msg for k in ["return", "refund", "exchange"]):
-                meta = transactions_search_order(order_id)
-                if meta:
-                    return ChatResponse(session_id=session_id, answer=f"Return initiated for order {order_id}.")
-                else:
-                    return ChatResponse(session_id=session_id, answer="Order not found.")
-
-            ## For all other queries, tool calling is not sufficient hence we use an LLM
-            meta = transactions_search_order(order_id)
-            if not meta:
-                return ChatResponse(session_id=session_id, answer="Order not found.")
+@dataclass
+class TurnPlan:
+    """
+    What a chat turn needs to produce its answer: either a ready templated `answer`,
+    an `order_prompt` for the order LLM, or the session `chain` for retrieval QA.
+    """
+    session_id: str
+    message: str
+    answer: Optional[str] = None
+    order_prompt: Optional[str] = None
+    chain: Optional[Any] = None
+    standalone: Optional[str] = None
+    namespace: Optional[str] = None
+    entities: tuple = ()
+
+
+ORDER_SYSTEM_PROMPT = "You are a helpful assistant for order queries. Use the provided order metadata to answer the user's question as accurately as possible. If a field is missing, say so without mentioning words like 'metadata' & 'database'. Also, if asked about 'how many orders are there in your database', your output should be 'I am sorry, due to confidentiality, I cannot provide you with that information. Please tell me if you have any specific order ID or Part number that I can look up.'"
+
+
+def chain_inputs(plan: TurnPlan) -> dict:
+    inputs = {"question": plan.message}
+    if plan.standalone:
+        inputs["standalone_question"] = plan.standalone
+    return inputs
+
+
+async def plan_turn(session_id: str, message: str) -> TurnPlan:
+    """Entity resolution, intent routing, tool answers and chain lookup shared by /chat and /chat/stream."""
+    # ======ENTITY EXTRACTION AND INTENT========
+    # part_number = extract_part_number(message)
+    # model_number = extract_model_number(message)
+    metrics = get_metrics()
+    # Loaded up front, off the event loop when a session backend has to be read
+    state = await get_session_store().aget_or_create(session_id)
+    with metrics.span("entities"):
+        extraction = extract(message)
+        if extraction.model and (extraction.part or extraction.order):
+            # "Is PS11752968 compatible with WDT780SAEM1?": the part number is not the model
+            extraction.model = extract_model_number(message, exclude=(extraction.part, extraction.order))
+        part_number, model_number, order_id, ctx = resolve_entities(session_id, message, extraction, state)
+    # Reuse session context for follow-ups if the current turn has no explicit entities
+    if not order_id and ctx and ctx.get("active_order"):
+        order_id = ctx["active_order"]
+    if not part_number and ctx and ctx.get("active_part"):
+        part_number = ctx["active_part"]
+    if not model_number and ctx and ctx.get("active_model"):
+        model_number = ctx["active_model"]
+
+    # Local classifier; the LLM only decides the turns it is unsure about (INTENT_ROUTER=keywords for route_intent)
+    with metrics.span("intent"):
+        user_intent = await get_intent_router().aroute(message, session_id, extraction, ctx)
+    trace = current_trace()
+    if trace is not None:
+        trace.intent = user_intent
+
+    # ======Metadata filter===========
+    
+    ## Building namespaces
+    metadata_filter = {}
+    if user_intent == "products":
+        namespace = "products"
+        # Yes/no compatibility and "what fits my model" come straight from the inverted index
+        if COMPAT_FAST_PATH:
+            answer = get_compat_index().answer(message, part_number, model_number)
+            if answer:
+                return TurnPlan(session_id, message, answer=answer)
+        manufacturer_part_number = None
+        if not part_number and PART_CATALOG_FAST_PATH:
+            manufacturer_part_number = get_part_catalog().find_manufacturer_part_number(message)
+        if part_number:
+            metadata_filter["part_number_norm"] = {"$eq": norm(part_number)}
+        elif manufacturer_part_number:
+            metadata_filter["manufacturer_part_number_norm"] = {"$eq": norm(manufacturer_part_number)}
+        elif model_number:
+            metadata_filter["compatible_models_norm"] = {"$in": [norm(model_number)]}
+
+    elif user_intent == "transactions_policy":
+        namespace = "transactions"
+        policies = static_policies()
+        for key, value in policies.items():
+            if key in message.lower():
+                return TurnPlan(session_id, message, answer=value)
+
+    elif user_intent == "transactions_order":
+        order_id = order_id or (ctx.get("active_order") if ctx else None)
+        if not order_id:
+            return TurnPlan(session_id, message, answer="I might need an Order number here. To help with your order, please provide your Order ID (e.g., PSO1234).")
+        msg = message.lower()
+        if any(k in msg for k in ["status", "track", "tracking"]):
+            # Use Pinecone for status
+            meta = await atransactions_search_order(order_id)
+            if meta:
+                status = meta.get("status", "unknown")
+                carrier = meta.get("carrier", "the carrier")
+                city = meta.get("address_city", "your address")
+                return TurnPlan(session_id, message, answer=f"Your order {order_id} is currently {status} with {carrier}, shipping to {city}.")
+            else:
+                return TurnPlan(session_id, message, answer="Order not found.")
             
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", "You are a helpful assistant for order queries. Use the provided order metadata to answer the user's question as accurately as possible. If a field is missing, say so without mentioning words like 'metadata' & 'database'. Also, if asked about 'how many orders are there in your database', your output should be 'I am sorry, due to confidentiality, I cannot provide you with that information. Please tell me if you have any specific order ID or Part number that I can look up.'"),
-                ("user", "User question: {question}\nOrder metadata: {metadata}")
-            ])
-
-            llm = ChatOpenAI(model="gpt-4", temperature=0.2)
-            answer = llm.invoke(prompt.format_prompt(question=message, metadata=meta).to_string()).content
-            return ChatResponse(session_id=session_id, answer=answer)
+        elif "cancel" in msg:
+            meta = await atransactions_search_order(order_id)
+            if meta and meta.get("status") == "order_placed":
+                return TurnPlan(session_id, message, answer=f"Order {order_id} cancellation request submitted.")
+            elif meta:
+                return TurnPlan(session_id, message, answer=f"Order {order_id} cannot be cancelled because status is '{meta.get('status')}'.")
+            else:
+                return TurnPlan(session_id, message, answer="Order not found.")
+            
+        elif any(k in msg for k in ["return", "refund", "exchange"]):
+            meta = await atransactions_search_order(order_id)
+            if meta:
+                return TurnPlan(session_id, message, answer=f"Return initiated for order {order_id}.")
+            else:
+                return TurnPlan(session_id, message, answer="Order not found.")
+
+        ## For all other queries, tool calling is not sufficient hence we use an LLM
+        meta = await atransactions_search_order(order_id)
+        if not meta:
+            return TurnPlan(session_id, message, answer="Order not found.")
         
-
-        print("====++++&&&===this is our metadata filters=======++++&&&", metadata_filter)
-
-        ## session ID check
-        if session_id not in chat_sessions:
-            chat_sessions[session_id] = {}
-            print("^^^^ New session^^^^^")
-            if namespace not in chat_sessions[session_id]:
-                memory_new = ConversationBufferMemory(
-                    memory_key="chat_history",
-                    return_messages=True,
-                    output_key="answer"
-                )
-                chat_memories[session_id] = memory_new
-                chat_sessions[session_id][namespace] = build_chain(memory=memory_new, filter=metadata_filter, namespace=namespace)  
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", ORDER_SYSTEM_PROMPT),
+            ("user", "User question: {question}\nOrder metadata: {metadata}")
+        ])
+        return TurnPlan(session_id, message, order_prompt=prompt.format_prompt(question=message, metadata=meta).to_string())
+    
+
+    if trace is not None:
+        trace.details["filter"] = metadata_filter
+
+    ## session ID check
+    with metrics.span("chain"):
+        if namespace not in state.chains:
+            catalog = get_part_catalog() if PART_CATALOG_FAST_PATH else None
+            lexical = get_bm25_index() if RETRIEVAL_MODE != "vector" else None
+            state.chains[namespace] = build_chain(memory=state.memory, filter=metadata_filter, namespace=namespace,
+                                                  catalog=catalog, lexical=lexical, mode=RETRIEVAL_MODE,
+                                                  context_budget=CONTEXT_TOKEN_BUDGET)
         else:
-            chain = chat_sessions[session_id][namespace]
+            chain = state.chains[namespace]
             chain.retriever.search_kwargs.update({
                                                     "namespace": namespace,
                                                     "k": 10,
                                                     "filter": metadata_filter or {}
         })
-        
+
         # Building the chain
-        chain = chat_sessions[session_id][namespace]
-
-
-        # ==========================================================================================
-        ## Debugging
-        # probe_docs = chain.retriever.get_relevant_documents(message)
-        # print(f"[probe] docs returned: {len(probe_docs)}")
-        # for i, d in enumerate(probe_docs[:3]):
-        #     print(f"[probe] {i} meta keys:", list(d.metadata.keys()))
-        #     print(f"[probe] {i} part_number_norm:", d.metadata.get("part_number_norm"))
-        #     print(f"[probe] {i} order_id_norm:", d.metadata.get("order_id_norm"))
-
-        # # If nothing comes back, optionally relax filter or try a simpler query
-        # if not probe_docs:
-        #     # Try a neutral probe with same filter
-        #     try:
-        #         vs = chain.retriever.vectorstore
-        #         probe2 = vs.similarity_search(
-        #             "installation", k=5, filter=metadata_filter
-        #         )
-        #         print(f"[probe2] docs with neutral query: {len(probe2)}")
-        #         for i, d in enumerate(probe2[:3]):
-        #             print(f"[probe2] {i} part_number_norm:", d.metadata.get("part_number_norm"))
-        #     except Exception as ex:
-        #         print("[probe2] vectorstore check failed:", ex)
-
-        # ==========================================================================================
-
-
-        ## Here we get the response
-        response = chain.invoke({"question": message})
-        # response = chain({"question": message})
-        if "source_documents" in response:
-            print("=== RETRIEVED DOCUMENTS ===")
-            for doc in response["source_documents"]:
-                print("Page content:", doc.page_content)
-                print("Metadata:", doc.metadata)
-                print("-----")
-
-        answer = response["answer"]
-        source_docs = [{"relevant_documents": doc.page_content, **doc.metadata} for doc in response["source_documents"]]
-
-        if not answer:
-            return {"error": "No answer found for the question."}
-        
-        return ChatResponse(session_id=session_id, answer=answer)
+        chain = state.chains[namespace]
+
+    # Self-contained follow-ups skip the condense LLM call
+    standalone = standalone_question(message, ctx, extraction) if CONDENSE_FAST_PATH else None
+    entities = tuple(norm(e) if e else None for e in (part_number, model_number, order_id))
+    return TurnPlan(session_id, message, chain=chain, standalone=standalone, namespace=namespace, entities=entities)
+
+
+async def run_chain(plan: TurnPlan) -> dict:
+    """
+    `chain.ainvoke` for a retrieval turn, in front of the answer cache: the question is condensed
+    and the documents retrieved first, and an earlier answer for the same question, entities and
+    documents is returned (and saved to memory) without calling the answer LLM. Identical turns
+    that miss at the same time share one answer call (see `backend.single_flight`).
+    """
+    chain = plan.chain
+    # The metrics callback times the condense / answer LLM calls inside the chain run
+    config = {"callbacks": [get_metrics().llm_callback]}
+    if not ANSWER_CACHE or plan.namespace not in ANSWER_CACHE_NAMESPACES:
+        return await chain.ainvoke(chain_inputs(plan), config=config)
+    cache = get_answer_cache()
+    question = await chain.acondense(plan.message, plan.standalone)
+    docs = await chain.aretrieve(question)
+    embedding = await get_resources().embeddings.aembed_query(question) if cache.similarity else None
+    answer = cache.get(question, plan.entities, plan.namespace, docs, embedding)
+    if answer is not None:
+        await chain.memory.asave_context({"question": plan.message}, {"answer": answer})
+        return {"answer": answer, "source_documents": docs}
+    response, shared = await get_single_flight().do(
+        ("answer", *cache.key(question, plan.entities, plan.namespace, docs)),
+        lambda: chain.ainvoke({"question": plan.message, "standalone_question": question, "documents": docs}, config=config),
+    )
+    if shared:
+        # The answer came from another session's chain; record the turn in this one
+        await chain.memory.asave_context({"question": plan.message}, {"answer": response["answer"]})
+    else:
+        cache.put(question, plan.entities, plan.namespace, docs, response["answer"], embedding)
+    return response
 
-    except Exception as e:
-        print("direct here")
-        return ChatResponse(
-            session_id=request.session_id or "error",
-            answer=f"Internal server error: {str(e)}"
-        )
+
+## Creating the endpoints
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest):
+    # Timed per stage; a sampled share of turns is dumped with its documents (backend/metrics.py)
+    async with get_metrics().turn("chat") as trace:
+        try:
+            session_id = request.session_id or str(uuid.uuid4())
+            message = request.message
+
+            plan = await plan_turn(session_id, message)
+            if plan.answer is not None:
+                await get_session_store().acommit(session_id)
+                return ChatResponse(session_id=session_id, answer=plan.answer)
+
+            if plan.order_prompt is not None:
+                llm = get_resources().llm_open
+                async with upstream_slots:
+                    answer = (await llm.ainvoke(plan.order_prompt, config=get_metrics().llm_config("order_llm"))).content
+                await get_session_store().acommit(session_id)
+                return ChatResponse(session_id=session_id, answer=answer)
+
+            ## Here we get the response
+            async with upstream_slots:
+                response = await run_chain(plan)
+            await get_session_store().acommit(session_id)
+            # response = chain({"question": message})
+            trace.documents = response.get("source_documents", [])
+
+            answer = response["answer"]
+            source_docs = [{"relevant_documents": doc.page_content, **doc.metadata} for doc in response["source_documents"]]
+
+            if not answer:
+                return {"error": "No answer found for the question."}
+
+            return ChatResponse(session_id=session_id, answer=answer)
+
+        except Exception as e:
+            get_metrics().errors.inc(stage="turn")
+            logger.exception("chat turn failed")
+            return ChatResponse(
+                session_id=request.session_id or "error",
+                answer=f"Internal server error: {str(e)}"
+            )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+"""
+Streaming variant of /chat (Server-Sent Events). Retrieval turns emit `condensed`, `retrieval`
+and `token` events as they happen; every turn ends with one `final` event carrying the same
+payload as ChatResponse. Templated order/policy answers only send the `final` event.
+"""
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    session_id = request.session_id or str(uuid.uuid4())
+    message = request.message
+
+    async def events():
+        async with get_metrics().turn("chat_stream") as trace:
+            try:
+                plan = await plan_turn(session_id, message)
+                if plan.answer is not None:
+                    await get_session_store().acommit(session_id)
+                    yield _sse("final", {"session_id": session_id, "answer": plan.answer})
+                    return
+
+                if plan.order_prompt is not None:
+                    chunks = []
+                    async with upstream_slots:
+                        async for chunk in get_resources().llm_open.astream(plan.order_prompt,
+                                                                            config=get_metrics().llm_config("order_llm")):
+                            if chunk.content:
+                                chunks.append(chunk.content)
+                                yield _sse("token", {"text": chunk.content})
+                    await get_session_store().acommit(session_id)
+                    yield _sse("final", {"session_id": session_id, "answer": "".join(chunks)})
+                    return
+
+                async with upstream_slots:
+                    async for event, data in plan.chain.astream_turn(message, standalone_question=plan.standalone):
+                        if event == "answer":
+                            trace.documents = data["source_documents"]
+                            await get_session_store().acommit(session_id)
+                            yield _sse("final", {"session_id": session_id, "answer": data["answer"]})
+                        else:
+                            yield _sse(event, data)
+            except Exception as e:
+                get_metrics().errors.inc(stage="turn")
+                logger.exception("chat/stream turn failed")
+                yield _sse("error", {"session_id": session_id, "answer": f"Internal server error: {str(e)}"})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
 """It is important to serialize all the responses otherwise got recursive errors"""
@@ -228,6 +377,129 @@ def _to_serializable(obj):
             return [_to_serializable(v) for v in obj]
         return str(obj)
 
+def component_metrics() -> list:
+    """Counters the caches, the intent router and single-flight keep themselves, as /metrics samples."""
+    answer = get_answer_cache().stats()
+    sessions = get_session_store().stats()
+    catalog = get_part_catalog().stats()
+    hits = [({"cache": "answer", "kind": kind}, n) for kind, n in answer["hits"].items()]
+    hits += [({"cache": "session", "kind": "memory"}, sessions["hits"]), ({"cache": "catalog", "kind": "exact"}, catalog["hits"])]
+    misses = [({"cache": "answer"}, answer["misses"]), ({"cache": "session"}, sessions["misses"]),
+              ({"cache": "catalog"}, catalog["misses"])]
+    embeddings = get_resources().embeddings
+    if hasattr(embeddings, "stats"):
+        stats = embeddings.stats()
+        hits += [({"cache": "embedding", "kind": "memory"}, stats["memory_hits"]),
+                 ({"cache": "embedding", "kind": "disk"}, stats["disk_hits"])]
+        misses.append(({"cache": "embedding"}, stats["misses"]))
+    flights = get_single_flight().stats()
+    routes = get_intent_router().stats()["routed"]
+    return [
+        ("partselect_cache_hits_total", "counter", "Cache hits.", hits),
+        ("partselect_cache_misses_total", "counter", "Cache misses.", misses),
+        ("partselect_single_flight_calls_total", "counter", "Upstream calls made, per kind.",
+         [({"kind": kind}, n) for kind, n in flights["calls"].items()]),
+        ("partselect_single_flight_joined_total", "counter", "Callers that joined an identical in-flight call.",
+         [({"kind": kind}, n) for kind, n in flights["joined"].items()]),
+        ("partselect_intent_routes_total", "counter", "Turns per intent routing decision.",
+         [({"route": route}, n) for route, n in routes.items()]),
+        ("partselect_sessions", "gauge", "Sessions held in memory.", [({}, sessions["sessions"])]),
+    ]
+
+"""Prometheus scrape endpoint: stage and turn latency histograms, LLM tokens, cache counters."""
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(get_metrics().render(component_metrics()), media_type="text/plain; version=0.0.4")
+
+"""Hit/miss/eviction counters and resident size of the session store."""
+@app.get("/_debug/sessions")
+def debug_sessions():
+    return get_session_store().stats()
+
+"""Hit rate and saved latency of the embedding cache (empty when embeddings are not cached)."""
+@app.get("/_debug/embeddings")
+def debug_embeddings():
+    embeddings = get_resources().embeddings
+    return embeddings.stats() if hasattr(embeddings, "stats") else {}
+
+"""
+Reload hook for the local order store. Call it after data/transactions_data.json is regenerated;
+with force=false it only reloads when the file changed on disk.
+"""
+@app.post("/_debug/orders/reload")
+def reload_orders(force: bool = True):
+    store = get_order_store()
+    if force:
+        store.reload()
+        reloaded = True
+    else:
+        reloaded = store.refresh()
+    return {"ok": True, "reloaded": reloaded, "orders": len(store)}
+
+"""Size of the compatibility index; POST reloads it after data/parts_data.json changes (force=false: only if modified)."""
+@app.get("/_debug/compat")
+def debug_compat():
+    return get_compat_index().stats()
+
+@app.post("/_debug/compat/reload")
+def reload_compat(force: bool = True):
+    index = get_compat_index()
+    if force:
+        index.reload()
+        reloaded = True
+    else:
+        reloaded = index.refresh()
+    return {"ok": True, "reloaded": reloaded, **index.stats()}
+
+"""Part catalog size and hit/miss counts; POST reloads it after data/parts_data.json changes."""
+@app.get("/_debug/catalog")
+def debug_catalog():
+    return get_part_catalog().stats()
+
+@app.post("/_debug/catalog/reload")
+def reload_catalog(force: bool = True):
+    catalog = get_part_catalog()
+    if force:
+        catalog.reload()
+        reloaded = True
+    else:
+        reloaded = catalog.refresh()
+    return {"ok": True, "reloaded": reloaded, **catalog.stats()}
+
+"""Answer cache hit/miss counts and evictions; POST clears it."""
+@app.get("/_debug/answer_cache")
+def debug_answer_cache():
+    return get_answer_cache().stats()
+
+@app.post("/_debug/answer_cache/clear")
+def clear_answer_cache():
+    return {"ok": True, "cleared": get_answer_cache().clear()}
+
+"""Upstream calls made vs callers that joined an identical in-flight call, per kind."""
+@app.get("/_debug/single_flight")
+def debug_single_flight():
+    return get_single_flight().stats()
+
+"""Turns routed by the intent classifier, by the LLM fallback and by keywords; classifier time per turn."""
+@app.get("/_debug/intent")
+def debug_intent():
+    return get_intent_router().stats()
+
+"""BM25 index size and retrieval mode; POST rebuilds it after data/parts_data.json changes."""
+@app.get("/_debug/bm25")
+def debug_bm25():
+    return {"mode": RETRIEVAL_MODE, **get_bm25_index().stats()}
+
+@app.post("/_debug/bm25/reload")
+def reload_bm25(force: bool = True):
+    index = get_bm25_index()
+    if force:
+        index.reload()
+        reloaded = True
+    else:
+        reloaded = index.refresh()
+    return {"ok": True, "reloaded": reloaded, **index.stats()}
+
 """
 Call this endpoint to see if you are able to fetch the records directly from the pinecone database.
 Since I am using Langchain, that has its own abstractions, it is important to view the raw output and 
@@ -244,17 +516,16 @@ def debug_pinecone(
     include_stats: bool = False,
 ):
     try:
-        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-        index_name = "partselect-parts"
-        index = pc.Index(index_name)
+        resources = get_resources()
+        index_name = INDEX_NAME
+        index = resources.index
 
         stats = None
         if include_stats:
             raw = index.describe_index_stats(namespace=ns)
             stats = _to_serializable(raw)
 
-        emb = OpenAIEmbeddings(model="text-embedding-3-small")
-        vec = emb.embed_query(q)
+        vec = resources.embeddings.embed_query(q)
         filter_arg = None if nofilter else {key: {"$eq": value}}
 
         res = index.query(
@@ -0,0 +1,228 @@
+"""
+Local BM25 index over the product documents, and the hybrid retriever that fuses it with vector search.
+
+Identifier-heavy questions ("W10873791", "FGID2476SF door latch") are exact-token matches that
+embeddings blur, so the products retriever also ranks the same document text (`product_document`)
+with BM25 and merges both rankings with reciprocal rank fusion. The retriever's `mode`
+(RETRIEVAL_MODE in backend/app.py) picks the mix:
+
+- "hybrid" (default): vector + BM25, fused with RRF;
+- "lexical": BM25 only, for when the vector backend is slow or down;
+- "vector": the previous behaviour.
+
+In hybrid mode a failing vector search degrades to the BM25 results instead of failing the turn.
+"""
+import logging
+import math
+import os
+import re
+import threading
+from typing import Any
+
+import numpy as np
+
+from backend.local_index import metadata_matches
+from backend.metrics import get_metrics
+from backend.part_catalog import CatalogRetriever, product_document
+from backend.records import iter_records
+
+logger = logging.getLogger(__name__)
+
+PARTS_PATH = os.getenv("PARTS_PATH", "data/parts_data.json")
+# Standard BM25 / RRF constants
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased words; hyphenated identifiers also count as their joined and split forms."""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        if "-" in token:
+            tokens.append(token.replace("-", ""))
+            tokens.extend(token.split("-"))
+    return tokens
+
+
+def doc_key(doc) -> str:
+    """Identity of a product document across the two result lists."""
+    return doc.metadata.get("part_number_norm") or doc.id or doc.page_content
+
+
+class BM25Index:
+    def __init__(self, path: str | None = PARTS_PATH, docs=None):
+        self.path = path
+        self._mtime = None
+        self._lock = threading.Lock()
+        if docs is not None:
+            self.build(docs)
+        else:
+            self.reload()
+
+    def reload(self) -> int:
+        """Re-read the parts file and rebuild the index. Returns the number of documents."""
+        mtime = None
+        docs = []
+        if self.path and os.path.exists(self.path):
+            mtime = os.path.getmtime(self.path)
+            docs = (product_document(part) for part in iter_records(self.path))
+        n = self.build(docs)
+        self._mtime = mtime
+        return n
+
+    def refresh(self) -> bool:
+        """Reload only if the parts file changed on disk since the last load."""
+        mtime = os.path.getmtime(self.path) if self.path and os.path.exists(self.path) else None
+        if mtime != self._mtime:
+            self.reload()
+            return True
+        return False
+
+    def build(self, docs) -> int:
+        """Index `docs` (product `Document`s) and swap the tables in one step."""
+        seen, kept, postings, lengths = set(), [], {}, []
+        for doc in docs:
+            key = doc_key(doc)
+            # A repeated part number keeps its first record, like ingestion
+            if key in seen:
+                continue
+            seen.add(key)
+            row = len(kept)
+            kept.append(doc)
+            counts = {}
+            tokens = tokenize(doc.page_content)
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((row, tf))
+            lengths.append(len(tokens))
+        n = len(kept)
+        lengths = np.asarray(lengths, dtype=np.float32)
+        avg = float(lengths.mean()) if n else 0.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / avg) if n else lengths
+        terms = {}
+        for token, entries in postings.items():
+            rows = np.fromiter((r for r, _ in entries), dtype=np.int32, count=len(entries))
+            tf = np.fromiter((t for _, t in entries), dtype=np.float32, count=len(entries))
+            idf = math.log(1 + (n - len(entries) + 0.5) / (len(entries) + 0.5))
+            # Precomputed per-posting BM25 weight; a query only sums these
+            terms[token] = (rows, idf * tf * (BM25_K1 + 1) / (tf + norm[rows]))
+        with self._lock:
+            self.docs, self.terms = kept, terms
+        return n
+
+    def __len__(self):
+        return len(self.docs)
+
+    def stats(self) -> dict:
+        return {"documents": len(self.docs), "terms": len(self.terms)}
+
+    def search(self, query: str, k: int = 10, filter: dict | None = None):
+        """Top-k (document, score) pairs for `query`, restricted to docs matching `filter`."""
+        docs, terms = self.docs, self.terms
+        scores = np.zeros(len(docs), dtype=np.float32)
+        for token in set(tokenize(query)):
+            posting = terms.get(token)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        hits = np.flatnonzero(scores)
+        if not len(hits):
+            return []
+        if filter:
+            order = hits[np.argsort(-scores[hits])]
+            results = []
+            for row in order:
+                if metadata_matches(docs[row].metadata, filter):
+                    results.append((docs[row], float(scores[row])))
+                    if len(results) == k:
+                        break
+            return results
+        top = hits[np.argpartition(-scores[hits], min(k, len(hits)) - 1)[:k]] if len(hits) > k else hits
+        top = top[np.argsort(-scores[top])]
+        return [(docs[row], float(scores[row])) for row in top]
+
+
+def reciprocal_rank_fusion(rankings, k: int, rrf_k: int = RRF_K):
+    """Merge ranked document lists; each list contributes 1 / (rrf_k + rank) per document."""
+    scores, docs = {}, {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+
+class HybridRetriever(CatalogRetriever):
+    """
+    Products retriever: catalog lookups for pinned part numbers (see `CatalogRetriever`), then
+    vector search and/or BM25 over the same `search_kwargs` (k, filter) depending on `mode`.
+    """
+    lexical: Any = None
+    mode: str = "hybrid"
+
+    def _lexical(self, query):
+        filter = self.search_kwargs.get("filter") or None
+        with get_metrics().span("bm25"):
+            return [doc for doc, _ in self.lexical.search(query, self.search_kwargs.get("k", 4), filter)]
+
+    def _fuse(self, query, vector_docs):
+        if self.mode == "vector":
+            return vector_docs
+        lexical_docs = self._lexical(query)
+        if vector_docs is None:
+            return lexical_docs
+        return reciprocal_rank_fusion([vector_docs, lexical_docs], self.search_kwargs.get("k", 4))
+
+    def _get_relevant_documents(self, query, *, run_manager, **kwargs):
+        docs = self._catalog_documents() if self.catalog is not None else None
+        if docs is not None:
+            return docs
+        vector_docs = None
+        if self.mode != "lexical":
+            try:
+                with get_metrics().span("vector_query"):
+                    vector_docs = super(CatalogRetriever, self)._get_relevant_documents(query, run_manager=run_manager, **kwargs)
+            except Exception:
+                if self.mode == "vector":
+                    raise
+                logger.exception("vector search failed; using BM25 results only")
+        return self._fuse(query, vector_docs)
+
+    async def _aget_relevant_documents(self, query, *, run_manager, **kwargs):
+        docs = self._catalog_documents() if self.catalog is not None else None
+        if docs is not None:
+            return docs
+        vector_docs = None
+        if self.mode != "lexical":
+            try:
+                with get_metrics().span("vector_query"):
+                    vector_docs = await super(CatalogRetriever, self)._aget_relevant_documents(query, run_manager=run_manager, **kwargs)
+            except Exception:
+                if self.mode == "vector":
+                    raise
+                logger.exception("vector search failed; using BM25 results only")
+        return self._fuse(query, vector_docs)
+
+
+_bm25_index = None
+_bm25_index_lock = threading.Lock()
+
+
+def get_bm25_index() -> BM25Index:
+    global _bm25_index
+    if _bm25_index is None:
+        with _bm25_index_lock:
+            if _bm25_index is None:
+                _bm25_index = BM25Index()
+    return _bm25_index
+
+
+def set_bm25_index(index: BM25Index | None):
+    global _bm25_index
+    with _bm25_index_lock:
+        _bm25_index = index
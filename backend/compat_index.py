@@ -0,0 +1,155 @@
+"""
+In-memory compatibility index built from `compatible_models` / `compatible_brands` of the parts file.
+
+"Does PS11752778 fit my WDT780SAEM1?" and "What parts fit my WDT780SAEM1?" are set-membership
+questions, so `/chat` answers them from this index without embedding the question, querying
+the vector store or calling the LLM. Anything it can't answer for certain (unknown part or
+model, no compatibility wording) returns None and the turn goes through retrieval as before.
+"""
+import os
+import re
+import threading
+from backend.records import iter_records
+from backend.utils import extract_part_number, norm
+
+PARTS_PATH = os.getenv("PARTS_PATH", "data/parts_data.json")
+# Longest list of parts/models spelled out in one answer
+COMPAT_LIST_LIMIT = int(os.getenv("COMPAT_LIST_LIMIT", "10"))
+
+COMPAT_RE = re.compile(
+    r"\b(?:compatible|compatibility|fits?|fitting|works? (?:with|in|on|for)|goes? (?:with|in)|right part)\b",
+    re.IGNORECASE,
+)
+LIST_RE = re.compile(r"\b(?:what|which|list|show|any)\b.*\bparts?\b", re.IGNORECASE)
+
+
+class CompatibilityIndex:
+    def __init__(self, path: str = PARTS_PATH):
+        self.path = path
+        self._mtime = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> int:
+        """Re-read the parts file and swap all tables in one step. Returns the number of parts."""
+        with self._lock:
+            models_by_part, parts_by_model, brands_by_part = {}, {}, {}
+            parts, models, brands = {}, {}, {}
+            mtime = None
+            if os.path.exists(self.path):
+                mtime = os.path.getmtime(self.path)
+                for part in iter_records(self.path):
+                    key = norm(part["part_number"])
+                    # A repeated part number keeps its first record, like ingestion
+                    if key in parts:
+                        continue
+                    parts[key] = (part["part_number"], part.get("name", ""))
+                    part_models = set()
+                    for model in part.get("compatible_models", []):
+                        model_key = norm(model)
+                        if model_key in part_models:
+                            continue
+                        models.setdefault(model_key, model)
+                        part_models.add(model_key)
+                        parts_by_model.setdefault(model_key, []).append(key)
+                    models_by_part[key] = part_models
+                    for brand in part.get("compatible_brands", []):
+                        brands.setdefault(norm(brand), brand)
+                    brands_by_part[key] = {norm(b) for b in part.get("compatible_brands", [])}
+            self.parts, self.models, self.brands = parts, models, brands
+            self.models_by_part, self.parts_by_model, self.brands_by_part = models_by_part, parts_by_model, brands_by_part
+            self._mtime = mtime
+            return len(parts)
+
+    def refresh(self) -> bool:
+        """Reload only if the parts file changed on disk since the last load."""
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime != self._mtime:
+            self.reload()
+            return True
+        return False
+
+    def fits(self, part: str, model: str):
+        """True/False for a known part, None when the part is not in the catalog."""
+        models = self.models_by_part.get(norm(part))
+        return None if models is None else norm(model) in models
+
+    def fits_brand(self, part: str, brand: str):
+        brands = self.brands_by_part.get(norm(part))
+        return None if brands is None else norm(brand) in brands
+
+    def parts_for_model(self, model: str) -> list[str]:
+        return self.parts_by_model.get(norm(model), [])
+
+    def models_for_part(self, part: str) -> list[str]:
+        return sorted(self.models_by_part.get(norm(part), ()))
+
+    def stats(self) -> dict:
+        return {"parts": len(self.parts), "models": len(self.models), "brands": len(self.brands)}
+
+    def _part_label(self, key: str) -> str:
+        number, name = self.parts[key]
+        return f"{number} ({name})" if name else number
+
+    def _listing(self, keys, label) -> str:
+        shown = ", ".join(label(k) for k in keys[:COMPAT_LIST_LIMIT])
+        more = len(keys) - COMPAT_LIST_LIMIT
+        return shown + (f", and {more} more" if more > 0 else "")
+
+    def answer(self, message: str, part: str | None, model: str | None):
+        """
+        Templated answer for a compatibility question, or None to fall back to retrieval.
+        `part` / `model` are the resolved entities of the turn (possibly carried over from context).
+        """
+        if not COMPAT_RE.search(message) and not LIST_RE.search(message):
+            return None
+        # A model carried over from the context only gets a listing for an explicit compatibility
+        # question; "which part do I need for a leaking ice maker?" is left to retrieval
+        named = model and norm(model) in norm(message)
+        if (model and LIST_RE.search(message) and not extract_part_number(message)
+                and (named or COMPAT_RE.search(message))):
+            keys = self.parts_for_model(model)
+            if not keys:
+                return None
+            display = self.models[norm(model)]
+            return (f"I found {len(keys)} part{'s' if len(keys) != 1 else ''} compatible with model {display}: "
+                    f"{self._listing(keys, self._part_label)}.")
+        if not COMPAT_RE.search(message) or not part:
+            return None
+        key = norm(part)
+        if key not in self.parts:
+            return None
+        label = self._part_label(key)
+        if model:
+            display = self.models.get(norm(model), model.upper())
+            if self.fits(part, model):
+                return f"Yes, {label} is compatible with model {display}."
+            fits = self.models_for_part(part)
+            return (f"No, {label} is not listed as compatible with model {display}. "
+                    f"It fits these models: {self._listing(fits, lambda m: self.models[m])}.")
+        mentioned = [b for b in self.brands if re.search(rf"\b{re.escape(b)}\b", message.lower())]
+        if mentioned:
+            brand = mentioned[0]
+            if self.fits_brand(part, brand):
+                return f"Yes, {label} works with {self.brands[brand]} appliances."
+            return f"No, {label} is not listed for {self.brands[brand]} appliances."
+        return None
+
+
+_compat_index = None
+_compat_index_lock = threading.Lock()
+
+
+def get_compat_index() -> CompatibilityIndex:
+    global _compat_index
+    if _compat_index is None:
+        with _compat_index_lock:
+            if _compat_index is None:
+                _compat_index = CompatibilityIndex()
+    return _compat_index
+
+
+def set_compat_index(index: CompatibilityIndex | None):
+    global _compat_index
+    with _compat_index_lock:
+        _compat_index = index
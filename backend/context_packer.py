@@ -0,0 +1,113 @@
+"""
+Post-retrieval stage: turn the retrieved documents into a compact context for the answer prompt.
+
+The catalog is full of template clones ("Door Seal Gasket - Model 1", "- Model 2", ... share the
+description, installation guide and troubleshooting text), and the document prompts render
+`page_content` followed by metadata fields that repeat it. `ContextPacker` runs after the
+retriever and, in order:
+
+1. renders each document through its namespace's document prompt, dropping the lines whose
+   value is already in `page_content` (or empty);
+2. collapses near-duplicates (word-shingle Jaccard >= NEAR_DUPLICATE_THRESHOLD, digits masked so
+   part/model numbers don't count) into the first one, keeping only the lines that differ for the
+   others, so every part number is still in the context;
+3. keeps documents in retrieval order until CONTEXT_TOKEN_BUDGET (set in backend/app.py) is spent.
+
+The packed documents carry the rendered text as `page_content`, so the chain uses the plain
+"{page_content}" document prompt (`prompts["packed"]`).
+"""
+import os
+import re
+
+from langchain_core.documents import Document
+
+from backend.memory import count_tokens
+
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+SHINGLE_SIZE = 3
+
+FIELD_LINE_RE = re.compile(r"^(.*?)\{(\w+)\}(.*)$")
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _flat(value) -> str:
+    if isinstance(value, (list, tuple, set)):
+        return ", ".join(str(v) for v in value)
+    return "" if value is None else str(value)
+
+
+def _squash(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def compact_text(doc: Document, template: str) -> str:
+    """`doc` rendered line by line through a document prompt `template`, without repeated fields."""
+    content = "\n".join(line.strip() for line in doc.page_content.splitlines() if line.strip())
+    squashed = _squash(content)
+    lines = []
+    for line in template.splitlines():
+        match = FIELD_LINE_RE.match(line)
+        if not match:
+            lines.append(line)
+            continue
+        prefix, field, suffix = match.groups()
+        if field == "page_content":
+            lines.append(content)
+            continue
+        value = _flat(doc.metadata.get(field))
+        if not value.strip() or _squash(value) in squashed:
+            continue
+        lines.append(f"{prefix}{value}{suffix}")
+    return "\n".join(lines)
+
+
+def shingles(text: str) -> set:
+    words = ["#" if any(c.isdigit() for c in w) else w for w in WORD_RE.findall(text.lower())]
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class ContextPacker:
+    """Callable applied to the retrieved documents of one turn; see the module docstring."""
+
+    def __init__(self, document_prompt, token_budget: int, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        self.template = document_prompt.template
+        self.token_budget = token_budget
+        self.threshold = threshold
+
+    def collapse(self, texts: list[str]) -> list[tuple[int, list[int]]]:
+        """Group indices of near-identical texts: [(representative, [clones...]), ...] in order."""
+        groups, signatures = [], []
+        for i, text in enumerate(texts):
+            signature = shingles(text)
+            for group, rep_signature in zip(groups, signatures):
+                if jaccard(signature, rep_signature) >= self.threshold:
+                    group[1].append(i)
+                    break
+            else:
+                groups.append((i, []))
+                signatures.append(signature)
+        return groups
+
+    def __call__(self, docs: list[Document]) -> list[Document]:
+        texts = [compact_text(doc, self.template) for doc in docs]
+        packed, used = [], 0
+        for rep, clones in self.collapse(texts):
+            text = texts[rep]
+            if clones:
+                rep_lines = set(text.splitlines())
+                variants = ["; ".join(line for line in texts[i].splitlines() if line not in rep_lines)
+                            for i in clones]
+                text += "\nAlso available with the same details except:\n" + "\n".join(f"- {v}" for v in variants)
+            tokens = count_tokens(text)
+            # The best match always goes in, even on its own over budget
+            if packed and used + tokens > self.token_budget:
+                break
+            used += tokens
+            packed.append(Document(page_content=text, metadata=docs[rep].metadata, id=docs[rep].id))
+        return packed
@@ -1,170 +1,198 @@
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_deepseek import ChatDeepSeek
-from langchain_pinecone import PineconeVectorStore
+import asyncio
+import json
+from typing import Any
+from langchain.callbacks.manager import AsyncCallbackManagerForChainRun
 from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
-from pinecone import Pinecone
-import os
-from dotenv import load_dotenv
-import yaml
-
-load_dotenv()
-
-pinecone_api_key = os.getenv("PINECONE_API_KEY")
-index_name = "partselect-parts"
-pc = Pinecone(api_key=pinecone_api_key)
-index = pc.Index(index_name)
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
-def load_prompt():
-    with open("backend/prompt.yaml", "r") as file:
-        return yaml.safe_load(file)
-
-def build_chain(memory = None, filter = None, namespace = "products"):
-    pinecone_api_key = os.getenv("PINECONE_API_KEY")
-    index_name = "partselect-parts"
-    pc = Pinecone(api_key=pinecone_api_key)
-    index = pc.Index(index_name)
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
-    # retrieving our vector store
-    # vector_store = PineconeVectorStore(index=index, 
-    #                                    embedding=OpenAIEmbeddings(model="text-embedding-3-small"),
-    #                                    namespace=namespace)
-
-    vector_store = PineconeVectorStore.from_existing_index(
-        index_name=index_name,
-        embedding=embeddings,
-        namespace=namespace,
-    )
+from langchain.chains.conversational_retrieval.base import _get_chat_history
+from backend.bm25_index import HybridRetriever
+from backend.context_packer import ContextPacker
+from backend.embedding_cache import normalize_text
+from backend.memory import new_memory
+from backend.metrics import get_metrics
+from backend.order_store import get_order_store
+from backend.part_catalog import CatalogRetriever
+from backend.resources import get_resources, load_prompt
+from backend.single_flight import get_single_flight
+from backend.utils import norm
+
+
+class PartSelectRetrievalChain(ConversationalRetrievalChain):
+    """
+    ConversationalRetrievalChain that can also run a turn step by step and report progress,
+    which is what the streaming endpoint sends to the client.
+
+    An optional "standalone_question" input skips the condense LLM call: the caller has already
+    made the question self-contained (see `utils.standalone_question`), so it is used as-is for
+    retrieval and answering. Memory still records the user's original message.
+
+    With a `context_packer` the retrieved documents go through it before the answer prompt
+    (see `backend.context_packer`). An optional "documents" input skips retrieval: the caller
+    already ran `aretrieve` for the turn (the answer cache does, see `backend.app.run_chain`).
+    Concurrent identical async retrievals share one call (see `backend.single_flight`).
+
+    Async retrieval is timed as the "retrieval" stage; the LLM calls are timed by the metrics
+    callback, which tells them apart by the "condense" / "answer_llm" tags `build_chain` puts on
+    the sub-chains (see `backend.metrics`).
+    """
+    context_packer: Any = None
+
+    def _get_docs(self, question, inputs, *, run_manager):
+        if inputs.get("documents") is not None:
+            return inputs["documents"]
+        docs = super()._get_docs(question, inputs, run_manager=run_manager)
+        return self.context_packer(docs) if self.context_packer is not None else docs
+
+    async def _aget_docs(self, question, inputs, *, run_manager):
+        if inputs.get("documents") is not None:
+            return inputs["documents"]
+        with get_metrics().span("retrieval"):
+            docs, _ = await get_single_flight().do(
+                self._retrieval_key(question),
+                lambda: super(PartSelectRetrievalChain, self)._aget_docs(question, inputs, run_manager=run_manager),
+            )
+        docs = list(docs)
+        return self.context_packer(docs) if self.context_packer is not None else docs
+
+    def _retrieval_key(self, question: str) -> tuple:
+        search_kwargs = json.dumps(self.retriever.search_kwargs, sort_keys=True, default=str)
+        mode = getattr(self.retriever, "mode", None)
+        return "retrieval", type(self.retriever).__name__, mode, search_kwargs, normalize_text(question)
+
+    async def acondense(self, question: str, standalone_question: str | None = None) -> str:
+        """The standalone question for this turn: the given one, or condensed by the LLM from memory."""
+        if standalone_question:
+            return standalone_question
+        get_chat_history = self.get_chat_history or _get_chat_history
+        chat_history_str = get_chat_history(self.memory.load_memory_variables({})["chat_history"])
+        if not chat_history_str:
+            return question
+        outputs = await self.question_generator.ainvoke({"question": question, "chat_history": chat_history_str},
+                                                        config={"callbacks": [get_metrics().llm_callback]})
+        return outputs[self.question_generator.output_key]
+
+    async def aretrieve(self, question: str) -> list:
+        """The documents the answer prompt would get for `question`."""
+        run_manager = AsyncCallbackManagerForChainRun.get_noop_manager()
+        return await self._aget_docs(question, {}, run_manager=run_manager)
+
+    def _skip_condense(self, inputs: dict) -> dict:
+        standalone = inputs.get("standalone_question")
+        if not standalone:
+            return inputs
+        return {**inputs, "question": standalone, "chat_history": []}
+
+    def _call(self, inputs, run_manager=None):
+        return super()._call(self._skip_condense(inputs), run_manager=run_manager)
+
+    async def _acall(self, inputs, run_manager=None):
+        return await super()._acall(self._skip_condense(inputs), run_manager=run_manager)
+
+    async def astream_turn(self, question: str, standalone_question: str | None = None):
+        """
+        Async generator of (event, data) pairs for one turn:
+        "condensed" -> standalone question, "retrieval" -> documents found,
+        "token" -> answer chunks as the LLM produces them, "answer" -> full answer + sources.
+        The turn is saved to memory at the end, like `invoke` does.
+        """
+        run_manager = AsyncCallbackManagerForChainRun.get_noop_manager()
+        inputs = {"question": question, **self.memory.load_memory_variables({})}
+        get_chat_history = self.get_chat_history or _get_chat_history
+        chat_history_str = get_chat_history(inputs["chat_history"])
+        new_question = await self.acondense(question, standalone_question)
+        yield "condensed", {"question": new_question}
+
+        docs = await self._aget_docs(new_question, inputs, run_manager=run_manager)
+        yield "retrieval", {"documents": len(docs)}
+
+        if self.response_if_no_docs_found is not None and not docs:
+            answer = self.response_if_no_docs_found
+        else:
+            new_inputs = inputs.copy()
+            if self.rephrase_question:
+                new_inputs["question"] = new_question
+            new_inputs["chat_history"] = chat_history_str
+            combine = self.combine_docs_chain
+            prompt_value = combine.llm_chain.prompt.format_prompt(**combine._get_inputs(docs, **new_inputs))
+            chunks = []
+            async for chunk in combine.llm_chain.llm.astream(prompt_value, config=get_metrics().llm_config("answer_llm")):
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield "token", {"text": chunk.content}
+            answer = "".join(chunks)
+
+        await self.memory.asave_context({"question": question}, {"answer": answer})
+        yield "answer", {"answer": answer, "source_documents": docs}
+
+
+def build_chain(memory = None, filter = None, namespace = "products", resources = None, catalog = None,
+                lexical = None, mode = "vector", context_budget = None):
+    """
+    Assemble a per-session chain on top of the shared clients in `backend.resources`.
+    Only the memory and the retriever settings are specific to the session. With a part
+    `catalog`, part-number filters are answered from it instead of the vector store. With a
+    `lexical` BM25 index, products retrieval runs in `mode` "hybrid" (vector + BM25, fused)
+    or "lexical" (BM25 only), see `backend.bm25_index`. With a `context_budget` (tokens), the
+    retrieved documents are deduplicated and packed into that budget before the answer prompt.
+    """
+    resources = resources or get_resources()
+
+    # retrieving our vector store (shared per namespace)
+    vector_store = resources.vector_store(namespace)
 
-    
-    # print("namespace:", namespace)
-    # print("vector_store.namespace:", getattr(vector_store, "namespace", None))
-    # print("FILTER", filter)
-    
     ## filtering
     retriever_kwargs = {"k": 10, "namespace": namespace} # added namespace here
     if filter:
         retriever_kwargs["filter"] = filter
     # define the retriever, we can change the method as we want
-    retriever = vector_store.as_retriever(
-        search_type = "similarity",
-        search_kwargs = retriever_kwargs
-    )
-    print("The arguments to retriever", retriever_kwargs, "/n")
-
-
-    llm = ChatDeepSeek(
-        model="deepseek-chat",
-        temperature=0.0,
-        max_tokens=None
-    )
-
-    llm_open = ChatOpenAI(
-        model="gpt-4",
-        temperature=0.0
-    )
-
-    # getting the system prompt here that is defined in th UDF above
-    system_prompt = load_prompt()["system_prompt"]
-
-    # """We will combine the prompt. There will also be a document prompt that will help in putting filters."""
-    prompt = PromptTemplate(
-        input_variables=["context", "question"],
-        template=system_prompt
-    )
-
-    ## debug
-    # doc_prompt = PromptTemplate(
-    # input_variables=["page_content"],
-    # template="{page_content}"
-    # )
-
-    prod_doc_prompt = PromptTemplate(
-    input_variables=[
-        "page_content",
-        "part_number", 
-        "name",
-        "manufacturer", 
-        "manufacturer_part_number", 
-        "category",
-        "price",
-        "installation_guide", 
-        "troubleshooting",
-        "compatible_models"
-    ],
-    template=(
-        "Content: {page_content}\n"
-        "Part Number: {part_number}\n"
-        "Name: {name}\n"
-        "Manufacturer: {manufacturer}\n"
-        "Manufacturer Part Number: {manufacturer_part_number}\n"
-        "Category: {category}\n"
-        "Price: {price}\n"
-        "Installation Guide: {installation_guide}\n"
-        "Troubleshooting: {troubleshooting}\n"
-        "Compatible Models: {compatible_models}"
+    if lexical is not None and mode != "vector" and namespace == "products":
+        retriever = HybridRetriever(
+            vectorstore=vector_store,
+            search_type="similarity",
+            search_kwargs=retriever_kwargs,
+            catalog=catalog,
+            lexical=lexical,
+            mode=mode,
         )
-    )
-
-    transaction_doc_prompt = PromptTemplate(
-    input_variables=[
-        "page_content",
-        "order_id",
-        "customer_id",
-        "created_id",
-        "status",
-        "carrier",
-        "item_part_numbers_norm",
-        "address_city"
-    ],
-    template=(
-        "Content: {page_content}\n"
-        "Order ID: {order_id}\n"
-        "Customer ID: {customer_id}\n"
-        "Created Date: {created_id}\n"
-        "Status: {status}\n"
-        "Carrier: {carrier}\n"
-        "Items: {item_part_numbers_norm}\n"
-        "Address City: {address_city}"
+    elif catalog is not None and namespace == "products":
+        retriever = CatalogRetriever(
+            vectorstore=vector_store,
+            search_type="similarity",
+            search_kwargs=retriever_kwargs,
+            catalog=catalog,
         )
-    )
-
-    CONDENSE_PROMPT = PromptTemplate(
-    input_variables=["chat_history", "question"],
-    template=(
-        "Rewrite the user’s follow-up as a standalone query.\n"
-        "If the user says things like 'this part' or 'does this', resolve them using the most recently mentioned part number "
-        "or model in the chat history. Include those IDs explicitly.\n\n"
-        "Chat history:\n{chat_history}\n\n"
-        "Follow-up: {question}\n\n"
-        "Standalone query:"
-    )
-)
+    else:
+        retriever = vector_store.as_retriever(
+            search_type = "similarity",
+            search_kwargs = retriever_kwargs
+        )
+    prompts = resources.prompts
 
     # Set up conversation memory if not provided.
     if memory is None:
-        memory = ConversationBufferMemory(
-            memory_key="chat_history", 
-            return_messages=True,
-            output_key="answer"
-        )
+        memory = new_memory()
+
+    document_prompt = prompts["products"] if namespace == "products" else prompts["transactions"]
+    context_packer = None
+    if context_budget:
+        context_packer = ContextPacker(document_prompt, context_budget)
+        document_prompt = prompts["packed"]
 
-    print("done before retreival chain")
     ## here is everything chained
-    conv_chain = ConversationalRetrievalChain.from_llm(
-        llm=llm, ## use llm_open for OpenAI GPT
+    conv_chain = PartSelectRetrievalChain.from_llm(
+        llm=resources.llm, ## use resources.llm_open for OpenAI GPT
         retriever=retriever,
         memory=memory,
-        condense_question_prompt=CONDENSE_PROMPT,
+        condense_question_prompt=prompts["condense"],
         return_source_documents=True,
         combine_docs_chain_kwargs={
-            "prompt": prompt,
-            "document_prompt": prod_doc_prompt if namespace == "products" else transaction_doc_prompt
-        }
+            "prompt": prompts["qa"],
+            "document_prompt": document_prompt
+        },
+        context_packer=context_packer,
     )
+    # Stage names for the LLM metrics callback, inherited by the LLM runs of each sub-chain
+    conv_chain.question_generator.tags = ["condense"]
+    conv_chain.combine_docs_chain.tags = ["answer_llm"]
     return conv_chain
 
     
@@ -173,22 +201,44 @@ Code is for the transactions index
 """
 
 def transactions_search_order(order_id: str):
+    """
+    Look up a specific order. Served from the local order store, which falls back to the
+    transactions index for IDs it doesn't hold.
+    """
+    return get_order_store().get(order_id)
+
+
+async def atransactions_search_order(order_id: str):
+    """
+    Async variant for the event loop: local hits are answered inline, only the index
+    fallback (a blocking network call) is pushed to a worker thread.
+    """
+    store = get_order_store()
+    with get_metrics().span("order_lookup"):
+        if order_id in store or store.fallback is None:
+            return store.get(order_id)
+        # Concurrent lookups of the same unknown ID share one index query
+        meta, _ = await get_single_flight().do(("order", norm(order_id)), lambda: asyncio.to_thread(store.get, order_id))
+    return meta
+
+
+def pinecone_search_order(order_id: str):
     """
     Search for a specific order in the transactions index.
     """
     
     
-    result = index.query(
+    result = get_resources().index.query(
         vector=[0.0] * 1536,
         top_k=1,
         namespace = "transactions",
         include_metadata=True,
         filter={
-            "order_id_norm": {"$eq": order_id.lower()}
+            "order_id_norm": {"$eq": norm(order_id)}
         }
 
     )
     matches = result.get("matches", [])
     if matches and matches[0].get("metadata"):
         return matches[0]["metadata"]
-    return None
\ No newline at end of file
+    return None
@@ -0,0 +1,216 @@
+"""
+Caching wrapper around an `Embeddings` model.
+
+Vectors are keyed on the model name plus the normalized text (case-folded, whitespace collapsed),
+so repeated questions and re-ingested documents skip the embeddings API. Two tiers:
+
+- an in-memory LRU of recent vectors;
+- an optional on-disk store: a memory-mapped float32 matrix (`<path>.f32`) plus an append-only
+  key index (`<path>.keys`, one "key<TAB>row" line per vector). It survives restarts and is shared
+  by query-time retrieval and `data/pc_vdb.py` ingestion. One writer process at a time.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from backend.metrics import get_metrics
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH") or None
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha1(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class DiskEmbeddingStore:
+    """Append-only float32 matrix on disk, addressed through a key -> row index."""
+
+    INITIAL_ROWS = 1024
+
+    def __init__(self, path: str, dim: int | None = None):
+        self.path = path
+        self.matrix_path = path + ".f32"
+        self.keys_path = path + ".keys"
+        self.dim = dim
+        self.rows: dict[str, int] = {}
+        self._matrix = None
+        self._capacity = 0
+        self._lock = threading.Lock()
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path) as f:
+                for line in f:
+                    key, _, row = line.rstrip("\n").partition("\t")
+                    if row:
+                        self.rows[key] = int(row)
+        if self.rows and os.path.exists(self.matrix_path):
+            if self.dim is None:
+                self.dim = int(open(self.path + ".dim").read())
+            self._open(os.path.getsize(self.matrix_path) // (4 * self.dim))
+
+    def _open(self, capacity: int):
+        if self._matrix is not None:
+            self._matrix.flush()
+        with open(self.matrix_path, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._capacity = capacity
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self, key: str):
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        return self._matrix[row].tolist()
+
+    def put(self, key: str, vector: list[float]):
+        with self._lock:
+            if key in self.rows:
+                return
+            if self.dim is None:
+                self.dim = len(vector)
+                with open(self.path + ".dim", "w") as f:
+                    f.write(str(self.dim))
+            row = len(self.rows)
+            if row >= self._capacity:
+                self._open(max(self.INITIAL_ROWS, self._capacity * 2))
+            self._matrix[row] = vector
+            # Vector first, then the key line: a crash in between only loses the entry
+            with open(self.keys_path, "a") as f:
+                f.write(f"{key}\t{row}\n")
+            self.rows[key] = row
+
+    def flush(self):
+        if self._matrix is not None:
+            self._matrix.flush()
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, underlying: Embeddings, model_name: str | None = None,
+                 max_entries: int = EMBEDDING_CACHE_SIZE, path: str | None = EMBEDDING_CACHE_PATH):
+        self.underlying = underlying
+        self.model_name = model_name or getattr(underlying, "model", None) or type(underlying).__name__
+        self.max_entries = max_entries
+        self.disk = DiskEmbeddingStore(path) if path else None
+        self._lru: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._miss_seconds = 0.0
+
+    def _lookup(self, key: str):
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+        if self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self.disk_hits += 1
+                self._remember(key, vector, persist=False)
+                return vector
+        return None
+
+    def _remember(self, key: str, vector: list[float], persist: bool = True):
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+        if persist and self.disk is not None:
+            self.disk.put(key, vector)
+
+    def _record_misses(self, count: int, seconds: float):
+        with self._lock:
+            self.misses += count
+            self._miss_seconds += seconds
+
+    def _split(self, texts: list[str]):
+        keys = [cache_key(self.model_name, t) for t in texts]
+        vectors = [self._lookup(k) for k in keys]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        return keys, vectors, missing
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, vectors, missing = self._split(texts)
+        if missing:
+            start = time.perf_counter()
+            fresh = self.underlying.embed_documents([texts[i] for i in missing])
+            self._record_misses(len(missing), time.perf_counter() - start)
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+                self._remember(keys[i], vector)
+        return vectors
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, vectors, missing = self._split(texts)
+        if missing:
+            start = time.perf_counter()
+            fresh = await self.underlying.aembed_documents([texts[i] for i in missing])
+            self._record_misses(len(missing), time.perf_counter() - start)
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+                self._remember(keys[i], vector)
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        key = cache_key(self.model_name, text)
+        vector = self._lookup(key)
+        if vector is None:
+            start = time.perf_counter()
+            with get_metrics().span("embedding"):
+                vector = self.underlying.embed_query(text)
+            self._record_misses(1, time.perf_counter() - start)
+            self._remember(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = cache_key(self.model_name, text)
+        vector = self._lookup(key)
+        if vector is None:
+            start = time.perf_counter()
+            with get_metrics().span("embedding"):
+                vector = await self.underlying.aembed_query(text)
+            self._record_misses(1, time.perf_counter() - start)
+            self._remember(key, vector)
+        return vector
+
+    def flush(self):
+        if self.disk is not None:
+            self.disk.flush()
+
+    def clear(self):
+        """Drop the in-memory entries; the disk store is kept."""
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        avg_miss = self._miss_seconds / self.misses if self.misses else 0.0
+        return {
+            "model": self.model_name,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "avg_miss_ms": avg_miss * 1000,
+            # Each hit would have cost about one average miss
+            "saved_seconds": hits * avg_miss,
+            "memory_entries": len(self._lru),
+            "disk_entries": len(self.disk) if self.disk is not None else 0,
+        }
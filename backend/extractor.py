@@ -0,0 +1,152 @@
+"""
+Single-pass entity and intent extraction for a chat message.
+
+`resolve_entities`, `route_intent` and `standalone_question` (backend/utils.py) all need the part,
+model and order IDs in the message plus the keyword signals from backend/intents.yaml. The
+`EntityExtractor` compiles the three ID patterns and every keyword into one regex and walks the
+message once; the resulting `Extraction` is computed once per turn and handed to all three.
+
+Semantics are those of the separate checks it replaces: each ID is the first match of its own
+pattern (a part or order number spelled in capitals also counts as a model, as before), and a
+keyword is present if it occurs anywhere in the lower-cased text, including inside IDs or other
+keywords. Where two keywords start at the same position only the longer one is reported
+("refund policy", not "refund"); the file lists such phrases under the earlier intent, so the
+routing is unchanged.
+"""
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+
+import yaml
+
+INTENT_KEYWORDS_PATH = os.getenv("INTENT_KEYWORDS_PATH", "backend/intents.yaml")
+
+PART_PATTERN = r"\b(?i:PS[-\s]?\d{6,})\b"
+# PSO and at least four digits: PSO1000-PSO9999 in the sample data, more in data/synth_data.py
+ORDER_PATTERN = r"\b(?i:PSO\d{4,})\b"
+MODEL_PATTERN = r"\b[A-Z]{2,}\d[A-Z0-9]+\b"
+MODEL_RE = re.compile(MODEL_PATTERN)
+# The same three patterns over lower-cased ASCII text, factored so that each position is tried
+# once: all of them start a word with two letters. A "model" here is only a candidate that the
+# original spelling must still match.
+LOWER_ENTITY_PATTERN = (
+    r"\b(?=[a-z]{2})(?:ps(?:(?P<order>o\d{4,})|(?P<part>[-\s]?\d{6,}))\b|(?P<model>[a-z]{2,}\d[a-z0-9]+)\b)"
+)
+ENTITY_PATTERN = f"(?P<part>{PART_PATTERN})|(?P<order>{ORDER_PATTERN})|(?P<model>{MODEL_PATTERN})"
+
+
+def trie_pattern(words) -> str:
+    """Regex alternation of `words` as a prefix tree; at any position it matches the longest word."""
+    root = {}
+    for word in words:
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(root) if words else r"(?!)"
+
+
+@dataclass(slots=True)
+class Extraction:
+    part: str | None = None
+    model: str | None = None
+    order: str | None = None
+    # Names from intents.yaml whose keywords occur in the message
+    intents: set = field(default_factory=set)
+    references: set = field(default_factory=set)
+
+
+class EntityExtractor:
+    def __init__(self, intents: dict, references: dict | None = None):
+        """`intents` / `references`: name -> keywords, intents in routing priority order."""
+        self.intents = {name: list(keywords) for name, keywords in intents.items()}
+        self.references = {name: list(keywords) for name, keywords in (references or {}).items()}
+        # keyword -> (intent names, reference names) it signals
+        signals = {}
+        for index, table in enumerate((self.intents, self.references)):
+            for name, keywords in table.items():
+                for keyword in keywords:
+                    signals.setdefault(keyword.lower(), (set(), set()))[index].add(name)
+        self.signals = {k: (frozenset(i), frozenset(r)) for k, (i, r) in signals.items()}
+        keywords = trie_pattern(list(self.signals))
+        # Keywords are a lookahead so that they can overlap each other and IDs: finditer then
+        # moves on by one character, while a matched ID is skipped as a whole
+        self._lower_regex = re.compile(f"(?=[a-z])(?:{LOWER_ENTITY_PATTERN}|(?=(?P<kw>{keywords})))")
+        self._lower_keyword_re = re.compile(keywords)
+        # Non-ASCII text can change length when lower-cased, so it is matched as written
+        self._regex = re.compile(f"{ENTITY_PATTERN}|(?=(?P<kw>(?i:{keywords})))")
+        self._keyword_re = re.compile(f"(?i:{keywords})")
+
+    @classmethod
+    def from_file(cls, path: str = INTENT_KEYWORDS_PATH) -> "EntityExtractor":
+        with open(path) as f:
+            config = yaml.safe_load(f) or {}
+        return cls(config.get("intents") or {}, config.get("references") or {})
+
+    def extract(self, text: str) -> Extraction:
+        text = text or ""
+        if text.isascii():
+            scanned, regex, keyword_search = text.lower(), self._lower_regex, self._lower_keyword_re.search
+        else:
+            scanned, regex, keyword_search = text, self._regex, self._keyword_re.search
+        signals = self.signals
+        part = model = order = None
+        intents, references = set(), set()
+        for m in regex.finditer(scanned):
+            group = m.lastgroup
+            if group == "kw":
+                found_intents, found_references = signals[m.group("kw").lower()]
+                intents |= found_intents
+                references |= found_references
+                continue
+            start, end = m.span()
+            value = text[start:end]
+            if group == "part":
+                part = part or value
+            elif group == "order":
+                order = order or value
+            if model is None and MODEL_RE.fullmatch(value):
+                model = value
+            # Keywords starting inside the ID ("ORDER1" has "order")
+            k = keyword_search(scanned, start)
+            while k is not None and k.start() < end:
+                found_intents, found_references = signals[k.group().lower()]
+                intents |= found_intents
+                references |= found_references
+                k = keyword_search(scanned, k.start() + 1)
+        return Extraction(part, model, order.upper() if order else None, intents, references)
+
+    def intent(self, extraction: Extraction):
+        """First intent, in file order, with a keyword in the message."""
+        for name in self.intents:
+            if name in extraction.intents:
+                return name
+        return None
+
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_extractor() -> EntityExtractor:
+    global _extractor
+    if _extractor is None:
+        with _extractor_lock:
+            if _extractor is None:
+                _extractor = EntityExtractor.from_file()
+    return _extractor
+
+
+def set_extractor(extractor: EntityExtractor | None):
+    global _extractor
+    with _extractor_lock:
+        _extractor = extractor
@@ -0,0 +1,293 @@
+"""
+Local intent classifier for routing a chat turn to products, transactions_order or
+transactions_policy.
+
+The keyword router (`route_intent` in backend/utils.py) takes the first keyword it finds, so
+"I want to return to my question about the ice maker" goes down the order path. The
+`IntentClassifier` is a multinomial logistic regression over hashed features of the message:
+words, word bigrams and character trigrams, with part / model / order IDs replaced by
+placeholder tokens. It is trained from the labeled file data/intent_labels.jsonl by
+`python data/train_intent.py`, which also reports accuracy against the keyword router; a server
+without a saved model trains one from the same file on first use (well under a second).
+
+`IntentRouter` first applies two of the keyword router's rules: a follow-up that names no ID and
+no keyword ("where is it?") goes to the session's active order, if there is one, and a turn that
+names an order ID with an order keyword ("cancel PSO1001") is an order turn. Otherwise it
+uses the classifier's answer when its probability reaches the confidence threshold. Less
+confident turns go to the LLM with a one-word classification prompt; when the LLM is off, fails
+or answers with something else, the classifier's guess stands.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from backend.extractor import MODEL_RE, ORDER_PATTERN, PART_PATTERN, get_extractor
+from backend.utils import extract, route_intent
+
+logger = logging.getLogger(__name__)
+
+INTENT_LABELS_PATH = os.getenv("INTENT_LABELS_PATH", "data/intent_labels.jsonl")
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "data/intent_model.npz")
+# "classifier" (below) or "keywords" for the keyword router alone
+INTENT_ROUTER = os.getenv("INTENT_ROUTER", "classifier")
+# Classifier answers below this probability are escalated
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.6"))
+# Set INTENT_LLM_FALLBACK=0 to send low-confidence turns straight to the keyword router
+INTENT_LLM_FALLBACK = os.getenv("INTENT_LLM_FALLBACK", "1") == "1"
+INTENT_LLM_TIMEOUT = float(os.getenv("INTENT_LLM_TIMEOUT", "5"))
+
+LABELS = ("products", "transactions_order", "transactions_policy")
+FEATURE_BITS = 18
+
+ID_PLACEHOLDERS = (
+    (re.compile(ORDER_PATTERN), " __order__ "),
+    (re.compile(PART_PATTERN), " __part__ "),
+    (MODEL_RE, " __model__ "),
+)
+TOKEN_RE = re.compile(r"[a-z0-9_']+")
+
+
+def features(text: str) -> list[str]:
+    """Words, word bigrams and character trigrams of `text`, IDs replaced by placeholders."""
+    for pattern, placeholder in ID_PLACEHOLDERS:
+        text = pattern.sub(placeholder, text or "")
+    words = TOKEN_RE.findall(text.lower())
+    found = [f"w:{w}" for w in words]
+    found += [f"b:{a} {b}" for a, b in zip(["^"] + words, words + ["$"])]
+    for w in words:
+        if not w.startswith("__"):
+            padded = f"<{w}>"
+            found += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return found
+
+
+def hashed(text: str, bits: int = FEATURE_BITS) -> tuple[np.ndarray, np.ndarray]:
+    """Feature indices and signed, L2-normalised values for `text` (crc32, stable across runs)."""
+    mask = (1 << bits) - 1
+    counts = {}
+    for feature in features(text):
+        h = zlib.crc32(feature.encode())
+        index = h & mask
+        counts[index] = counts.get(index, 0.0) + (1.0 if (h >> bits) & 1 else -1.0)
+    indices = np.fromiter(counts, dtype=np.int64, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    norm = float(np.linalg.norm(values))
+    return indices, values / norm if norm else values
+
+
+def load_examples(path: str = INTENT_LABELS_PATH) -> list[dict]:
+    """`{"text", "intent", "group"}` records from a JSONL labeled file."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=-1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class IntentClassifier:
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, labels=LABELS, bits: int = FEATURE_BITS):
+        self.weights = weights
+        self.bias = bias
+        self.labels = tuple(labels)
+        self.bits = bits
+
+    def probabilities(self, text: str) -> np.ndarray:
+        indices, values = hashed(text, self.bits)
+        return softmax(values @ self.weights[indices] + self.bias)
+
+    def predict(self, text: str) -> tuple[str, float]:
+        """Most likely intent and its probability."""
+        probabilities = self.probabilities(text)
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best])
+
+    @classmethod
+    def train(cls, examples, labels=LABELS, bits: int = FEATURE_BITS, epochs: int = 30,
+              batch_size: int = 32, learning_rate: float = 2.0, l2: float = 1e-5, seed: int = 0):
+        """Mini-batch gradient descent on the softmax cross-entropy of `examples` ({"text", "intent"})."""
+        rng = np.random.default_rng(seed)
+        label_index = {label: i for i, label in enumerate(labels)}
+        rows = [hashed(e["text"], bits) for e in examples]
+        targets = np.array([label_index[e["intent"]] for e in examples])
+        weights = np.zeros((1 << bits, len(labels)), dtype=np.float32)
+        bias = np.zeros(len(labels), dtype=np.float32)
+        for epoch in range(epochs):
+            rate = learning_rate / (1 + epoch * 0.2)
+            order = rng.permutation(len(rows))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                indices = np.concatenate([rows[i][0] for i in batch])
+                values = np.concatenate([rows[i][1] for i in batch])
+                owner = np.repeat(np.arange(len(batch)), [len(rows[i][0]) for i in batch])
+                scores = np.zeros((len(batch), len(labels)), dtype=np.float32)
+                np.add.at(scores, owner, values[:, None] * weights[indices])
+                error = softmax(scores + bias)
+                error[np.arange(len(batch)), targets[batch]] -= 1
+                error /= len(batch)
+                # The same index can occur in several rows of the batch, hence add.at
+                gradient = values[:, None] * error[owner]
+                weights *= 1 - rate * l2
+                np.add.at(weights, indices, -rate * gradient)
+                bias -= rate * error.sum(axis=0)
+        return cls(weights, bias, labels, bits)
+
+    def save(self, path: str = INTENT_MODEL_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, weights=self.weights, bias=self.bias,
+                            labels=np.array(self.labels), bits=np.array(self.bits))
+
+    @classmethod
+    def load(cls, path: str = INTENT_MODEL_PATH) -> "IntentClassifier":
+        with np.load(path) as data:
+            return cls(data["weights"], data["bias"], [str(l) for l in data["labels"]], int(data["bits"]))
+
+    @classmethod
+    def load_or_train(cls, path: str = INTENT_MODEL_PATH, labels_path: str = INTENT_LABELS_PATH):
+        if os.path.exists(path):
+            return cls.load(path)
+        start = time.perf_counter()
+        classifier = cls.train(load_examples(labels_path))
+        logger.warning("no intent model at %s; trained on %s in %.2fs", path, labels_path, time.perf_counter() - start)
+        return classifier
+
+
+def parse_intent(text: str):
+    """Intent named in an LLM reply ("order" / "policy" / "products" or the full label), else None."""
+    reply = (text or "").strip().lower()
+    for label in LABELS:
+        if label in reply:
+            return label
+    short = {label.split("_")[-1]: label for label in LABELS}
+    for word in TOKEN_RE.findall(reply):
+        if word in short:
+            return short[word]
+    return None
+
+
+class IntentRouter:
+    """The classifier, with the LLM deciding low-confidence turns; mode "keywords" is `route_intent` alone."""
+
+    def __init__(self, classifier: IntentClassifier | None = None, mode: str = INTENT_ROUTER,
+                 threshold: float = INTENT_CONFIDENCE_THRESHOLD, llm_fallback: bool = INTENT_LLM_FALLBACK,
+                 llm_timeout: float = INTENT_LLM_TIMEOUT):
+        self._classifier = classifier
+        self.mode = mode
+        self.threshold = threshold
+        self.llm_fallback = llm_fallback
+        self.llm_timeout = llm_timeout
+        self._lock = threading.Lock()
+        self.routed = {"keywords": 0, "context": 0, "order_id": 0, "classifier": 0, "llm": 0, "fallback": 0}
+        self.llm_failures = 0
+        self.classify_seconds = 0.0
+        self.classified = 0
+
+    @property
+    def classifier(self) -> IntentClassifier:
+        if self._classifier is None:
+            with self._lock:
+                if self._classifier is None:
+                    self._classifier = IntentClassifier.load_or_train()
+        return self._classifier
+
+    def warm(self):
+        if self.mode == "classifier":
+            self.classifier
+
+    def _count(self, source: str):
+        with self._lock:
+            self.routed[source] += 1
+
+    async def aroute(self, message: str, session_id: str | None = None, extraction=None, ctx=None) -> str:
+        if self.mode != "classifier":
+            self._count("keywords")
+            return route_intent(message, session_id, extraction)
+        extraction = extraction or extract(message)
+        if (ctx and ctx.get("active_order") and not (extraction.part or extraction.model or extraction.order)
+                and not get_extractor().intent(extraction)):
+            # Same as route_intent: the message alone carries no order, the session does
+            self._count("context")
+            return "transactions_order"
+        if extraction.order and get_extractor().intent(extraction) == "transactions_order":
+            # "return PSO1001": an order ID with an order keyword is an order turn, as in route_intent,
+            # whatever the classifier makes of the wording
+            self._count("order_id")
+            return "transactions_order"
+        classifier = self.classifier
+        start = time.perf_counter()
+        intent, confidence = classifier.predict(message)
+        with self._lock:
+            self.classify_seconds += time.perf_counter() - start
+            self.classified += 1
+        if confidence >= self.threshold:
+            self._count("classifier")
+            return intent
+        if self.llm_fallback:
+            answer = await self._allm(message, ctx)
+            if answer:
+                self._count("llm")
+                return answer
+        # Without an LLM answer the classifier's guess still beats the keyword router on the
+        # turns it is unsure about (see data/train_intent.py)
+        self._count("fallback")
+        return intent
+
+    async def _allm(self, message: str, ctx):
+        from backend.memory import entity_digest
+        from backend.metrics import get_metrics
+        from backend.resources import get_resources
+
+        resources = get_resources()
+        prompt = resources.prompts["intent"].format(question=message, context=entity_digest(ctx) or "None.")
+        try:
+            reply = await asyncio.wait_for(resources.llm.ainvoke(prompt, config=get_metrics().llm_config("intent_llm")),
+                                           self.llm_timeout)
+        except Exception:
+            logger.exception("intent LLM fallback failed")
+            with self._lock:
+                self.llm_failures += 1
+            return None
+        intent = parse_intent(getattr(reply, "content", reply))
+        if intent is None:
+            with self._lock:
+                self.llm_failures += 1
+        return intent
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "threshold": self.threshold,
+                "llm_fallback": self.llm_fallback,
+                "routed": dict(self.routed),
+                "llm_failures": self.llm_failures,
+                "classify_us_avg": round(self.classify_seconds / self.classified * 1e6, 1) if self.classified else None,
+            }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_intent_router() -> IntentRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = IntentRouter()
+    return _router
+
+
+def set_intent_router(router: IntentRouter | None):
+    global _router
+    with _router_lock:
+        _router = router
@@ -0,0 +1,405 @@
+"""
+Local, in-process vector index that stands in for the `partselect-parts` Pinecone index.
+
+`LocalVectorIndex` mirrors the parts of the Pinecone index API the app uses (`upsert`, `query`,
+`fetch`, `update`, `delete`, `describe_index_stats`) on top of one float32 NumPy matrix per
+namespace. Vectors are L2-normalized on write, so cosine similarity is one matrix-vector product.
+Metadata filters support `$eq` / `$in` (and bare values as `$eq`); fields ending in `_norm` plus
+`category` get an inverted index, so filtered queries only score the matching rows. An optional
+IVF partitioning (`train`) trades a little recall for scanning only `nprobe` clusters.
+
+`save`/`load` persist each namespace as a raw float32 file (opened memory-mapped on load) plus a
+JSON file of ids and metadata. `LocalVectorStore` wraps it in the LangChain `VectorStore`
+interface with the same search kwargs (`k`, `namespace`, `filter`) as `PineconeVectorStore`.
+"""
+import json
+import os
+import threading
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+INDEXED_FIELDS_SUFFIX = "_norm"
+INDEXED_FIELDS = {"category"}
+# Below this many candidate rows a filtered query scores just those rows
+SUBSET_SCAN_LIMIT = 50_000
+
+
+def _is_indexed(field: str) -> bool:
+    return field.endswith(INDEXED_FIELDS_SUFFIX) or field in INDEXED_FIELDS
+
+
+def _values(value) -> list:
+    return value if isinstance(value, list) else [value]
+
+
+def _matches(metadata: dict, field: str, condition) -> bool:
+    stored = set(_values(metadata.get(field)))
+    if isinstance(condition, dict):
+        if "$eq" in condition:
+            return condition["$eq"] in stored
+        if "$in" in condition:
+            return bool(stored.intersection(condition["$in"]))
+        raise ValueError(f"Unsupported filter operator in {condition!r}")
+    return condition in stored
+
+
+def metadata_matches(metadata: dict, filter: dict | None) -> bool:
+    """Pinecone-style `$eq` / `$in` filter check for one metadata dict (all fields must match)."""
+    return all(_matches(metadata or {}, field, condition) for field, condition in (filter or {}).items())
+
+
+class _Namespace:
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.count = 0
+        self.ids: list[str] = []
+        self.metadata: list[dict | None] = []
+        self.row_of: dict[str, int] = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.postings: dict[str, dict] = {}
+        self.centroids = None
+        self.assignment = None
+
+    def _grow(self, needed: int):
+        capacity = self.vectors.shape[0]
+        if needed <= capacity and isinstance(self.vectors, np.ndarray) and self.vectors.flags.writeable:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        vectors = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        vectors[:self.count] = self.vectors[:self.count]
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:self.count] = self.alive[:self.count]
+        self.vectors, self.alive = vectors, alive
+        if self.assignment is not None:
+            assignment = np.full(new_capacity, -1, dtype=np.int32)
+            assignment[:self.count] = self.assignment[:self.count]
+            self.assignment = assignment
+
+    def _index_metadata(self, row: int, metadata: dict | None, add: bool):
+        for field, value in (metadata or {}).items():
+            if not _is_indexed(field):
+                continue
+            postings = self.postings.setdefault(field, {})
+            for v in _values(value):
+                rows = postings.setdefault(v, set())
+                if add:
+                    rows.add(row)
+                else:
+                    rows.discard(row)
+
+    def upsert(self, items):
+        items = list(items)
+        if not items:
+            return 0
+        self._grow(self.count + len(items))
+        for item_id, vector, metadata in items:
+            row = self.row_of.get(item_id)
+            if row is None:
+                row = self.count
+                self.count += 1
+                self.ids.append(item_id)
+                self.metadata.append(None)
+                self.row_of[item_id] = row
+            else:
+                self._index_metadata(row, self.metadata[row], add=False)
+            v = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(v)
+            self.vectors[row] = v / norm if norm else v
+            self.alive[row] = True
+            self.metadata[row] = metadata
+            self._index_metadata(row, metadata, add=True)
+            if self.centroids is not None:
+                self.assignment[row] = int(np.argmax(self.centroids @ self.vectors[row]))
+        return len(items)
+
+    def candidates(self, filter: dict | None):
+        """Rows allowed by the filter (None = every live row); non-indexed fields are checked per row."""
+        if not filter:
+            return None
+        rows = None
+        scan = {}
+        for field, condition in filter.items():
+            if not _is_indexed(field):
+                scan[field] = condition
+                continue
+            postings = self.postings.get(field, {})
+            if isinstance(condition, dict) and "$in" in condition:
+                wanted = set().union(*(postings.get(v, set()) for v in condition["$in"]))
+            elif isinstance(condition, dict) and "$eq" in condition:
+                wanted = postings.get(condition["$eq"], set())
+            elif isinstance(condition, dict):
+                raise ValueError(f"Unsupported filter operator in {condition!r}")
+            else:
+                wanted = postings.get(condition, set())
+            rows = wanted if rows is None else rows & wanted
+        if rows is None:
+            rows = np.flatnonzero(self.alive[:self.count])
+        rows = [r for r in rows if self.alive[r]]
+        if scan:
+            rows = [r for r in rows if all(_matches(self.metadata[r] or {}, f, c) for f, c in scan.items())]
+        return np.asarray(sorted(rows), dtype=np.int64)
+
+    def search(self, vector, top_k: int, filter: dict | None = None, nprobe: int | None = None):
+        if self.count == 0:
+            return []
+        q = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        q = q / norm if norm else q
+        rows = self.candidates(filter)
+        if nprobe and self.centroids is not None:
+            probe = np.argpartition(-(self.centroids @ q), min(nprobe, len(self.centroids)) - 1)[:nprobe]
+            in_probe = np.isin(self.assignment[:self.count], probe) & self.alive[:self.count]
+            rows = np.flatnonzero(in_probe) if rows is None else rows[in_probe[rows]]
+        if rows is not None and len(rows) <= SUBSET_SCAN_LIMIT:
+            if len(rows) == 0:
+                return []
+            scores = self.vectors[rows] @ q
+        else:
+            scores = self.vectors[:self.count] @ q
+            mask = self.alive[:self.count]
+            if rows is not None:
+                mask = np.zeros(self.count, dtype=bool)
+                mask[rows] = True
+            scores = np.where(mask, scores, -np.inf)
+            rows = np.arange(self.count)
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def delete(self, ids):
+        for item_id in ids:
+            row = self.row_of.pop(item_id, None)
+            if row is not None:
+                self._index_metadata(row, self.metadata[row], add=False)
+                self.alive[row] = False
+                self.metadata[row] = None
+
+    def train(self, nlist: int, iterations: int = 10, sample: int = 100_000, seed: int = 0):
+        """k-means on (a sample of) the live vectors; each row is then assigned to its nearest centroid."""
+        live = np.flatnonzero(self.alive[:self.count])
+        rng = np.random.default_rng(seed)
+        pick = live if len(live) <= sample else rng.choice(live, sample, replace=False)
+        data = self.vectors[pick]
+        centroids = data[rng.choice(len(data), min(nlist, len(data)), replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(data @ centroids.T, axis=1)
+            for c in range(len(centroids)):
+                members = data[labels == c]
+                if len(members):
+                    mean = members.mean(axis=0)
+                    centroids[c] = mean / (np.linalg.norm(mean) or 1.0)
+        self.centroids = centroids
+        self.assignment = np.full(self.vectors.shape[0], -1, dtype=np.int32)
+        for start in range(0, self.count, 65_536):
+            block = self.vectors[start:start + 65_536][: self.count - start]
+            self.assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+
+class LocalVectorIndex:
+    def __init__(self, dimension: int = 1536, path: str | None = None):
+        self.dimension = dimension
+        self.path = path
+        self.namespaces: dict[str, _Namespace] = {}
+        self._lock = threading.RLock()
+        if path and os.path.exists(os.path.join(path, "index.json")):
+            self.load(path)
+
+    def _ns(self, namespace: str | None) -> _Namespace:
+        namespace = namespace or ""
+        ns = self.namespaces.get(namespace)
+        if ns is None:
+            ns = self.namespaces[namespace] = _Namespace(self.dimension)
+        return ns
+
+    # --- Pinecone-compatible surface -------------------------------------------------------
+    def upsert(self, vectors, namespace: str | None = None, **kwargs):
+        """`vectors`: (id, values, metadata) tuples or {"id", "values", "metadata"} dicts."""
+        items = [
+            (v["id"], v["values"], v.get("metadata")) if isinstance(v, dict) else (v[0], v[1], v[2] if len(v) > 2 else None)
+            for v in vectors
+        ]
+        with self._lock:
+            return {"upserted_count": self._ns(namespace).upsert(items)}
+
+    def query(self, vector, top_k: int = 10, namespace: str | None = None, filter: dict | None = None,
+              include_metadata: bool = False, include_values: bool = False, nprobe: int | None = None, **kwargs):
+        with self._lock:
+            ns = self._ns(namespace)
+            hits = ns.search(vector, top_k, filter, nprobe)
+            matches = []
+            for row, score in hits:
+                match = {"id": ns.ids[row], "score": score}
+                if include_metadata:
+                    match["metadata"] = dict(ns.metadata[row] or {})
+                if include_values:
+                    match["values"] = ns.vectors[row].tolist()
+                matches.append(match)
+            return {"matches": matches, "namespace": namespace or ""}
+
+    def fetch(self, ids, namespace: str | None = None, **kwargs):
+        with self._lock:
+            ns = self._ns(namespace)
+            found = {}
+            for item_id in ids:
+                row = ns.row_of.get(item_id)
+                if row is not None:
+                    found[item_id] = {"id": item_id, "values": ns.vectors[row].tolist(), "metadata": dict(ns.metadata[row] or {})}
+            return {"vectors": found, "namespace": namespace or ""}
+
+    def update(self, id: str, values=None, set_metadata: dict | None = None, namespace: str | None = None, **kwargs):
+        with self._lock:
+            ns = self._ns(namespace)
+            row = ns.row_of.get(id)
+            if row is None:
+                return {}
+            metadata = dict(ns.metadata[row] or {})
+            metadata.update(set_metadata or {})
+            ns.upsert([(id, ns.vectors[row] if values is None else values, metadata)])
+            return {}
+
+    def delete(self, ids=None, namespace: str | None = None, delete_all: bool = False, **kwargs):
+        with self._lock:
+            if delete_all:
+                self.namespaces.pop(namespace or "", None)
+            else:
+                self._ns(namespace).delete(ids or [])
+            return {}
+
+    def list(self, prefix: str | None = None, limit: int = 100, namespace: str | None = None, **kwargs):
+        """IDs in `namespace`, optionally only those starting with `prefix`, in pages of `limit` like Pinecone's."""
+        with self._lock:
+            ids = [i for i in self._ns(namespace).row_of if not prefix or i.startswith(prefix)]
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def describe_index_stats(self, **kwargs):
+        with self._lock:
+            counts = {name: {"vector_count": len(ns.row_of)} for name, ns in self.namespaces.items()}
+            return {
+                "dimension": self.dimension,
+                "namespaces": counts,
+                "total_vector_count": sum(c["vector_count"] for c in counts.values()),
+            }
+
+    # --- local extras ----------------------------------------------------------------------
+    def train(self, nlist: int, namespace: str | None = None, **kwargs):
+        with self._lock:
+            self._ns(namespace).train(nlist, **kwargs)
+
+    def save(self, path: str | None = None):
+        path = path or self.path
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            names = []
+            for i, (name, ns) in enumerate(self.namespaces.items()):
+                live = np.flatnonzero(ns.alive[:ns.count])
+                ns.vectors[live].astype(np.float32).tofile(os.path.join(path, f"ns{i}.f32"))
+                with open(os.path.join(path, f"ns{i}.json"), "w") as f:
+                    json.dump({"ids": [ns.ids[r] for r in live], "metadata": [ns.metadata[r] for r in live]}, f)
+                names.append(name)
+            with open(os.path.join(path, "index.json"), "w") as f:
+                json.dump({"dimension": self.dimension, "namespaces": names}, f)
+
+    def load(self, path: str):
+        with open(os.path.join(path, "index.json")) as f:
+            info = json.load(f)
+        self.dimension = info["dimension"]
+        namespaces = {}
+        for i, name in enumerate(info["namespaces"]):
+            with open(os.path.join(path, f"ns{i}.json")) as f:
+                data = json.load(f)
+            ns = _Namespace(self.dimension)
+            count = len(data["ids"])
+            if count:
+                # read-only map; the first write copies it into memory (see _Namespace._grow)
+                ns.vectors = np.memmap(os.path.join(path, f"ns{i}.f32"), dtype=np.float32, mode="r", shape=(count, self.dimension))
+            ns.count = count
+            ns.ids = data["ids"]
+            ns.metadata = data["metadata"]
+            ns.row_of = {item_id: row for row, item_id in enumerate(ns.ids)}
+            ns.alive = np.ones(count, dtype=bool)
+            for row, metadata in enumerate(ns.metadata):
+                ns._index_metadata(row, metadata, add=True)
+            namespaces[name] = ns
+        with self._lock:
+            self.namespaces = namespaces
+
+
+class LocalVectorStore(VectorStore):
+    """LangChain wrapper over `LocalVectorIndex`; page content is kept under metadata["text"] like Pinecone."""
+
+    def __init__(self, index: LocalVectorIndex, embedding, namespace: str | None = None, text_key: str = "text"):
+        self.index = index
+        self._embedding = embedding
+        self.namespace = namespace
+        self.text_key = text_key
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def _entries(self, texts, vectors, metadatas, ids):
+        for i, (text, vector) in enumerate(zip(texts, vectors)):
+            metadata = dict(metadatas[i]) if metadatas else {}
+            metadata[self.text_key] = text
+            yield ids[i], vector, metadata
+
+    def add_texts(self, texts, metadatas=None, ids=None, namespace: str | None = None, **kwargs):
+        texts = list(texts)
+        # Random ids like PineconeVectorStore, so a second call adds vectors instead of overwriting
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        vectors = self._embedding.embed_documents(texts)
+        self.index.upsert(list(self._entries(texts, vectors, metadatas, ids)), namespace=namespace or self.namespace)
+        return ids
+
+    def _to_documents(self, result):
+        docs = []
+        for match in result["matches"]:
+            metadata = match.get("metadata") or {}
+            text = metadata.pop(self.text_key, "")
+            docs.append((Document(id=match["id"], page_content=text, metadata=metadata), match["score"]))
+        return docs
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4, filter: dict | None = None,
+                                               namespace: str | None = None, **kwargs):
+        result = self.index.query(embedding, top_k=k, namespace=namespace or self.namespace, filter=filter or None,
+                                  include_metadata=True)
+        return self._to_documents(result)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict | None = None,
+                                     namespace: str | None = None, **kwargs):
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k, filter, namespace)
+
+    async def asimilarity_search_with_score(self, query: str, k: int = 4, filter: dict | None = None,
+                                            namespace: str | None = None, **kwargs):
+        vector = await self._embedding.aembed_query(query)
+        return self.similarity_search_by_vector_with_score(vector, k, filter, namespace)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs):
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k, **kwargs)]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        return self._cosine_relevance_score_fn
+
+    def delete(self, ids=None, namespace: str | None = None, **kwargs):
+        self.index.delete(ids=ids, namespace=namespace or self.namespace)
+        return True
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, namespace: str | None = None,
+                   index: LocalVectorIndex | None = None, **kwargs):
+        index = index or LocalVectorIndex(dimension=len(embedding.embed_query("dimension probe")))
+        store = cls(index, embedding, namespace=namespace)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,172 @@
+"""
+Conversation memory for the chat chains.
+
+`ConversationBufferMemory` replays every turn into the condense prompt, so prompt size and
+condense latency grow with the conversation. `WindowedSummaryMemory` keeps only the last few
+turns verbatim and folds older ones into a running summary, capped by a token budget:
+
+- "window" mode folds locally (no LLM call): a short digest of the earlier questions plus the
+  session's entity context (active part/model/order from `resolve_entities`).
+- "summary" mode asks the chat LLM to extend a running summary when turns fall out of the window.
+
+The mode is picked with CHAT_MEMORY_MODE (buffer | window | summary).
+"""
+import os
+from typing import Any, Optional
+
+from langchain.memory import ConversationBufferMemory
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain_core.messages import BaseMessage, SystemMessage, get_buffer_string
+
+CHAT_MEMORY_MODE = os.getenv("CHAT_MEMORY_MODE", "buffer").lower()
+CHAT_MEMORY_WINDOW_TURNS = int(os.getenv("CHAT_MEMORY_WINDOW_TURNS", "4"))
+CHAT_MEMORY_MAX_TOKENS = int(os.getenv("CHAT_MEMORY_MAX_TOKENS", "1200"))
+
+# Earlier questions kept in the local digest, and how much of each
+DIGEST_QUESTIONS = 6
+DIGEST_QUESTION_CHARS = 120
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or its encoding files unavailable offline
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Keep the end of `text` (the most recent part of a summary) within `max_tokens`."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if _encoding is not None:
+        return _encoding.decode(_encoding.encode(text)[-max_tokens:])
+    return text[-max_tokens * 4:]
+
+
+def entity_digest(ctx: Optional[dict]) -> str:
+    if not ctx:
+        return ""
+    labels = (("active_part", "part"), ("active_model", "model"), ("active_order", "order"))
+    known = [f"{label} {ctx[key].upper()}" for key, label in labels if ctx.get(key)]
+    return "Currently discussed: " + ", ".join(known) + "." if known else ""
+
+
+class WindowedSummaryMemory(BaseChatMemory):
+    """Last `window_turns` turns verbatim, older turns in `summary`, all within `max_tokens`."""
+
+    memory_key: str = "chat_history"
+    window_turns: int = CHAT_MEMORY_WINDOW_TURNS
+    max_tokens: int = CHAT_MEMORY_MAX_TOKENS
+    summary: str = ""
+    entity_context: Optional[Any] = None
+    """The session's live entity context dict (typed Any so pydantic keeps the reference, not a copy)."""
+    summarizer: Optional[Any] = None
+    """LLM used to extend the summary; None folds turns into a local digest instead."""
+
+    @property
+    def memory_variables(self) -> list[str]:
+        return [self.memory_key]
+
+    def history_messages(self) -> list[BaseMessage]:
+        messages = list(self.chat_memory.messages)
+        if not messages and not self.summary:
+            # Nothing said yet: keep the history empty so the chain skips the condense step
+            return []
+        preamble = " ".join(p for p in (self.summary, entity_digest(self.entity_context)) if p)
+        if preamble:
+            messages = [SystemMessage(content=preamble)] + messages
+        return messages
+
+    def load_memory_variables(self, inputs: dict[str, Any]) -> dict[str, Any]:
+        messages = self.history_messages()
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages)}
+
+    def _split_overflow(self) -> tuple[list[BaseMessage], list[BaseMessage]]:
+        """Messages to fold into the summary, and the window that stays verbatim."""
+        messages = list(self.chat_memory.messages)
+        keep = 2 * max(self.window_turns, 1)
+        overflow, window = messages[:-keep], messages[-keep:]
+        # Shrink the window further while it alone blows the budget (always keep the last turn)
+        budget = self.max_tokens - count_tokens(self.summary)
+        while len(window) > 2 and count_tokens(get_buffer_string(window)) > budget:
+            overflow, window = overflow + window[:2], window[2:]
+        return overflow, window
+
+    def _digest(self, overflow: list[BaseMessage]) -> str:
+        earlier = [m.content[:DIGEST_QUESTION_CHARS] for m in overflow if m.type == "human"]
+        previous = self.summary.removeprefix("Earlier the user asked: ").split(" | ") if self.summary else []
+        questions = (previous + earlier)[-DIGEST_QUESTIONS:]
+        return "Earlier the user asked: " + " | ".join(questions)
+
+    def _fit(self, window: list[BaseMessage]):
+        self.chat_memory.messages = window
+        room = self.max_tokens - count_tokens(get_buffer_string(window))
+        self.summary = truncate_tokens(self.summary, room)
+
+    def prune(self):
+        overflow, window = self._split_overflow()
+        if not overflow:
+            return
+        if self.summarizer is None:
+            self.summary = self._digest(overflow)
+        else:
+            prompt = SUMMARY_PROMPT.format(summary=self.summary, new_lines=get_buffer_string(overflow))
+            self.summary = self.summarizer.invoke(prompt).content
+        self._fit(window)
+
+    async def aprune(self):
+        overflow, window = self._split_overflow()
+        if not overflow:
+            return
+        if self.summarizer is None:
+            self.summary = self._digest(overflow)
+        else:
+            prompt = SUMMARY_PROMPT.format(summary=self.summary, new_lines=get_buffer_string(overflow))
+            self.summary = (await self.summarizer.ainvoke(prompt)).content
+        self._fit(window)
+
+    def save_context(self, inputs: dict[str, Any], outputs: dict[str, str]) -> None:
+        super().save_context(inputs, outputs)
+        self.prune()
+
+    async def asave_context(self, inputs: dict[str, Any], outputs: dict[str, str]) -> None:
+        await super().asave_context(inputs, outputs)
+        await self.aprune()
+
+    def clear(self) -> None:
+        super().clear()
+        self.summary = ""
+
+
+def new_memory(ctx: Optional[dict] = None, mode: str = CHAT_MEMORY_MODE):
+    """Memory for one session. `ctx` is the session's entity context, used by the windowed modes."""
+    if mode == "buffer":
+        return ConversationBufferMemory(
+            memory_key="chat_history",
+            return_messages=True,
+            input_key="question",
+            output_key="answer"
+        )
+    if mode not in ("window", "summary"):
+        raise ValueError(f"Unknown CHAT_MEMORY_MODE {mode!r}")
+    summarizer = None
+    if mode == "summary":
+        from backend.resources import get_resources
+        summarizer = get_resources().llm
+    return WindowedSummaryMemory(
+        return_messages=True,
+        input_key="question",
+        output_key="answer",
+        entity_context=ctx,
+        summarizer=summarizer,
+    )
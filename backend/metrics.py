@@ -0,0 +1,304 @@
+"""
+Per-stage timing, token counts and cache counters for the chat pipeline, served on /metrics in
+the Prometheus text format.
+
+Stages are timed with `span`:
+
+    with get_metrics().span("vector_query"):
+        docs = await store.asimilarity_search(...)
+
+LLM calls are timed by a callback instead, since some of them happen inside LangChain: pass
+`llm_config(stage)` as the call's config, or the callback for a whole chain run whose
+sub-chains carry the stage as a tag (see `backend.core.build_chain`). The callback records the
+call's duration and its prompt and completion tokens, taken from the provider's usage report
+when there is one and counted locally otherwise.
+
+A chat turn runs inside `turn`, which times the whole turn and collects the spans of its own
+task. A sampled share of turns (METRICS_SAMPLE_RATE) is printed as one JSON line with the stage
+timings and the retrieved documents. This replaces the per-request document dumps.
+
+Counters that other components already keep (cache hits, single-flight joins, ...) are read
+from their `stats()` at scrape time rather than counted twice (see `render`).
+"""
+import bisect
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from backend.memory import count_tokens
+
+# Share of turns printed as a JSON trace with their retrieved documents; 0 turns the dumps off
+METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "0.01"))
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # labels -> [count per bucket (non-cumulative, last is +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[slot] += 1
+            self._values[key] = (counts, total + value)
+
+    def counts(self) -> dict:
+        """Observations so far per label values, e.g. {("vector_query",): 12}."""
+        with self._lock:
+            return {key: sum(counts) for key, (counts, _) in self._values.items()}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_label_text(names, key + (_number(bound),))} {cumulative}")
+                labels = _label_text(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_number(total)}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Trace:
+    """Stage timings of one turn, plus what a sampled dump prints."""
+
+    def __init__(self, endpoint: str, sampled: bool):
+        self.endpoint = endpoint
+        self.sampled = sampled
+        self.intent = ""
+        self.stages = {}
+        self.details = {}
+        self.documents = []
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def dump(self, seconds: float) -> dict:
+        return {
+            "endpoint": self.endpoint,
+            "intent": self.intent,
+            "seconds": round(seconds, 4),
+            "stages": {stage: round(s, 4) for stage, s in self.stages.items()},
+            **self.details,
+            "documents": [{"page_content": d.page_content[:300], "metadata": d.metadata} for d in self.documents],
+        }
+
+
+_trace = contextvars.ContextVar("partselect_trace", default=None)
+
+
+def current_trace():
+    """The running turn's `Trace`, or None outside of `Metrics.turn`."""
+    return _trace.get()
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """
+    Times LLM calls and counts their tokens, per stage: a stage tag on the call, or on one of
+    the chain runs it is nested in (a chain's own tags are not passed down to its children, so
+    the stage of each open chain run is tracked here), else `default_stage`.
+    """
+
+    run_inline = True
+
+    def __init__(self, metrics: "Metrics", default_stage: str = "llm"):
+        self.metrics = metrics
+        self.default_stage = default_stage
+        self._runs = {}
+        self._chains = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, tags, parent_run_id):
+        for tag in reversed(tags or []):
+            if tag in self.metrics.llm_stages:
+                return tag
+        return self._chains.get(parent_run_id)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, **kwargs):
+        with self._lock:
+            stage = self._stage(tags, parent_run_id)
+            if stage:
+                self._chains[run_id] = stage
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        with self._lock:
+            self._chains.pop(run_id, None)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.on_chain_end(None, run_id=run_id)
+
+    def _start(self, run_id, parent_run_id, tags, prompt: str):
+        with self._lock:
+            stage = self._stage(tags, parent_run_id) or self.default_stage
+            self._runs[run_id] = (stage, time.perf_counter(), prompt, current_trace())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, tags=None, **kwargs):
+        text = "\n".join(m.content if isinstance(m.content, str) else str(m.content) for batch in messages for m in batch)
+        self._start(run_id, parent_run_id, tags, text)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, tags=None, **kwargs):
+        self._start(run_id, parent_run_id, tags, "\n".join(prompts))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        stage, start, prompt, trace = run
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        completion = "".join(g.text for batch in response.generations for g in batch)
+        prompt_tokens = usage.get("prompt_tokens") or count_tokens(prompt)
+        completion_tokens = usage.get("completion_tokens") or count_tokens(completion)
+        self.metrics.observe(stage, time.perf_counter() - start, trace)
+        self.metrics.llm_tokens.observe(prompt_tokens, stage=stage, kind="prompt")
+        self.metrics.llm_tokens.observe(completion_tokens, stage=stage, kind="completion")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is not None:
+            self.metrics.errors.inc(stage=run[0])
+
+
+class Metrics:
+    llm_stages = ("condense", "answer_llm", "order_llm", "intent_llm")
+
+    def __init__(self, sample_rate: float = METRICS_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.stage_seconds = Histogram("partselect_stage_seconds", "Time spent per pipeline stage.",
+                                       LATENCY_BUCKETS, ("stage",))
+        self.turn_seconds = Histogram("partselect_turn_seconds", "Time per chat turn.",
+                                      LATENCY_BUCKETS, ("endpoint", "intent"))
+        self.llm_tokens = Histogram("partselect_llm_tokens", "Tokens per LLM call.",
+                                    TOKEN_BUCKETS, ("stage", "kind"))
+        self.errors = Counter("partselect_stage_errors_total", "Stages that raised.", ("stage",))
+        self.llm_callback = LLMMetricsCallback(self)
+
+    def observe(self, stage: str, seconds: float, trace=None):
+        self.stage_seconds.observe(seconds, stage=stage)
+        trace = trace or current_trace()
+        if trace is not None:
+            trace.add(stage, seconds)
+
+    @contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.errors.inc(stage=stage)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def llm_config(self, stage: str) -> dict:
+        """RunnableConfig for an LLM call timed as `stage`."""
+        return {"callbacks": [self.llm_callback], "tags": [stage]}
+
+    @asynccontextmanager
+    async def turn(self, endpoint: str):
+        """Times a chat turn; the yielded `Trace` takes the intent and documents for the dump."""
+        trace = Trace(endpoint, self.sample_rate > 0 and random.random() < self.sample_rate)
+        token = _trace.set(trace)
+        start = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            seconds = time.perf_counter() - start
+            try:
+                _trace.reset(token)
+            except ValueError:
+                # A streaming response's generator closed from another context
+                _trace.set(None)
+            self.turn_seconds.observe(seconds, endpoint=endpoint, intent=trace.intent)
+            if trace.sampled:
+                print("[trace] " + json.dumps(trace.dump(seconds), default=str))
+
+    def render(self, collected=()) -> str:
+        """
+        Text exposition of the metrics above, followed by `collected`: (name, type, help,
+        [(labels dict, value)]) tuples read from other components' counters at scrape time.
+        """
+        lines = []
+        for metric in (self.stage_seconds, self.turn_seconds, self.llm_tokens, self.errors):
+            lines += metric.render()
+        for name, kind, help, samples in collected:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for labels, value in samples:
+                lines.append(f"{name}{_label_text(tuple(labels), tuple(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
+
+
+def set_metrics(metrics: Metrics | None):
+    global _metrics
+    with _metrics_lock:
+        _metrics = metrics
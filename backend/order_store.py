@@ -0,0 +1,120 @@
+"""
+In-process order lookup keyed by `order_id_norm`.
+
+Order status/cancel/return answers only need one record by ID, so instead of a zero-vector
+Pinecone query we keep the transactions file in a dict. The records carry the same metadata
+fields that `data/pc_vdb.py` writes to the `transactions` namespace, so callers can't tell
+which source answered. Pinecone stays available as a fallback for IDs that are not local.
+"""
+import os
+import threading
+from langchain_core.documents import Document
+from backend.records import iter_records
+from backend.utils import norm
+
+TRANSACTIONS_PATH = os.getenv("TRANSACTIONS_PATH", "data/transactions_data.json")
+# Set ORDER_STORE_PINECONE_FALLBACK=0 to never go to the index for unknown order IDs
+PINECONE_FALLBACK = os.getenv("ORDER_STORE_PINECONE_FALLBACK", "1") == "1"
+
+
+def order_metadata(txn: dict) -> dict:
+    """Same shape as the metadata ingested for a transaction document."""
+    return {
+        "order_id": txn["order_id"],
+        "order_id_norm": norm(txn["order_id"]),
+        "customer_id": txn["customer_id"],
+        "customer_id_norm": norm(txn["customer_id"]),
+        "created_id": txn["created_id"],
+        "status": txn["status"],
+        "carrier": txn["carrier"],
+        "address_city": txn["address_city"],
+        "category": "transaction",
+        "item_part_numbers_norm": [norm(item["part_number"]) for item in txn["items"]],
+    }
+
+
+
+def transaction_document(txn: dict) -> Document:
+    """The `transactions` namespace document for one transaction record (embedded text + metadata)."""
+    items_str = "; ".join(
+        [f"{item['qty']}x {item['part_number']} @ ${item['price']}" for item in txn["items"]]
+    )
+    # Indented as it was in data/pc_vdb.py, so the text hashes of ingested documents still match
+    text = f"""
+        Order ID: {txn['order_id']}
+        Customer ID: {txn['customer_id']}
+        Created Date: {txn['created_id']}
+        Items: {items_str}
+        Address City: {txn['address_city']}
+        """
+    return Document(page_content=text, metadata=order_metadata(txn))
+
+class OrderStore:
+    def __init__(self, path: str = TRANSACTIONS_PATH, fallback=None):
+        """
+        `fallback(order_id)` is called for IDs that are not in the local file (e.g. the Pinecone query);
+        pass None to only answer from the file.
+        """
+        self.path = path
+        self.fallback = fallback
+        self._orders: dict[str, dict] = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> int:
+        """Re-read the transactions file and swap the table in one step. Returns the number of orders."""
+        with self._lock:
+            orders = {}
+            mtime = None
+            if os.path.exists(self.path):
+                mtime = os.path.getmtime(self.path)
+                for txn in iter_records(self.path):
+                    meta = order_metadata(txn)
+                    orders[meta["order_id_norm"]] = meta
+            self._orders = orders
+            self._mtime = mtime
+            return len(orders)
+
+    def refresh(self) -> bool:
+        """Reload only if the file changed on disk since the last load."""
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime != self._mtime:
+            self.reload()
+            return True
+        return False
+
+    def get(self, order_id: str):
+        meta = self._orders.get(norm(order_id))
+        if meta is None and self.fallback is not None:
+            meta = self.fallback(order_id)
+        return meta
+
+    def __len__(self):
+        return len(self._orders)
+
+    def __contains__(self, order_id: str):
+        return norm(order_id) in self._orders
+
+
+_order_store = None
+_order_store_lock = threading.Lock()
+
+
+def get_order_store() -> OrderStore:
+    global _order_store
+    if _order_store is None:
+        with _order_store_lock:
+            if _order_store is None:
+                fallback = None
+                if PINECONE_FALLBACK:
+                    from backend.core import pinecone_search_order
+                    fallback = pinecone_search_order
+                _order_store = OrderStore(fallback=fallback)
+    return _order_store
+
+
+def set_order_store(store: OrderStore | None):
+    global _order_store
+    with _order_store_lock:
+        _order_store = store
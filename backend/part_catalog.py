@@ -0,0 +1,179 @@
+"""
+Keyed part catalog: the product documents by `part_number_norm` and `manufacturer_part_number_norm`.
+
+When a turn names a part, the retrieval filter pins `part_number_norm` and the vector search can
+only return that one document, so `CatalogRetriever` hands the catalog's copy of it straight
+to the answer prompt and skips the query embedding and the vector store round trip. Documents
+are built by `product_document`, the same function ingestion uses, so both paths produce
+identical text and metadata. Anything the catalog doesn't hold goes to the vector store.
+"""
+import os
+import re
+import threading
+from typing import Any
+
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStoreRetriever
+
+from backend.metrics import get_metrics
+from backend.records import iter_records
+from backend.utils import norm
+
+PARTS_PATH = os.getenv("PARTS_PATH", "data/parts_data.json")
+TOKEN_RE = re.compile(r"\b[A-Za-z0-9][A-Za-z0-9-]{4,}\b")
+
+
+def product_document(part: dict) -> Document:
+    """The `products` namespace document for one parts record (embedded text + metadata)."""
+    # Price is metadata only (see data/pc_vdb.py), the document prompt still renders it
+    text = f"""
+        Part Number: {part['part_number']}
+        Name: {part['name']}
+        Category: {part['category']}
+        Manufacturer: {part['manufacturer']}
+        Manufacturer Part Number: {part['manufacturer_part_number']}
+        Description: {part['description']}
+        Installation Guide: {part['installation_guide']}
+        Troubleshooting: {part['troubleshooting']}
+        Compatible Models: {', '.join(part['compatible_models'])}
+        Compatible Brands: {', '.join(part['compatible_brands'])}
+        """
+    metadata = {
+        "part_number": part["part_number"],
+        "part_number_norm": norm(part["part_number"]),
+        "name": part["name"],
+        "category": part["category"],
+        "price": part["price"],
+        "manufacturer": part["manufacturer"],
+        "manufacturer_part_number": part["manufacturer_part_number"],
+        "manufacturer_part_number_norm": norm(part["manufacturer_part_number"]),
+        "troubleshooting": part["troubleshooting"],
+        "installation_guide": part["installation_guide"],
+        "compatible_models": part["compatible_models"],
+        "compatible_models_norm": [norm(model) for model in part["compatible_models"]]
+    }
+    return Document(page_content=text, metadata=metadata)
+
+
+class PartCatalog:
+    def __init__(self, path: str = PARTS_PATH):
+        self.path = path
+        self._mtime = None
+        self._lock = threading.Lock()
+        # Separate from `_lock` so counting a lookup never waits for a reload
+        self._count_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reload()
+
+    def reload(self) -> int:
+        """Re-read the parts file and swap the tables in one step. Returns the number of parts."""
+        with self._lock:
+            by_part, by_mpn = {}, {}
+            mtime = None
+            if os.path.exists(self.path):
+                mtime = os.path.getmtime(self.path)
+                for part in iter_records(self.path):
+                    doc = product_document(part)
+                    key = doc.metadata["part_number_norm"]
+                    # A repeated part number keeps its first record, like ingestion
+                    if key in by_part:
+                        continue
+                    by_part[key] = doc
+                    # Several parts can share a manufacturer part number
+                    by_mpn.setdefault(doc.metadata["manufacturer_part_number_norm"], []).append(doc)
+            self.by_part, self.by_mpn = by_part, by_mpn
+            self._mtime = mtime
+            return len(by_part)
+
+    def refresh(self) -> bool:
+        """Reload only if the parts file changed on disk since the last load."""
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime != self._mtime:
+            self.reload()
+            return True
+        return False
+
+    def lookup(self, field: str, value: str) -> list[Document]:
+        if field == "part_number_norm":
+            doc = self.by_part.get(norm(value))
+            return [doc] if doc else []
+        if field == "manufacturer_part_number_norm":
+            return self.by_mpn.get(norm(value), [])
+        return []
+
+    def count(self, hit: bool):
+        with self._count_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def find_manufacturer_part_number(self, text: str):
+        """First token of `text` that is a known manufacturer part number (normalized), if any."""
+        for token in TOKEN_RE.findall(text or ""):
+            if norm(token) in self.by_mpn:
+                return norm(token)
+        return None
+
+    def __len__(self):
+        return len(self.by_part)
+
+    def stats(self) -> dict:
+        with self._count_lock:
+            hits, misses = self.hits, self.misses
+        return {"parts": len(self.by_part), "manufacturer_part_numbers": len(self.by_mpn),
+                "hits": hits, "misses": misses}
+
+
+class CatalogRetriever(VectorStoreRetriever):
+    """
+    Vector store retriever that answers `part_number_norm` / `manufacturer_part_number_norm`
+    `$eq` filters from the catalog and only searches the vector store otherwise.
+    """
+    catalog: Any = None
+
+    def _catalog_documents(self):
+        filter = self.search_kwargs.get("filter") or {}
+        for field in ("part_number_norm", "manufacturer_part_number_norm"):
+            condition = filter.get(field)
+            value = condition.get("$eq") if isinstance(condition, dict) else condition
+            if isinstance(value, str):
+                docs = self.catalog.lookup(field, value)[: self.search_kwargs.get("k", 4)]
+                self.catalog.count(hit=bool(docs))
+                if docs:
+                    return docs
+        return None
+
+    def _get_relevant_documents(self, query, *, run_manager, **kwargs):
+        docs = self._catalog_documents()
+        if docs is not None:
+            return docs
+        with get_metrics().span("vector_query"):
+            return super()._get_relevant_documents(query, run_manager=run_manager, **kwargs)
+
+    async def _aget_relevant_documents(self, query, *, run_manager, **kwargs):
+        docs = self._catalog_documents()
+        if docs is not None:
+            return docs
+        with get_metrics().span("vector_query"):
+            return await super()._aget_relevant_documents(query, run_manager=run_manager, **kwargs)
+
+
+_part_catalog = None
+_part_catalog_lock = threading.Lock()
+
+
+def get_part_catalog() -> PartCatalog:
+    global _part_catalog
+    if _part_catalog is None:
+        with _part_catalog_lock:
+            if _part_catalog is None:
+                _part_catalog = PartCatalog()
+    return _part_catalog
+
+
+def set_part_catalog(catalog: PartCatalog | None):
+    global _part_catalog
+    with _part_catalog_lock:
+        _part_catalog = catalog
@@ -0,0 +1,155 @@
+"""
+Offline stand-ins for the upstream services, so the whole /chat pipeline runs without network
+access and gives the same answers on every run.
+
+- `HashedEmbeddings`: word and character-trigram features hashed into a fixed-size vector
+  (blake2b, stable across processes), so similar texts still land near each other.
+- `StubChatModel`: answers after a fixed first-token latency plus a per-token delay, streaming
+  token by token. The reply is either fixed or built from the prompt with a prompt-seeded RNG.
+- `memory_index`: a `LocalVectorIndex` without a file, filled from the parts and transactions
+  files at startup with the same documents and IDs as `data/pc_vdb.py` writes.
+
+`backend/resources.py` picks them by config (PROVIDERS=offline, or per service with
+LLM_PROVIDER, EMBEDDING_PROVIDER and VECTOR_BACKEND).
+"""
+import asyncio
+import hashlib
+import os
+import random
+import re
+import time
+import zlib
+from typing import Any
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from backend.records import doc_id, iter_records
+
+# Seconds before the stub's first token, and its generation speed (0 = all tokens at once)
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "0"))
+LLM_STUB_TOKENS_PER_SECOND = float(os.getenv("LLM_STUB_TOKENS_PER_SECOND", "0"))
+# Words per stub answer when no fixed reply is set
+LLM_STUB_REPLY_TOKENS = int(os.getenv("LLM_STUB_REPLY_TOKENS", "40"))
+LLM_STUB_REPLY = os.getenv("LLM_STUB_REPLY") or None
+# Simulated round trip per embeddings call of the hashed embedder
+EMBEDDING_STUB_LATENCY_MS = float(os.getenv("EMBEDDING_STUB_LATENCY_MS", "0"))
+# Source files of the in-memory index (VECTOR_BACKEND=memory)
+PARTS_PATH = os.getenv("PARTS_PATH", "data/parts_data.json")
+TRANSACTIONS_PATH = os.getenv("TRANSACTIONS_PATH", "data/transactions_data.json")
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashedEmbeddings(Embeddings):
+    """Deterministic embeddings from hashed word and character-trigram counts."""
+
+    def __init__(self, size: int = 1536, delay: float = EMBEDDING_STUB_LATENCY_MS / 1000):
+        self.size = size
+        self.delay = delay
+        self.calls = 0
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for word in WORD_RE.findall(text.lower()):
+            grams = [word] + [word[i:i + 3] for i in range(max(1, len(word) - 2))]
+            for gram in grams:
+                h = int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=8).digest(), "little")
+                vector[h % self.size] += 1.0 if h >> 63 else -1.0
+        length = np.linalg.norm(vector)
+        return (vector / length if length else vector).tolist()
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return [self._embed(t) for t in texts]
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Answers after `delay` seconds plus `token_delay` per whitespace token of the reply; the async
+    paths sleep without blocking the loop and `_astream` yields token by token. Without a fixed
+    `reply`, the answer is `reply_tokens` words of the prompt picked by an RNG seeded with the
+    prompt, so the same prompt always gets the same answer.
+    """
+    delay: float = LLM_STUB_LATENCY_MS / 1000
+    token_delay: float = 1 / LLM_STUB_TOKENS_PER_SECOND if LLM_STUB_TOKENS_PER_SECOND > 0 else 0.0
+    reply: str | None = LLM_STUB_REPLY
+    reply_tokens: int = LLM_STUB_REPLY_TOKENS
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _answer(self, messages) -> str:
+        if self.reply is not None:
+            return self.reply
+        prompt = "\n".join(m.content if isinstance(m.content, str) else str(m.content) for m in messages)
+        words = WORD_RE.findall(prompt.lower()) or ["stub"]
+        rng = random.Random(zlib.crc32(prompt.encode()))
+        return " ".join(rng.choice(words) for _ in range(self.reply_tokens))
+
+    def _tokens(self, answer: str):
+        return [t + " " for t in answer.split(" ")]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        answer = self._answer(messages)
+        time.sleep(self.delay + self.token_delay * len(self._tokens(answer)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=answer))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        answer = self._answer(messages)
+        await asyncio.sleep(self.delay + self.token_delay * len(self._tokens(answer)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=answer))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        for token in self._tokens(self._answer(messages)):
+            await asyncio.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+def memory_index(embeddings, dimension: int = 1536, parts_path: str = PARTS_PATH,
+                 transactions_path: str = TRANSACTIONS_PATH):
+    """
+    In-process index holding the `products` and `transactions` namespaces as ingestion would
+    write them. A repeated ID keeps its first document, as in `VectorStore.sync_namespace`.
+    """
+    from backend.local_index import LocalVectorIndex
+    from backend.order_store import transaction_document
+    from backend.part_catalog import product_document
+
+    index = LocalVectorIndex(dimension=dimension)
+    start = time.perf_counter()
+    for namespace, path, build in (("products", parts_path, product_document),
+                                   ("transactions", transactions_path, transaction_document)):
+        docs = {}
+        for record in iter_records(path):
+            doc = build(record)
+            docs.setdefault(doc_id(namespace, doc.metadata), doc)
+        vectors = embeddings.embed_documents([d.page_content for d in docs.values()])
+        index.upsert(vectors=[(key, vector, {**d.metadata, "text": d.page_content})
+                              for (key, d), vector in zip(docs.items(), vectors)], namespace=namespace)
+    print(f"[providers] in-memory index: {index.describe_index_stats()['total_vector_count']} vectors "
+          f"in {time.perf_counter() - start:.2f}s")
+    return index
@@ -0,0 +1,55 @@
+"""
+Record readers for the data files (parts, transactions) shared by ingestion and the backend.
+
+Both the original pretty-printed JSON arrays and the JSONL files written by
+`data/synth_data.py` are read one record at a time, so large catalogs never have to be
+loaded whole.
+"""
+import json
+
+# Stable vector IDs: re-running ingestion overwrites the same vectors instead of adding copies
+ID_FIELDS = {"products": ("part", "part_number_norm"), "transactions": ("order", "order_id_norm")}
+
+
+def doc_id(namespace, metadata):
+    prefix, field = ID_FIELDS[namespace]
+    return f"{prefix}-{metadata[field]}"
+
+
+def iter_records(path, chunk_size=1 << 16):
+    """
+    Yield the records of a JSONL file or of a JSON array file one at a time, reading the file in
+    `chunk_size` pieces, so only the record being parsed is held in memory.
+    """
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    decoder = json.JSONDecoder()
+    with open(path) as f:
+        buf, pos, eof = "", 0, False
+        started = False
+        while True:
+            # skip whitespace, the opening bracket and the separators between records
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == "," or (buf[pos] == "[" and not started)):
+                started = started or buf[pos] == "["
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                if pos >= len(buf):
+                    raise ValueError("need more input")
+                record, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    if buf[pos:].strip():
+                        raise
+                    return
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            yield record
+            pos = end
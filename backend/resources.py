@@ -0,0 +1,269 @@
+"""
+Process-wide registry for the heavy objects behind the chat pipeline.
+
+The Pinecone client/index, the embeddings model, the LLM clients and the parsed prompts are
+expensive to build and safe to share, so they are built once (at app startup via `warm()`) and
+every session's chain reuses them. A session only keeps its own memory and retriever settings.
+"""
+import os
+import threading
+import yaml
+from dotenv import load_dotenv
+from langchain.prompts import PromptTemplate
+
+load_dotenv()
+
+INDEX_NAME = "partselect-parts"
+PROMPT_PATH = "backend/prompt.yaml"
+EMBEDDING_MODEL = "text-embedding-3-small"
+NAMESPACES = ("products", "transactions")
+EMBEDDING_DIMENSION = 1536
+# "offline" defaults every service below to its local stand-in in backend/providers.py
+PROVIDERS = os.getenv("PROVIDERS", "live")
+OFFLINE = PROVIDERS == "offline"
+# "live" (DeepSeek / OpenAI) or "stub" for the deterministic stub chat model
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "stub" if OFFLINE else "live")
+# "openai" or "hashed" for the deterministic hashed-ngram embedder
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "hashed" if OFFLINE else "openai")
+# "pinecone", "local" for the in-process index in backend/local_index.py saved at LOCAL_INDEX_PATH,
+# or "memory" for one filled from the data files at startup
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "memory" if OFFLINE else "pinecone")
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "data/local_index")
+
+
+def load_prompt(path: str = PROMPT_PATH):
+    with open(path, "r") as file:
+        return yaml.safe_load(file)
+
+
+def build_prompts(system_prompt: str) -> dict:
+    """All the prompt templates used by the chains, built from the parsed prompt file."""
+    # """We will combine the prompt. There will also be a document prompt that will help in putting filters."""
+    qa_prompt = PromptTemplate(
+        input_variables=["context", "question"],
+        template=system_prompt
+    )
+
+    prod_doc_prompt = PromptTemplate(
+    input_variables=[
+        "page_content",
+        "part_number",
+        "name",
+        "manufacturer",
+        "manufacturer_part_number",
+        "category",
+        "price",
+        "installation_guide",
+        "troubleshooting",
+        "compatible_models"
+    ],
+    template=(
+        "Content: {page_content}\n"
+        "Part Number: {part_number}\n"
+        "Name: {name}\n"
+        "Manufacturer: {manufacturer}\n"
+        "Manufacturer Part Number: {manufacturer_part_number}\n"
+        "Category: {category}\n"
+        "Price: {price}\n"
+        "Installation Guide: {installation_guide}\n"
+        "Troubleshooting: {troubleshooting}\n"
+        "Compatible Models: {compatible_models}"
+        )
+    )
+
+    transaction_doc_prompt = PromptTemplate(
+    input_variables=[
+        "page_content",
+        "order_id",
+        "customer_id",
+        "created_id",
+        "status",
+        "carrier",
+        "item_part_numbers_norm",
+        "address_city"
+    ],
+    template=(
+        "Content: {page_content}\n"
+        "Order ID: {order_id}\n"
+        "Customer ID: {customer_id}\n"
+        "Created Date: {created_id}\n"
+        "Status: {status}\n"
+        "Carrier: {carrier}\n"
+        "Items: {item_part_numbers_norm}\n"
+        "Address City: {address_city}"
+        )
+    )
+
+    condense_prompt = PromptTemplate(
+    input_variables=["chat_history", "question"],
+    template=(
+        "Rewrite the user’s follow-up as a standalone query.\n"
+        "If the user says things like 'this part' or 'does this', resolve them using the most recently mentioned part number "
+        "or model in the chat history. Include those IDs explicitly.\n\n"
+        "Chat history:\n{chat_history}\n\n"
+        "Follow-up: {question}\n\n"
+        "Standalone query:"
+    )
+)
+
+    # Low-confidence turns of the local intent classifier (backend/intent_classifier.py)
+    intent_prompt = PromptTemplate(
+    input_variables=["context", "question"],
+    template=(
+        "Classify the customer's message for an appliance parts store.\n"
+        "products: parts, models, compatibility, installation, troubleshooting, prices.\n"
+        "order: a specific order of theirs - status, tracking, cancelling, returning or refunding it.\n"
+        "policy: store policies in general - shipping, delivery times, returns, refunds, cancellations, warranty.\n\n"
+        "{context}\n"
+        "Message: {question}\n\n"
+        "Answer with one word: products, order or policy."
+    )
+)
+
+    # Documents already rendered by backend/context_packer.py
+    packed_doc_prompt = PromptTemplate(input_variables=["page_content"], template="{page_content}")
+
+    return {
+        "qa": qa_prompt,
+        "condense": condense_prompt,
+        "products": prod_doc_prompt,
+        "transactions": transaction_doc_prompt,
+        "packed": packed_doc_prompt,
+        "intent": intent_prompt,
+    }
+
+
+class Resources:
+    """
+    Lazily built, shared clients. Anything passed to the constructor is used as-is, which is how
+    benchmarks and local runs swap in stand-ins for the live services; the settings above build
+    the offline ones from backend/providers.py instead.
+    """
+
+    def __init__(self, index=None, embeddings=None, llm=None, llm_open=None,
+                 vector_stores=None, prompt_path: str = PROMPT_PATH):
+        self._index = index
+        self._embeddings = embeddings
+        self._llm = llm
+        self._llm_open = llm_open
+        self._vector_stores = dict(vector_stores or {})
+        self._prompts = None
+        self.prompt_path = prompt_path
+        self._lock = threading.RLock()
+
+    @property
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None and VECTOR_BACKEND == "local":
+                    from backend.local_index import LocalVectorIndex
+                    self._index = LocalVectorIndex(dimension=EMBEDDING_DIMENSION, path=LOCAL_INDEX_PATH)
+                elif self._index is None and VECTOR_BACKEND == "memory":
+                    from backend.providers import memory_index
+                    self._index = memory_index(self.embeddings, dimension=EMBEDDING_DIMENSION)
+                elif self._index is None:
+                    from pinecone import Pinecone
+                    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+                    self._index = pc.Index(INDEX_NAME)
+        return self._index
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None and EMBEDDING_PROVIDER == "hashed":
+                    from backend.embedding_cache import CachedEmbeddings
+                    from backend.providers import HashedEmbeddings
+                    # Memory-only cache, so hit rates match a live run without writing to the shared cache
+                    self._embeddings = CachedEmbeddings(HashedEmbeddings(EMBEDDING_DIMENSION), model_name="hashed", path=None)
+                elif self._embeddings is None:
+                    from langchain_openai import OpenAIEmbeddings
+                    from backend.embedding_cache import CachedEmbeddings
+                    self._embeddings = CachedEmbeddings(OpenAIEmbeddings(model=EMBEDDING_MODEL), model_name=EMBEDDING_MODEL)
+        return self._embeddings
+
+    @property
+    def llm(self):
+        """Answer/condense model used by the retrieval chains."""
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None and LLM_PROVIDER == "stub":
+                    from backend.providers import StubChatModel
+                    self._llm = StubChatModel()
+                elif self._llm is None:
+                    from langchain_deepseek import ChatDeepSeek
+                    self._llm = ChatDeepSeek(
+                        model="deepseek-chat",
+                        temperature=0.0,
+                        max_tokens=None
+                    )
+        return self._llm
+
+    @property
+    def llm_open(self):
+        """OpenAI model used for the free-form order questions."""
+        if self._llm_open is None:
+            with self._lock:
+                if self._llm_open is None and LLM_PROVIDER == "stub":
+                    from backend.providers import StubChatModel
+                    self._llm_open = StubChatModel()
+                elif self._llm_open is None:
+                    from langchain_openai import ChatOpenAI
+                    self._llm_open = ChatOpenAI(model="gpt-4", temperature=0.2)
+        return self._llm_open
+
+    @property
+    def prompts(self) -> dict:
+        if self._prompts is None:
+            with self._lock:
+                if self._prompts is None:
+                    self._prompts = build_prompts(load_prompt(self.prompt_path)["system_prompt"])
+        return self._prompts
+
+    def vector_store(self, namespace: str = "products"):
+        store = self._vector_stores.get(namespace)
+        if store is None:
+            with self._lock:
+                store = self._vector_stores.get(namespace)
+                if store is None and VECTOR_BACKEND in ("local", "memory"):
+                    from backend.local_index import LocalVectorStore
+                    store = LocalVectorStore(self.index, self.embeddings, namespace=namespace)
+                    self._vector_stores[namespace] = store
+                elif store is None:
+                    from langchain_pinecone import PineconeVectorStore
+                    store = PineconeVectorStore(
+                        index=self.index,
+                        embedding=self.embeddings,
+                        namespace=namespace,
+                    )
+                    self._vector_stores[namespace] = store
+        return store
+
+    def warm(self):
+        """Build everything up front so the first request of a session does not pay for it."""
+        self.prompts
+        self.llm
+        self.llm_open
+        for namespace in NAMESPACES:
+            self.vector_store(namespace)
+        return self
+
+
+_resources = None
+_resources_lock = threading.Lock()
+
+
+def get_resources() -> Resources:
+    global _resources
+    if _resources is None:
+        with _resources_lock:
+            if _resources is None:
+                _resources = Resources()
+    return _resources
+
+
+def set_resources(resources: Resources | None):
+    """Replace the process-wide registry (used by benchmarks and local stand-ins)."""
+    global _resources
+    with _resources_lock:
+        _resources = resources
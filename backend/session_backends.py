@@ -0,0 +1,151 @@
+"""
+Shared storage for session state, so any worker can serve any turn of a conversation and a
+restart does not lose it.
+
+A record is the entity context plus the conversation memory, encoded as compact JSON
+(`encode_record`). Chains are never stored: the session store rebuilds them on demand from the
+shared resources. Every save bumps a per-session version, which lets a worker that already has
+the session cached tell whether another worker has written a newer turn.
+
+Backend calls block (SQLite I/O), so the async request handlers go through
+`SessionStore.aget_or_create` / `acommit`, which run them on a worker thread.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+def encode_record(record: dict) -> bytes:
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def decode_record(data: bytes) -> dict:
+    return json.loads(data)
+
+
+class SessionBackend(ABC):
+    """Interface for session persistence. Versions start at 1 and grow on every save."""
+
+    @abstractmethod
+    def load(self, session_id: str) -> tuple[int, dict] | None:
+        ...
+
+    @abstractmethod
+    def version(self, session_id: str) -> int | None:
+        ...
+
+    @abstractmethod
+    def save(self, session_id: str, record: dict) -> int:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        ...
+
+    @abstractmethod
+    def purge(self, older_than: float) -> int:
+        """Drop sessions last written before the given wall-clock time. Returns how many."""
+
+
+class InMemorySessionBackend(SessionBackend):
+    """Process-local backend; keeps the encoded records so evicted sessions can still be restored."""
+
+    def __init__(self):
+        self._records: dict[str, tuple[int, float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        entry = self._records.get(session_id)
+        if entry is None:
+            return None
+        return entry[0], decode_record(entry[2])
+
+    def version(self, session_id):
+        entry = self._records.get(session_id)
+        return entry[0] if entry else None
+
+    def save(self, session_id, record):
+        data = encode_record(record)
+        with self._lock:
+            entry = self._records.get(session_id)
+            version = entry[0] + 1 if entry else 1
+            self._records[session_id] = (version, time.time(), data)
+        return version
+
+    def delete(self, session_id):
+        with self._lock:
+            self._records.pop(session_id, None)
+
+    def purge(self, older_than):
+        with self._lock:
+            stale = [sid for sid, (_, updated, _) in self._records.items() if updated < older_than]
+            for sid in stale:
+                del self._records[sid]
+        return len(stale)
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    Single-file backend that several uvicorn workers on one host can share. WAL mode lets readers
+    proceed while another worker writes; each thread gets its own connection.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, version INTEGER NOT NULL, updated REAL NOT NULL, data BLOB NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(updated)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id):
+        row = self._conn().execute("SELECT version, data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        return row[0], decode_record(row[1])
+
+    def version(self, session_id):
+        row = self._conn().execute("SELECT version FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def save(self, session_id, record):
+        row = self._conn().execute(
+            "INSERT INTO sessions (id, version, updated, data) VALUES (?, 1, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET version = version + 1, updated = excluded.updated, data = excluded.data "
+            "RETURNING version",
+            (session_id, time.time(), encode_record(record)),
+        ).fetchone()
+        return row[0]
+
+    def delete(self, session_id):
+        self._conn().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def purge(self, older_than):
+        return self._conn().execute("DELETE FROM sessions WHERE updated < ?", (older_than,)).rowcount
+
+
+def backend_from_env() -> SessionBackend | None:
+    """SESSION_BACKEND: unset/"" (state lives only in the worker), "memory" or "sqlite" (SESSION_DB_PATH)."""
+    kind = os.getenv("SESSION_BACKEND", "").lower()
+    if kind == "memory":
+        return InMemorySessionBackend()
+    if kind == "sqlite":
+        return SQLiteSessionBackend(os.getenv("SESSION_DB_PATH", "sessions.sqlite3"))
+    if kind:
+        raise ValueError(f"Unknown SESSION_BACKEND {kind!r}")
+    return None
@@ -0,0 +1,287 @@
+"""
+Bounded store for everything the backend keeps per chat session.
+
+One `SessionState` per session holds the conversation memory, the chains built for it and the
+entity context (active part/model/order) that `resolve_entities` maintains. The store evicts
+sessions that were idle longer than the TTL and, once it is over its entry or byte budget, the
+least recently used ones. Sizes are estimates (message text plus a fixed per-session overhead),
+which is enough to keep a worker's footprint proportional to the budget, not to traffic.
+
+With a `SessionBackend` (see backend/session_backends.py) the store is a per-worker cache in
+front of shared state: sessions missing locally, or written by another worker since, are
+restored from the backend, and `commit()` writes the context and memory back after each turn.
+Async callers use `aget_or_create` / `acommit`, which keep the backend's I/O off the event loop.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from backend.session_backends import SessionBackend, backend_from_env
+
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", "0")) or None   # 0 = no byte budget
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+# How many new sessions between sweeps of expired records in the shared backend
+BACKEND_PURGE_EVERY = 1000
+
+# Rough resident cost of a session before any messages: state object, memory, chain wrappers
+SESSION_BASE_BYTES = 4096
+
+
+def new_context() -> dict:
+    return {"active_part": None, "active_model": None, "active_order": None}
+
+
+def dump_messages(messages) -> list:
+    """Compact [role, text] pairs; the chat memory only ever holds human/AI turns."""
+    return [["h" if message.type == "human" else "a", message.content] for message in messages]
+
+
+def load_messages(pairs: list) -> list:
+    from langchain_core.messages import AIMessage, HumanMessage
+    return [HumanMessage(content=text) if role == "h" else AIMessage(content=text) for role, text in pairs]
+
+
+def default_memory(ctx: dict | None = None):
+    from backend.memory import new_memory
+    return new_memory(ctx)
+
+
+class SessionState:
+    __slots__ = ("session_id", "ctx", "chains", "_memory", "_memory_factory", "last_seen", "size", "version")
+
+    def __init__(self, session_id: str, memory_factory=default_memory, now: float = 0.0):
+        self.session_id = session_id
+        self.ctx = new_context()
+        self.chains = {}
+        self._memory = None
+        self._memory_factory = memory_factory
+        self.last_seen = now
+        self.size = SESSION_BASE_BYTES
+        self.version = 0
+
+    @property
+    def memory(self):
+        """Created on first use, so tool-only sessions (order status, policies) never pay for it."""
+        if self._memory is None:
+            self._memory = self._memory_factory(self.ctx)
+        return self._memory
+
+    @property
+    def has_memory(self) -> bool:
+        return self._memory is not None
+
+    def to_record(self) -> dict:
+        record = {"ctx": self.ctx, "updated": time.time()}
+        if self._memory is not None:
+            record["messages"] = dump_messages(self._memory.chat_memory.messages)
+            if getattr(self._memory, "summary", None):
+                record["summary"] = self._memory.summary
+        return record
+
+    def restore(self, version: int, record: dict):
+        """Bring this state up to a stored record; chains keep pointing at the same memory object."""
+        self.ctx.update(record.get("ctx") or {})
+        if record.get("messages") is not None:
+            self.memory.chat_memory.messages = load_messages(record["messages"])
+            if hasattr(self._memory, "summary"):
+                self._memory.summary = record.get("summary", "")
+        self.version = version
+
+    def estimate_size(self) -> int:
+        size = SESSION_BASE_BYTES
+        if self._memory is not None:
+            for message in self._memory.chat_memory.messages:
+                size += len(message.content) + 64
+            size += len(getattr(self._memory, "summary", ""))
+        return size
+
+
+class SessionStore:
+    def __init__(self, max_entries: int | None = SESSION_MAX_ENTRIES, max_bytes: int | None = SESSION_MAX_BYTES,
+                 ttl_seconds: float | None = SESSION_TTL_SECONDS, memory_factory=default_memory, clock=time.monotonic,
+                 backend: SessionBackend | None = None):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.memory_factory = memory_factory
+        self.clock = clock
+        self._sessions: OrderedDict[str, SessionState] = OrderedDict()
+        self._lock = threading.RLock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {"ttl": 0, "lru": 0}
+        self.restores = 0
+        self.saves = 0
+        self._created = 0
+
+    def _expired(self, state: SessionState, now: float) -> bool:
+        return self.ttl_seconds is not None and now - state.last_seen > self.ttl_seconds
+
+    def _drop(self, session_id: str, reason: str):
+        state = self._sessions.pop(session_id)
+        self.resident_bytes -= state.size
+        self.evictions[reason] += 1
+
+    def _evict(self, now: float):
+        # The dict is ordered by last access, so expired sessions are always at the front
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if not self._expired(oldest, now):
+                break
+            self._drop(oldest_id, "ttl")
+        while self._sessions and (
+            (self.max_entries is not None and len(self._sessions) > self.max_entries)
+            or (self.max_bytes is not None and self.resident_bytes > self.max_bytes)
+        ):
+            self._drop(next(iter(self._sessions)), "lru")
+
+    def peek(self, session_id: str):
+        """Session state without counting a hit or refreshing its position (None if absent/expired)."""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None or self._expired(state, self.clock()):
+                return None
+            return state
+
+    def _insert(self, state: SessionState, now: float):
+        self._sessions[state.session_id] = state
+        self.resident_bytes += state.size
+        self._evict(now)
+
+    def _sync(self, session_id: str, state: SessionState | None, now: float):
+        """Refresh a cached state from the backend, or restore one this worker doesn't hold."""
+        if state is not None:
+            version = self.backend.version(session_id)
+            if version is None or version == state.version:
+                return state
+        loaded = self.backend.load(session_id)
+        if loaded is None:
+            return state
+        version, record = loaded
+        if self.ttl_seconds is not None and time.time() - record.get("updated", 0) > self.ttl_seconds:
+            return state
+        if state is None:
+            state = SessionState(session_id, self.memory_factory, now)
+            state.restore(version, record)
+            state.size = state.estimate_size()
+            self._insert(state, now)
+        else:
+            state.restore(version, record)
+        self.restores += 1
+        return state
+
+    def get(self, session_id: str):
+        with self._lock:
+            now = self.clock()
+            state = self._sessions.get(session_id)
+            if state is not None and self._expired(state, now):
+                self._drop(session_id, "ttl")
+                state = None
+            if self.backend is not None:
+                state = self._sync(session_id, state, now)
+            if state is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            state.last_seen = now
+            self._sessions.move_to_end(session_id)
+            return state
+
+    def get_or_create(self, session_id: str) -> SessionState:
+        with self._lock:
+            state = self.get(session_id)
+            if state is None:
+                now = self.clock()
+                state = SessionState(session_id, self.memory_factory, now)
+                self._insert(state, now)
+                self._created += 1
+                if self.backend is not None and self.ttl_seconds is not None and self._created % BACKEND_PURGE_EVERY == 0:
+                    self.backend.purge(time.time() - self.ttl_seconds)
+            return state
+
+    async def aget_or_create(self, session_id: str) -> SessionState:
+        """`get_or_create` on a worker thread when a backend may have to be read."""
+        if self.backend is None:
+            return self.get_or_create(session_id)
+        return await asyncio.to_thread(self.get_or_create, session_id)
+
+    def account(self, session_id: str):
+        """Re-estimate a session's size after a turn and enforce the budgets."""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return
+            size = state.estimate_size()
+            self.resident_bytes += size - state.size
+            state.size = size
+            self._evict(self.clock())
+
+    def commit(self, session_id: str):
+        """End of a turn: update the size estimate and write the session to the backend, if any."""
+        with self._lock:
+            self.account(session_id)
+            state = self._sessions.get(session_id)
+            if state is not None and self.backend is not None:
+                state.version = self.backend.save(session_id, state.to_record())
+                self.saves += 1
+
+    async def acommit(self, session_id: str):
+        """`commit` on a worker thread when there is a backend to write to."""
+        if self.backend is None:
+            return self.commit(session_id)
+        await asyncio.to_thread(self.commit, session_id)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            state = self._sessions.pop(session_id, None)
+            if state is not None:
+                self.resident_bytes -= state.size
+            if self.backend is not None:
+                self.backend.delete(session_id)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str):
+        return self.peek(session_id) is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._sessions),
+                "resident_bytes": self.resident_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": dict(self.evictions),
+                "backend": type(self.backend).__name__ if self.backend is not None else None,
+                "restores": self.restores,
+                "saves": self.saves,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+_session_store = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    global _session_store
+    if _session_store is None:
+        with _session_store_lock:
+            if _session_store is None:
+                _session_store = SessionStore(backend=backend_from_env())
+    return _session_store
+
+
+def set_session_store(store: SessionStore | None):
+    global _session_store
+    with _session_store_lock:
+        _session_store = store
@@ -0,0 +1,74 @@
+"""
+Single-flight coalescing for the async `/chat` pipeline.
+
+During a spike many sessions ask the same thing at the same moment. `SingleFlight.do(key, factory)`
+runs `factory()` for the first caller of a key and lets every caller that arrives while it is
+still running await that same result (or exception) instead of starting its own upstream call.
+Nothing is kept once the call finishes; reuse across time is the answer cache's job
+(backend/answer_cache.py). Keys are built by the callers:
+
+- retrieval: ("retrieval", retriever type name, retriever mode, JSON of the retriever's
+  search_kwargs (filter, k), normalized question), built by
+  `PartSelectRetrievalChain._retrieval_key` for `_aget_docs`;
+- order lookups: ("order", order_id_norm), in `core.atransactions_search_order`;
+- answers: the answer cache key, in `app.run_chain`.
+
+Set SINGLE_FLIGHT=0 to give every caller its own call.
+"""
+import asyncio
+import os
+import threading
+
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "1") == "1"
+
+
+class SingleFlight:
+    def __init__(self, enabled: bool = SINGLE_FLIGHT):
+        self.enabled = enabled
+        self._calls: dict = {}
+        # Per kind of key ("retrieval", "order", ...): calls made, callers that joined one
+        self.leaders: dict = {}
+        self.joined: dict = {}
+
+    async def do(self, key: tuple, factory):
+        """(result, shared): `shared` is True when this caller joined another caller's call."""
+        kind = key[0]
+        if not self.enabled:
+            self.leaders[kind] = self.leaders.get(kind, 0) + 1
+            return await factory(), False
+        task = self._calls.get(key)
+        if task is not None:
+            self.joined[kind] = self.joined.get(kind, 0) + 1
+            # shield: a cancelled follower must not cancel the call the others are waiting on
+            return await asyncio.shield(task), True
+        self.leaders[kind] = self.leaders.get(kind, 0) + 1
+        task = asyncio.ensure_future(factory())
+        self._calls[key] = task
+        task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task), False
+
+    def __len__(self):
+        return len(self._calls)
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "in_flight": len(self._calls),
+                "calls": dict(self.leaders), "joined": dict(self.joined)}
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
+
+
+def set_single_flight(single_flight: SingleFlight | None):
+    global _single_flight
+    with _single_flight_lock:
+        _single_flight = single_flight
@@ -1,42 +1,50 @@
 import re
 import json
 from langchain_pinecone import PineconeVectorStore
-
-session_keeper = {}
+from backend.extractor import MODEL_PATTERN, ORDER_PATTERN, PART_PATTERN, Extraction, get_extractor
+from backend.session_store import get_session_store
 
 def norm(s):
     return s.lower().replace("-", "").replace(" ", "")
 
+# Patterns shared with the single-pass extractor (backend/extractor.py)
+PART_NUMBER_RE = re.compile(PART_PATTERN)    # PS followed by 6+ digits, with optional dash/space
+MODEL_NUMBER_RE = re.compile(MODEL_PATTERN)  # models like WDT780SAEM1, FGID2476SF, etc.
+ORDER_ID_RE = re.compile(ORDER_PATTERN)
+
 def extract_part_number(text):
-    # Matches PS followed by 6+ digits, with optional dash/space
-    match = re.search(r"\bPS[-\s]?\d{6,}\b", text, re.IGNORECASE)
+    match = PART_NUMBER_RE.search(text)
     if match:
         return match.group(0)
     return None
 
-def extract_model_number(text):
-    # Example: matches models like WDT780SAEM1, FGID2476SF, etc.
-    match = re.search(r"\b[A-Z]{2,}\d[A-Z0-9]+\b", text)
-    if match:
-        return match.group(0)
+def extract_model_number(text, exclude=()):
+    # MODEL_PATTERN also matches part and order numbers written in capitals; `exclude` skips those
+    skip = {norm(x) for x in exclude if x}
+    for match in MODEL_NUMBER_RE.finditer(text):
+        if norm(match.group(0)) not in skip:
+            return match.group(0)
     return None
 
-ORDER_ID_RE = re.compile(r"\bPSO\d{4}\b", re.IGNORECASE)
 def extract_order_id(text: str):
     m = ORDER_ID_RE.search(text or "")
     return m.group(0).upper() if m else None
 
-def resolve_entities(session_id, text):
-    part = extract_part_number(text)
-    model = extract_model_number(text)
-    order = extract_order_id(text)
-    ctx = session_keeper.setdefault(session_id, {"active_part": None, "active_model": None, "active_order": None})
+def extract(text: str) -> Extraction:
+    """IDs and keyword signals of a message in one pass (see backend/extractor.py)."""
+    return get_extractor().extract(text)
+
+def resolve_entities(session_id, text, extraction: Extraction | None = None, state=None):
+    """`state` is the session's already loaded state; without it the session store is asked."""
+    extraction = extraction or extract(text)
+    part, model, order = extraction.part, extraction.model, extraction.order
+    ctx = (state or get_session_store().get_or_create(session_id)).ctx
 
 
-    if not part and ("this part" in text.lower() or "does this part" in text.lower()):
+    if not part and "active_part" in extraction.references:
         part = ctx["active_part"]
 
-    if not order and "this order" in text.lower():
+    if not order and "active_order" in extraction.references:
         order = ctx["active_order"]
 
     ## If nothing is provided, previous can order_id or part_number can be referred to 
@@ -59,25 +67,57 @@ def resolve_entities(session_id, text):
 
 
 
-"""For routing to the correct namespace. We can add LLM Fallback if the user query is not clear."""
-TXN_ORDER_KWS = {"order", "status", "track", "tracking", "cancel", "return", "refund", "exchange", "city"}
-TXN_POLICY_KWS = {"shipping", "delivery", "policy", "refund policy", "return policy", "cancellation policy", "cancel policy"}
-def route_intent(text: str, session_id: str | None = None) -> str:
-    t = text.lower()
+"""
+Local rewrite for follow-ups, so the chain can skip its condense LLM call. A message is
+self-contained when it names a part/model/order itself and has no pronoun pointing back into
+the conversation; "this part" / "my model" style references are replaced with the session's
+active IDs. Anything else that refers back ("it", "that one", ...) returns None and the
+chain condenses with the LLM as before.
+"""
+ENTITY_REFS = [
+    (re.compile(r"\b(?:this|that|the same|the|my) part\b", re.IGNORECASE), "active_part", "part {}"),
+    (re.compile(r"\b(?:this|that|the same|the|my) (?:model|appliance|fridge|refrigerator|dishwasher)\b", re.IGNORECASE), "active_model", "model {}"),
+    (re.compile(r"\b(?:this|that|the same|my) order\b", re.IGNORECASE), "active_order", "order {}"),
+]
+BACK_REFERENCE_RE = re.compile(r"\b(?:it|its|this|that|these|those|they|them|one|same|above|previous|earlier)\b", re.IGNORECASE)
+
+def standalone_question(text: str, ctx: dict | None, extraction: Extraction | None = None):
+    rewritten = text
+    for pattern, key, label in ENTITY_REFS:
+        if pattern.search(rewritten):
+            if not (ctx and ctx.get(key)):
+                return None
+            rewritten = pattern.sub(label.format(ctx[key].upper()), rewritten)
+    if BACK_REFERENCE_RE.search(rewritten):
+        return None
+    if rewritten != text:
+        return rewritten
+    extraction = extraction or extract(text)
+    if extraction.part or extraction.model or extraction.order:
+        return text
+    return None
 
-    if any(k in t for k in TXN_POLICY_KWS):
-        return "transactions_policy"
-    
-    if any(k in t for k in TXN_ORDER_KWS):
-        return "transactions_order"
 
-    if extract_order_id(text):
+"""
+For routing to the correct namespace by keywords. The app routes with the local classifier in
+backend/intent_classifier.py and uses this with INTENT_ROUTER=keywords.
+The keyword lists per intent (policy before order) live in backend/intents.yaml.
+"""
+def route_intent(text: str, session_id: str | None = None, extraction: Extraction | None = None) -> str:
+    extractor = get_extractor()
+    extraction = extraction or extractor.extract(text)
+
+    intent = extractor.intent(extraction)
+    if intent:
+        return intent
+
+    if extraction.order:
         return "transactions_order"
-    if extract_part_number(text) or extract_model_number(text):
+    if extraction.part or extraction.model:
         return "products"
     if session_id:
-        ctx = session_keeper.get(session_id, {})
-        if ctx.get("active_order"):
+        state = get_session_store().peek(session_id)
+        if state and state.ctx.get("active_order"):
             return "transactions_order"
     return "products"
 
@@ -0,0 +1,104 @@
+"""
+Answer LLM calls and /chat latency for repeated product questions, with and without the answer cache.
+
+    python -m benchmarks.bench_answer_cache --llm-ms 600 --questions 200 --similarity 0.8
+
+Each question comes from a new session, drawn with a skew over a pool of part-number questions
+built from data/parts_data.json (a few popular parts, phrased a few ways), so many users ask
+effectively the same thing. Retrieval is the catalog + BM25 over the real parts file; the stub
+LLM sleeps `--llm-ms` per call. Runs: cache off, exact keys only, and exact + embedding
+similarity (hashed n-gram embedder). A last step changes one cached part's document, like a
+re-ingestion would, and checks that its answer is recomputed rather than served stale.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import httpx
+
+import backend.app as app_module
+from backend.answer_cache import AnswerCache, set_answer_cache
+from backend.bm25_index import BM25Index, set_bm25_index
+from backend.part_catalog import PartCatalog, set_part_catalog
+from backend.providers import HashedEmbeddings
+from backend.resources import set_resources
+from backend.session_store import SessionStore, set_session_store
+from benchmarks.bench_concurrency import stub_resources
+
+PHRASINGS = [
+    "How do I install {pn}?", "how do i install {pn}", "How can I install {pn}?", "Installation steps for {pn}",
+    "What is the price of {pn}?", "what's the price of {pn}",
+]
+
+
+def questions(n: int, seed: int = 0, popular: int = 20, skew: float = 1.2):
+    rng = random.Random(seed)
+    with open("data/parts_data.json") as f:
+        parts = [p["part_number"] for p in json.load(f)]
+    pool = rng.sample(parts, popular)
+    weights = [1 / (i + 1) ** skew for i in range(popular)]
+    for _ in range(n):
+        yield rng.choice(PHRASINGS).format(pn=rng.choices(pool, weights)[0])
+
+
+async def replay(client, messages, label):
+    latencies = []
+    for i, message in enumerate(messages):
+        start = time.perf_counter()
+        r = await client.post("/chat", json={"session_id": f"{label}-{i}", "message": message})
+        r.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run(messages, cache: AnswerCache | None, args):
+    resources = stub_resources(args.llm_ms / 1000)
+    resources._embeddings = HashedEmbeddings(512)
+    set_resources(resources)
+    set_session_store(SessionStore())
+    app_module.ANSWER_CACHE = cache is not None
+    app_module.RETRIEVAL_MODE = "lexical"
+    set_answer_cache(cache)
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies = await replay(client, messages, "answer-cache")
+        stale = None
+        if cache is not None:
+            # Re-ingested document: the next identical question must miss and re-answer
+            catalog = app_module.get_part_catalog()
+            part = messages[0].rstrip("?").split()[-1]
+            doc = catalog.lookup("part_number_norm", part)[0]
+            doc.metadata["price"] = "$0.01"
+            calls = resources.llm.calls
+            await replay(client, messages[:1], "answer-cache-changed")
+            stale = resources.llm.calls > calls
+    return latencies, resources.llm.calls, stale
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ms", type=float, default=600)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--similarity", type=float, default=0.8)
+    args = parser.parse_args()
+
+    set_bm25_index(BM25Index("data/parts_data.json"))
+    messages = list(questions(args.questions))
+    runs = [("no cache", None), ("exact key", AnswerCache(similarity=0)),
+            (f"similarity {args.similarity}", AnswerCache(similarity=args.similarity))]
+    for label, cache in runs:
+        set_part_catalog(PartCatalog("data/parts_data.json"))
+        latencies, calls, stale = await run(messages, cache, args)
+        line = (f"{label:<16} LLM calls {calls:>4}  /chat mean {statistics.mean(latencies) * 1000:7.1f} ms  "
+                f"p50 {statistics.median(latencies) * 1000:7.1f} ms")
+        if cache is not None:
+            stats = cache.stats()
+            line += f"  hit rate {stats['hit_rate']:.2f} {stats['hits']}  recomputed after change: {stale}"
+        print(line)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
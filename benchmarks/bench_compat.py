@@ -0,0 +1,151 @@
+"""
+Compatibility questions: inverted-index fast path vs the retrieval + LLM path.
+
+    python -m benchmarks.bench_compat --llm-ms 600 --catalog 200000
+
+Part 1 sends yes/no and "what fits my model" questions built from data/parts_data.json through
+/chat twice, with COMPAT_FAST_PATH off (stub embeddings, stub vector store, stub LLM sleeping
+`--llm-ms`) and on, and reports latency and LLM calls. It then asks yes/no questions with the part
+first and with the model first, for a compatible and an incompatible model each, and exits
+when a fast-path answer disagrees with the index. Part 2 builds the index over a
+`--catalog`-part synthetic catalog and times the lookups themselves.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import httpx
+
+import backend.app as app_module
+from backend.compat_index import CompatibilityIndex, set_compat_index
+from backend.resources import set_resources
+from backend.session_store import SessionStore, set_session_store
+from benchmarks.bench_concurrency import stub_resources
+from data.synth_data import Generator, generate
+
+
+def questions(path: str, n: int, seed: int = 0):
+    rng = random.Random(seed)
+    with open(path) as f:
+        parts = json.load(f)
+    all_models = sorted({m for p in parts for m in p["compatible_models"]})
+    for i in range(n):
+        part = rng.choice(parts)
+        if i % 3 == 0:
+            yield f"What parts fit my {rng.choice(part['compatible_models'])}?"
+        elif i % 3 == 1:
+            yield f"Does {part['part_number']} fit my {rng.choice(part['compatible_models'])}?"
+        else:
+            yield f"Is {part['part_number']} compatible with my {rng.choice(all_models)}?"
+
+
+def yes_no_questions(path: str, n: int, seed: int = 1):
+    """(message, expected "Yes"/"No") pairs in both word orders."""
+    rng = random.Random(seed)
+    with open(path) as f:
+        records = json.load(f)
+    # A repeated part number keeps its first record, as in the index
+    first = {}
+    for record in records:
+        first.setdefault(record["part_number"], record)
+    parts = list(first.values())
+    all_models = sorted({m for p in records for m in p["compatible_models"]})
+    for _ in range(n):
+        part = rng.choice(parts)
+        fits = rng.choice(part["compatible_models"])
+        other = rng.choice([m for m in all_models if m not in part["compatible_models"]])
+        number = part["part_number"]
+        for model, expected in ((fits, "Yes"), (other, "No")):
+            yield f"Is {number} compatible with {model}?", expected
+            yield f"does {number} fit my {model}", expected
+            yield f"Is my {model} compatible with {number}?", expected
+            yield f"Will {model} work with {number}?", expected
+
+
+async def check_answers(pairs, llm_delay: float) -> list[str]:
+    """Wrong or missing yes/no answers from the fast path."""
+    set_resources(stub_resources(llm_delay))
+    set_session_store(SessionStore())
+    app_module.COMPAT_FAST_PATH = True
+    wrong = []
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i, (message, expected) in enumerate(pairs):
+            r = await client.post("/chat", json={"session_id": f"compat-check-{i}", "message": message})
+            r.raise_for_status()
+            answer = r.json()["answer"]
+            if not answer.startswith(f"{expected}, "):
+                wrong.append(f"{message!r}: expected {expected}, got {answer[:120]!r}")
+    return wrong
+
+
+async def replay(messages, fast_path: bool, llm_delay: float):
+    resources = stub_resources(llm_delay)
+    set_resources(resources)
+    set_session_store(SessionStore())
+    app_module.COMPAT_FAST_PATH = fast_path
+    latencies = []
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i, message in enumerate(messages):
+            start = time.perf_counter()
+            r = await client.post("/chat", json={"session_id": f"compat-{i}", "message": message})
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    return latencies, resources.llm.calls
+
+
+def summary(latencies):
+    ms = sorted(x * 1000 for x in latencies)
+    return f"p50 {statistics.median(ms):8.2f} ms  p95 {ms[int(len(ms) * 0.95) - 1]:8.2f} ms"
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ms", type=float, default=600)
+    parser.add_argument("--questions", type=int, default=60)
+    parser.add_argument("--catalog", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    set_compat_index(CompatibilityIndex("data/parts_data.json"))
+    messages = list(questions("data/parts_data.json", args.questions))
+    for fast_path in (False, True):
+        latencies, calls = await replay(messages, fast_path, args.llm_ms / 1000)
+        label = "index fast path" if fast_path else "retrieval + LLM"
+        print(f"{label:<16} {summary(latencies)}  LLM calls {calls}")
+    pairs = list(yes_no_questions("data/parts_data.json", args.questions))
+    wrong = await check_answers(pairs, args.llm_ms / 1000)
+    print(f"yes/no answers: {len(pairs) - len(wrong)}/{len(pairs)} correct")
+    if wrong:
+        raise SystemExit("wrong compatibility answers:\n  " + "\n  ".join(wrong[:20]))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "parts.jsonl")
+        generator = Generator(args.catalog, 0, seed=0)
+        generate(generator, "part", args.catalog, path, workers=1)
+        start = time.perf_counter()
+        index = CompatibilityIndex(path)
+        print(f"built index over {args.catalog} parts in {time.perf_counter() - start:.1f}s: {index.stats()}")
+        rng = random.Random(1)
+        probes = [(generator.base_part(rng.randrange(args.catalog))["part_number"],
+                   f"WDT{100000 + rng.randrange(generator.models)}") for _ in range(1000)]
+        start = time.perf_counter()
+        for i in range(args.lookups):
+            part, model = probes[i % len(probes)]
+            index.fits(part, model)
+        fits_us = (time.perf_counter() - start) / args.lookups * 1e6
+        start = time.perf_counter()
+        for i in range(args.lookups):
+            index.answer(f"What parts fit my {probes[i % len(probes)][1]}?", None, probes[i % len(probes)][1])
+        answer_us = (time.perf_counter() - start) / args.lookups * 1e6
+        print(f"fits(): {fits_us:.2f} us/lookup   answer() for a model listing: {answer_us:.2f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
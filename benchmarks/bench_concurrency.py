@@ -0,0 +1,105 @@
+"""
+Concurrency load test for /chat with stubbed slow LLMs.
+
+    python -m benchmarks.bench_concurrency --llm-ms 200 --levels 1,4,16,64
+
+Each level keeps N requests in flight against the ASGI app (no network) and reports
+throughput. With the pipeline off the event loop, req/s should grow roughly linearly with N
+until CHAT_MAX_CONCURRENCY is reached; a blocking pipeline stays flat at ~1000/llm-ms.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.vectorstores import VectorStore
+
+from backend.app import app
+from backend.providers import StubChatModel
+from backend.resources import Resources, set_resources
+
+
+class SlowChatModel(StubChatModel):
+    """The offline stub chat model (backend/providers.py) with a fixed reply and 200 ms per call."""
+    delay: float = 0.2
+    token_delay: float = 0.0
+    reply: str | None = "stub answer"
+
+
+class StaticVectorStore(VectorStore):
+    """Returns the same documents for every query, accepting the Pinecone-style search kwargs."""
+
+    def __init__(self, embedding, docs):
+        self._embedding = embedding
+        self.docs = docs
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.docs[:k]
+
+
+def stub_resources(llm_delay: float, token_delay: float = 0.0, reply: str = "stub answer") -> Resources:
+    embeddings = DeterministicFakeEmbedding(size=1536)
+    meta = {key: "" for key in ("part_number", "name", "manufacturer", "manufacturer_part_number", "category",
+                                "price", "installation_guide", "troubleshooting", "compatible_models")}
+    docs = [Document(page_content="Door Seal Gasket", metadata=meta)]
+    return Resources(
+        index=object(),
+        embeddings=embeddings,
+        llm=SlowChatModel(delay=llm_delay, token_delay=token_delay, reply=reply),
+        llm_open=SlowChatModel(delay=llm_delay, token_delay=token_delay, reply=reply),
+        vector_stores={ns: StaticVectorStore(embeddings, docs) for ns in ("products", "transactions")},
+    )
+
+
+MESSAGES = [
+    "Can you tell me about the items in order PSO1001?",  # order branch -> llm_open
+    "How do I install a refrigerator door gasket?",       # product branch -> retrieval chain
+]
+
+
+async def run_level(client, in_flight: int, total: int):
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker(w):
+        while not queue.empty():
+            i = queue.get_nowait()
+            r = await client.post("/chat", json={"session_id": f"load-{in_flight}-{w}-{i}", "message": MESSAGES[i % 2]})
+            assert r.status_code == 200, r.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(in_flight)))
+    return total / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ms", type=float, default=200)
+    parser.add_argument("--levels", default="1,4,16,64")
+    parser.add_argument("--requests-per-level", type=int, default=64)
+    args = parser.parse_args()
+
+    set_resources(stub_resources(args.llm_ms / 1000))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for level in (int(x) for x in args.levels.split(",")):
+            rps = await run_level(client, level, max(args.requests_per_level, level))
+            print(f"in-flight={level:>4}: {rps:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
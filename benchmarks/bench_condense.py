@@ -0,0 +1,62 @@
+"""
+LLM calls and latency saved by the condense fast path on a replayed conversation corpus.
+
+    python -m benchmarks.bench_condense --llm-ms 400
+
+Replays benchmarks/data/conversations.json through /chat twice, with CONDENSE_FAST_PATH off and
+on, using the stub LLM (fixed latency per call) and counts LLM calls of the retrieval chain.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+import backend.app as app_module
+from backend.resources import set_resources
+from backend.session_store import SessionStore, set_session_store
+from benchmarks.bench_concurrency import stub_resources
+
+CORPUS = "benchmarks/data/conversations.json"
+
+
+async def replay(conversations, fast_path: bool, llm_delay: float):
+    resources = stub_resources(llm_delay)
+    set_resources(resources)
+    set_session_store(SessionStore())
+    app_module.CONDENSE_FAST_PATH = fast_path
+    latencies = []
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for conversation in conversations:
+            session_id = f"{conversation['name']}-{fast_path}"
+            for turn in conversation["turns"]:
+                start = time.perf_counter()
+                r = await client.post("/chat", json={"session_id": session_id, "message": turn["message"]})
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+    return resources.llm.calls, sum(latencies)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ms", type=float, default=400)
+    parser.add_argument("--corpus", default=CORPUS)
+    args = parser.parse_args()
+
+    with open(args.corpus) as f:
+        conversations = json.load(f)
+    turns = sum(len(c["turns"]) for c in conversations)
+
+    base_calls, base_time = await replay(conversations, False, args.llm_ms / 1000)
+    fast_calls, fast_time = await replay(conversations, True, args.llm_ms / 1000)
+    print(f"{len(conversations)} conversations, {turns} turns")
+    print(f"condense always : {base_calls:>4} chain LLM calls, total {base_time:7.2f} s")
+    print(f"fast path       : {fast_calls:>4} chain LLM calls, total {fast_time:7.2f} s")
+    print(f"saved           : {base_calls - fast_calls:>4} calls ({(base_calls - fast_calls) / max(base_calls, 1):.0%}), "
+          f"{base_time - fast_time:.2f} s ({(base_time - fast_time) / base_time:.0%})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
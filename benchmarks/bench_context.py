@@ -0,0 +1,86 @@
+"""
+Answer-prompt size and LLM latency with and without the post-retrieval context packer.
+
+    python -m benchmarks.bench_context --budget 1200 --base-ms 300 --prefill-us 150
+
+Sends the product questions of benchmarks/data/retrieval_queries.json through /chat with
+CONTEXT_TOKEN_BUDGET=0 (every retrieved document rendered in full) and with `--budget`.
+Retrieval is BM25 only over data/parts_data.json (RETRIEVAL_MODE=lexical), so the documents
+are the real catalog clones; the stub LLM records the prompt it is sent and sleeps `--base-ms`
+plus `--prefill-us` per prompt token, a rough model of prompt processing time. Prompt tokens
+use `backend.memory.count_tokens` (tiktoken when installed, ~4 characters per token otherwise).
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+import backend.app as app_module
+from backend.bm25_index import BM25Index, set_bm25_index
+from backend.memory import count_tokens
+from backend.resources import set_resources
+from backend.session_store import SessionStore, set_session_store
+from benchmarks.bench_concurrency import SlowChatModel, stub_resources
+from benchmarks.bench_hybrid import QUERIES_PATH
+
+
+class PromptSizedChatModel(SlowChatModel):
+    """Sleeps `delay` plus `prefill` seconds per prompt token and keeps the prompt sizes."""
+    prefill: float = 0.0
+    prompt_tokens: list = []
+
+    def _prompt_tokens(self, messages):
+        tokens = sum(count_tokens(m.content) for m in messages)
+        self.prompt_tokens.append(tokens)
+        return tokens
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.prefill * self._prompt_tokens(messages))
+        return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.prefill * self._prompt_tokens(messages))
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+async def replay(messages, budget: int, args):
+    resources = stub_resources(args.base_ms / 1000)
+    llm = PromptSizedChatModel(delay=args.base_ms / 1000, prefill=args.prefill_us / 1e6, prompt_tokens=[])
+    resources._llm = llm
+    set_resources(resources)
+    set_session_store(SessionStore())
+    app_module.RETRIEVAL_MODE = "lexical"
+    app_module.CONTEXT_TOKEN_BUDGET = budget
+    latencies = []
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i, message in enumerate(messages):
+            start = time.perf_counter()
+            r = await client.post("/chat", json={"session_id": f"context-{budget}-{i}", "message": message})
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    return llm.prompt_tokens, latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=int, default=1200)
+    parser.add_argument("--base-ms", type=float, default=300)
+    parser.add_argument("--prefill-us", type=float, default=150)
+    args = parser.parse_args()
+
+    set_bm25_index(BM25Index("data/parts_data.json"))
+    with open(QUERIES_PATH) as f:
+        messages = [q["query"] for q in json.load(f) if q["type"] != "manufacturer_part_number"]
+    for budget in (0, args.budget):
+        tokens, latencies = await replay(messages, budget, args)
+        label = f"packed ({budget} tokens)" if budget else "full documents"
+        print(f"{label:<22} prompt tokens mean {statistics.mean(tokens):7.0f}  max {max(tokens):6d}   "
+              f"/chat p50 {statistics.median(latencies) * 1000:7.1f} ms  mean {statistics.mean(latencies) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Hit rate and latency saved by the embedding cache on a repetitive query workload.
+
+    python -m benchmarks.bench_embedding_cache --queries 5000 --distinct 300 --embed-ms 80
+
+Queries are drawn from `--distinct` question variants with a Zipf-like skew (a few questions
+dominate, as in production), with random casing/spacing so normalization matters. The stub
+embedder sleeps `--embed-ms` per call. The disk tier is then reopened to show a warm restart.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from backend.embedding_cache import CachedEmbeddings
+
+TEMPLATES = [
+    "how do I install PS{n}?",
+    "is PS{n} compatible with WRF555SDFZ?",
+    "what does PS{n} cost",
+    "troubleshooting steps for PS{n}",
+]
+
+
+class SlowEmbeddings(DeterministicFakeEmbedding):
+    delay: float = 0.08
+
+    def embed_query(self, text):
+        time.sleep(self.delay)
+        return super().embed_query(text)
+
+    def embed_documents(self, texts):
+        time.sleep(self.delay)
+        return super().embed_documents(texts)
+
+
+def workload(n: int, distinct: int, seed: int = 0):
+    rng = random.Random(seed)
+    questions = [TEMPLATES[i % len(TEMPLATES)].format(n=11752000 + i) for i in range(distinct)]
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    for q in rng.choices(questions, weights=weights, k=n):
+        if rng.random() < 0.3:
+            q = q.upper() if rng.random() < 0.5 else "  " + q.replace(" ", "  ")
+        yield q
+
+
+def run(embeddings, queries):
+    start = time.perf_counter()
+    for q in queries:
+        embeddings.embed_query(q)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--distinct", type=int, default=300)
+    parser.add_argument("--embed-ms", type=float, default=80)
+    parser.add_argument("--lru", type=int, default=1000)
+    args = parser.parse_args()
+
+    queries = list(workload(args.queries, args.distinct))
+    underlying = SlowEmbeddings(size=1536, delay=args.embed_ms / 1000)
+    uncached_estimate = len(queries) * args.embed_ms / 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "emb")
+        cached = CachedEmbeddings(underlying, model_name="stub", max_entries=args.lru, path=path)
+        elapsed = run(cached, queries)
+        cached.flush()
+        stats = cached.stats()
+        print(f"cold: {elapsed:6.2f} s (uncached ~{uncached_estimate:.1f} s)  hit rate {stats['hit_rate']:.1%}  "
+              f"saved ~{stats['saved_seconds']:.1f} s  misses {stats['misses']}")
+
+        restarted = CachedEmbeddings(underlying, model_name="stub", max_entries=args.lru, path=path)
+        elapsed = run(restarted, queries[:1000])
+        stats = restarted.stats()
+        print(f"warm restart (1000 queries): {elapsed:6.2f} s  memory hits {stats['memory_hits']}  "
+              f"disk hits {stats['disk_hits']}  misses {stats['misses']}")
+
+
+if __name__ == "__main__":
+    main()
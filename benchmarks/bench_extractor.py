@@ -0,0 +1,131 @@
+"""
+Entity/intent extraction: the single-pass `EntityExtractor` vs the previous separate checks.
+
+    python -m benchmarks.bench_extractor --messages 200000
+
+Replays a corpus of chat messages: benchmarks/data/conversations.json, the synthetic
+conversations (data/synthetic/conversations.jsonl if generated, otherwise built in memory with
+data/synth_data.py) and case/spacing variants of them, repeated up to `--messages`. The
+baseline is the per-turn work before: `extract_*` in resolve_entities, the "this part" /
+"this order" checks, route_intent's keyword scans and `extract_*` again, and the `extract_*`
+check in standalone_question. Both sides must agree on every message (IDs, references and the
+keyword-based route); the run stops otherwise.
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+from backend.extractor import EntityExtractor
+from data.synth_data import Generator
+
+TXN_ORDER_KWS = {"order", "status", "track", "tracking", "cancel", "return", "refund", "exchange", "city"}
+TXN_POLICY_KWS = {"shipping", "delivery", "policy", "refund policy", "return policy", "cancellation policy", "cancel policy"}
+
+
+# Substring and overlap cases the keyword scan has to get right
+EDGE_CASES = [
+    "Is there a border trim for ps-11752968?", "Electricity went out, WDT780SAEM1 ice maker stopped",
+    "ORDER1 is my model", "what's the cancellation policy for PSO1001", "Refund policy?",
+    "Straße PS 11752968 für İhr Modell GE123456 – status?", "pso1001 PSO12345 PS12345 PS1234567X",
+    "", "does this part fit", "THIS ORDER", "trackingorder", "returnpolicy",
+]
+
+
+def legacy_part(text):
+    match = re.search(r"\bPS[-\s]?\d{6,}\b", text, re.IGNORECASE)
+    return match.group(0) if match else None
+
+
+def legacy_model(text):
+    match = re.search(r"\b[A-Z]{2,}\d[A-Z0-9]+\b", text)
+    return match.group(0) if match else None
+
+
+def legacy_order(text):
+    # Widened along with ORDER_PATTERN for the synthetic order IDs past PSO9999
+    match = re.search(r"\bPSO\d{4,}\b", text or "", re.IGNORECASE)
+    return match.group(0).upper() if match else None
+
+
+def legacy(text):
+    # resolve_entities
+    part, model, order = legacy_part(text), legacy_model(text), legacy_order(text)
+    ref_part = "this part" in text.lower() or "does this part" in text.lower()
+    ref_order = "this order" in text.lower()
+    # route_intent, up to the session fallback
+    t = text.lower()
+    if any(k in t for k in TXN_POLICY_KWS):
+        route = "transactions_policy"
+    elif any(k in t for k in TXN_ORDER_KWS):
+        route = "transactions_order"
+    elif legacy_order(text):
+        route = "transactions_order"
+    elif legacy_part(text) or legacy_model(text):
+        route = "products"
+    else:
+        route = None
+    # standalone_question's "names an ID itself" check
+    has_id = bool(legacy_part(text) or legacy_model(text) or legacy_order(text))
+    return part, model, order, ref_part, ref_order, route, has_id
+
+
+def single_pass(extractor, text):
+    e = extractor.extract(text)
+    route = extractor.intent(e) or ("transactions_order" if e.order else "products" if e.part or e.model else None)
+    has_id = bool(e.part or e.model or e.order)
+    return e.part, e.model, e.order, "active_part" in e.references, "active_order" in e.references, route, has_id
+
+
+def corpus(n_conversations: int = 20000):
+    with open("benchmarks/data/conversations.json") as f:
+        messages = [t["message"] for c in json.load(f) for t in c["turns"]]
+    path = "data/synthetic/conversations.jsonl"
+    if os.path.exists(path):
+        with open(path) as f:
+            for i, line in zip(range(n_conversations), f):
+                messages.extend(t["message"] for t in json.loads(line)["turns"])
+    else:
+        generator = Generator(5000, 2000, seed=0)
+        for c in range(n_conversations):
+            messages.extend(t["message"] for t in generator.conversation(c)["turns"])
+    variants = []
+    for m in messages:
+        variants.append(m.lower())
+        variants.append(m.upper())
+        variants.append(re.sub(r"\bPS(\d)", r"PS-\1", m))
+        variants.append(m + " Is this part in stock? Track this order please.")
+    return EDGE_CASES + messages + variants
+
+
+def timed(fn, messages):
+    start = time.perf_counter()
+    for m in messages:
+        fn(m)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200_000)
+    args = parser.parse_args()
+
+    base = corpus()
+    messages = (base * (args.messages // len(base) + 1))[: args.messages]
+    extractor = EntityExtractor.from_file()
+    for m in base:
+        expected, got = legacy(m), single_pass(extractor, m)
+        if expected != got:
+            raise SystemExit(f"mismatch on {m!r}: before {expected}, single pass {got}")
+    print(f"{len(base)} distinct messages agree; timing {len(messages)} messages")
+
+    before = timed(legacy, messages)
+    after = timed(lambda m: single_pass(extractor, m), messages)
+    for label, seconds in (("separate checks", before), ("single pass", after)):
+        print(f"{label:<16} {seconds / len(messages) * 1e6:6.2f} us/message  {len(messages) / seconds:10.0f} messages/s")
+    print(f"speedup x{before / after:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Recall@k and latency of products retrieval: vector only, BM25 only, and the two fused with RRF.
+
+    python -m benchmarks.bench_hybrid --k 5 10
+    python -m benchmarks.bench_hybrid --embedder openai     # real embeddings (needs OPENAI_API_KEY)
+    python -m benchmarks.bench_hybrid --write-queries       # regenerate the labeled set
+
+The labeled set (benchmarks/data/retrieval_queries.json) is built from data/parts_data.json:
+manufacturer part numbers, part names, part type + model or brand, and symptom questions, each
+with the `part_number_norm`s that answer it. All modes go through `HybridRetriever` over a
+`LocalVectorIndex` of the product documents with no metadata filter, i.e. the questions the
+catalog fast path can't pin. recall@k = |relevant ∩ top-k| / min(k, |relevant|).
+
+The default embedder hashes word unigrams and character trigrams into a fixed-size vector, a
+deterministic offline stand-in (`HashedEmbeddings` in backend/providers.py); use
+`--embedder openai` for numbers that reflect production.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+from backend.bm25_index import BM25Index, HybridRetriever
+from backend.local_index import LocalVectorIndex, LocalVectorStore
+from backend.part_catalog import product_document
+from backend.providers import HashedEmbeddings
+from backend.utils import norm
+
+QUERIES_PATH = "benchmarks/data/retrieval_queries.json"
+
+SYMPTOMS = {
+    "Door Seal Gasket": ["my fridge door won't seal and cold air leaks out", "refrigerator gasket has debris in the groove"],
+    "Ice Maker Assembly": ["the ice maker is not making ice", "ice maker stopped working, water supply is fine"],
+    "Door Shelf Retainer Bar": ["the shelf bar on my fridge door doesn't fit", "retainer bar on the door shelf is broken"],
+    "Wash Pump Motor": ["my dishwasher is not cleaning the dishes", "dishwasher spray arms barely spin"],
+    "Dishwasher Door Latch": ["dishwasher won't start, latch does not engage", "the dishwasher door doesn't latch closed"],
+}
+
+
+def base_name(part: dict) -> str:
+    return part["name"].split(" - ")[0]
+
+
+def build_queries(parts: list[dict], seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    first = {}
+    for part in parts:
+        first.setdefault(norm(part["part_number"]), part)
+    parts = list(first.values())
+
+    def relevant(pred):
+        return sorted(norm(p["part_number"]) for p in parts if pred(p))
+
+    queries = []
+    for part in rng.sample(parts, 15):
+        mpn = part["manufacturer_part_number"]
+        queries.append({"type": "manufacturer_part_number", "query": f"Do you carry manufacturer part {mpn}?",
+                        "relevant": relevant(lambda p: norm(p["manufacturer_part_number"]) == norm(mpn))})
+    for part in rng.sample(parts, 15):
+        name = part["name"]
+        queries.append({"type": "name", "query": f"I need the {name.replace(' - ', ' ')}",
+                        "relevant": relevant(lambda p: p["name"] == name)})
+    for part in rng.sample(parts, 15):
+        kind, model = base_name(part), rng.choice(part["compatible_models"])
+        queries.append({"type": "type_model", "query": f"{kind.lower()} for model {model}",
+                        "relevant": relevant(lambda p: base_name(p) == kind and model in p["compatible_models"])})
+    for part in rng.sample(parts, 10):
+        kind, brand = base_name(part), rng.choice(part["compatible_brands"])
+        queries.append({"type": "type_brand", "query": f"{kind.lower()} that works with {brand}",
+                        "relevant": relevant(lambda p: base_name(p) == kind and brand in p["compatible_brands"])})
+    for kind, texts in SYMPTOMS.items():
+        for text in texts:
+            queries.append({"type": "symptom", "query": text, "relevant": relevant(lambda p: base_name(p) == kind)})
+    return queries
+
+
+def recall(retrieved, relevant, k):
+    return len(set(retrieved[:k]) & set(relevant)) / min(k, len(relevant))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, nargs="+", default=[5, 10])
+    parser.add_argument("--embedder", choices=["hash", "openai"], default="hash")
+    parser.add_argument("--write-queries", action="store_true")
+    args = parser.parse_args()
+
+    with open("data/parts_data.json") as f:
+        parts = json.load(f)
+    if args.write_queries or not os.path.exists(QUERIES_PATH):
+        with open(QUERIES_PATH, "w") as f:
+            json.dump(build_queries(parts), f, indent=1)
+    with open(QUERIES_PATH) as f:
+        queries = json.load(f)
+
+    if args.embedder == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+    else:
+        embeddings = HashedEmbeddings(512)
+    docs = [product_document(p) for p in parts]
+    index = LocalVectorIndex(dimension=len(embeddings.embed_query("probe")))
+    store = LocalVectorStore(index, embeddings, namespace="products")
+    store.add_texts([d.page_content for d in docs], [d.metadata for d in docs],
+                    ids=[f"part-{d.metadata['part_number_norm']}" for d in docs])
+    lexical = BM25Index(path=None, docs=docs)
+
+    k_max = max(args.k)
+    print(f"{len(queries)} labeled queries, {len(lexical)} documents, embedder={args.embedder}")
+    header = "  ".join(f"recall@{k}" for k in args.k)
+    print(f"{'mode':<8} {header}  p50 ms  p95 ms   recall@{k_max} by query type")
+    for mode in ("vector", "lexical", "hybrid"):
+        retriever = HybridRetriever(vectorstore=store, search_kwargs={"k": k_max}, lexical=lexical, mode=mode)
+        scores = {k: [] for k in args.k}
+        by_type, latencies = {}, []
+        for q in queries:
+            start = time.perf_counter()
+            found = retriever.invoke(q["query"])
+            latencies.append(time.perf_counter() - start)
+            keys = [d.metadata["part_number_norm"] for d in found]
+            for k in args.k:
+                scores[k].append(recall(keys, q["relevant"], k))
+            by_type.setdefault(q["type"], []).append(recall(keys, q["relevant"], k_max))
+        ms = np.array(latencies) * 1000
+        cells = "  ".join(f"{np.mean(scores[k]):9.3f}" for k in args.k)
+        types = " ".join(f"{t}={np.mean(v):.2f}" for t, v in by_type.items())
+        print(f"{mode:<8} {cells}  {np.percentile(ms, 50):6.2f}  {np.percentile(ms, 95):6.2f}   {types}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Throughput of the batched, parallel ingestion pipeline in data/pc_vdb.py.
+
+    python -m benchmarks.bench_ingest --docs 5000 --embed-ms 150 --upsert-ms 40
+
+Synthetic product documents are ingested into the local index with a stub embedder that sleeps
+`--embed-ms` per call and an index that sleeps `--upsert-ms` per upsert request (and fails the
+first few, to exercise the retry path). It runs the pipeline serially (one worker, one doc per
+embeddings call, as the old single `add_documents` path paid per request), with the configured
+worker pool, and then once more on unchanged data, which should only hit the embedding cache.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from langchain_core.documents import Document
+
+from backend.embedding_cache import CachedEmbeddings
+from backend.local_index import LocalVectorIndex
+from benchmarks.bench_embedding_cache import SlowEmbeddings
+from data.pc_vdb import VectorStore
+
+
+class SlowIndex(LocalVectorIndex):
+    def __init__(self, dimension, delay, failures=0):
+        super().__init__(dimension=dimension)
+        self.delay = delay
+        self.failures = failures
+        self.requests = 0
+
+    def upsert(self, vectors, namespace=None, **kwargs):
+        self.requests += 1
+        time.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("simulated 503")
+        return super().upsert(vectors, namespace=namespace, **kwargs)
+
+
+def synthetic_docs(n: int):
+    for i in range(n):
+        part = f"PS{11700000 + i}"
+        text = f"Part Number: {part}\nName: Part {i}\nDescription: replacement part number {i}"
+        yield Document(page_content=text, metadata={"part_number": part, "part_number_norm": part.lower(), "category": "refrigerator"})
+
+
+def run(label, store, docs, **kwargs):
+    start = time.perf_counter()
+    written = store.ingest_namespace(docs, "products", **kwargs)
+    elapsed = time.perf_counter() - start
+    stats = store.embeddings.stats()
+    count = store.index.describe_index_stats()["namespaces"]["products"]["vector_count"]
+    print(f"== {label}: {written} docs in {elapsed:.2f}s ({written / elapsed:.0f} docs/s), "
+          f"embedding misses {stats['misses']}, index size {count}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--embed-ms", type=float, default=150)
+    parser.add_argument("--upsert-ms", type=float, default=40)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--serial-docs", type=int, default=200, help="docs for the serial baseline")
+    args = parser.parse_args()
+
+    docs = list(synthetic_docs(args.docs))
+    with tempfile.TemporaryDirectory() as tmp:
+        def store(name, failures=0):
+            embeddings = CachedEmbeddings(SlowEmbeddings(size=64, delay=args.embed_ms / 1000), model_name="stub",
+                                          path=os.path.join(tmp, name))
+            return VectorStore(embeddings=embeddings, index=SlowIndex(64, args.upsert_ms / 1000, failures))
+
+        run(f"serial baseline ({args.serial_docs} docs)", store("serial"), docs[:args.serial_docs],
+            workers=1, embed_batch=1, upsert_chunk=1)
+        pipeline = store("pipeline", failures=2)
+        run(f"pipeline ({args.workers} workers, batch {args.batch})", pipeline, docs,
+            workers=args.workers, embed_batch=args.batch)
+        misses = pipeline.embeddings.misses
+        run("re-run on unchanged data", pipeline, docs, workers=args.workers, embed_batch=args.batch)
+        print(f"re-run embedding calls: {pipeline.embeddings.misses - misses}")
+
+
+if __name__ == "__main__":
+    main()
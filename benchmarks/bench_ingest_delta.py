@@ -0,0 +1,120 @@
+"""
+Re-ingest time after a small catalog change: manifest diff vs a full re-ingest.
+
+    python -m benchmarks.bench_ingest_delta --parts 100000 --mutate 0.01
+
+Builds a synthetic catalog, ingests it into the local index, then mutates `--mutate` of the
+parts (half price changes, which are metadata-only, a third description changes, the rest
+removals) and re-ingests it three ways: the manifest diff, a full re-ingest with a warm embedding
+cache, and a full re-ingest with a cold cache (the old behaviour). The stub embedder sleeps `--embed-ms` per call
+and the index `--upsert-ms` per write request.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from backend.embedding_cache import CachedEmbeddings
+from benchmarks.bench_embedding_cache import SlowEmbeddings
+from benchmarks.bench_ingest import SlowIndex
+from data.pc_vdb import IngestManifest, VectorStore
+
+
+class CountingIndex(SlowIndex):
+    def update(self, *args, **kwargs):
+        self.requests += 1
+        time.sleep(self.delay)
+        return super().update(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        self.requests += 1
+        time.sleep(self.delay)
+        return super().delete(*args, **kwargs)
+
+
+def iter_synthetic_parts(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    for i in range(n):
+        models = [f"WRF{rng.randint(100, 999)}SDFZ" for _ in range(3)]
+        yield {
+            "part_number": f"PS{11700000 + i}",
+            "name": f"Replacement Part {i}",
+            "category": rng.choice(["Refrigerator", "Dishwasher"]),
+            "price": f"${rng.uniform(5, 250):.2f}",
+            "description": f"Replacement part {i} for {models[0]}.",
+            "installation_guide": "1. Disconnect power. 2. Remove old part. 3. Install new part.",
+            "troubleshooting": "Check the connections and verify compatibility.",
+            "compatible_models": models,
+            "manufacturer": rng.choice(["Whirlpool", "GE", "Frigidaire"]),
+            "manufacturer_part_number": f"W{10000000 + i}",
+            "compatible_brands": ["Whirlpool", "KitchenAid"],
+        }
+
+
+def synthetic_parts(n: int, seed: int = 0):
+    return list(iter_synthetic_parts(n, seed))
+
+
+def mutate(parts, fraction: float, seed: int = 1):
+    rng = random.Random(seed)
+    parts = [dict(p) for p in parts]
+    picked = rng.sample(range(len(parts)), int(len(parts) * fraction))
+    removed = set()
+    for n, i in enumerate(picked):
+        if n % 6 < 3:
+            parts[i]["price"] = f"${rng.uniform(5, 250):.2f}"
+        elif n % 6 < 5:
+            parts[i]["description"] += " Updated design."
+        else:
+            removed.add(i)
+    return [p for i, p in enumerate(parts) if i not in removed]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--parts", type=int, default=100_000)
+    parser.add_argument("--mutate", type=float, default=0.01)
+    parser.add_argument("--embed-ms", type=float, default=50)
+    parser.add_argument("--upsert-ms", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    parts = synthetic_parts(args.parts)
+    changed = mutate(parts, args.mutate)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        embedder = SlowEmbeddings(size=64, delay=args.embed_ms / 1000)
+        warm = CachedEmbeddings(embedder, model_name="stub", path=os.path.join(tmp, "emb"))
+        index = CountingIndex(64, args.upsert_ms / 1000)
+        store = VectorStore(embeddings=warm, index=index)
+        manifest = IngestManifest(os.path.join(tmp, "manifest.sqlite3"))
+
+        def sync(label, target, catalog, full=False, manifest=manifest):
+            before_requests, before_misses = target.index.requests, target.embeddings.misses
+            start = time.perf_counter()
+            with redirect_stdout(StringIO()):
+                target.sync_namespace([target.product_doc(p) for p in catalog], "products", manifest,
+                                      full=full, workers=args.workers)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<28} {elapsed:7.2f} s  embedded {target.embeddings.misses - before_misses:>7}  "
+                  f"write requests {target.index.requests - before_requests:>6}")
+            return elapsed
+
+        sync("initial ingest", store, parts)
+        print(f"-- mutated {args.mutate:.1%} of {args.parts} parts --")
+
+        delta = sync("manifest diff", store, changed)
+        count = index.describe_index_stats()["namespaces"]["products"]["vector_count"]
+        full_warm = sync("full re-ingest, warm cache", store, changed, full=True, manifest=IngestManifest(None))
+        cold = VectorStore(embeddings=CachedEmbeddings(embedder, model_name="stub", path=None),
+                           index=CountingIndex(64, args.upsert_ms / 1000))
+        full_cold = sync("full re-ingest, cold cache", cold, changed, full=True, manifest=IngestManifest(None))
+        print(f"diff vs full (cold): {full_cold / delta:.0f}x faster, vs full (warm): {full_warm / delta:.0f}x faster")
+        print(f"index size after diff: {count} (catalog {len(changed)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Peak memory of ingestion as the catalog grows: streaming pipeline vs load-everything-first.
+
+    python -m benchmarks.bench_ingest_stream --sizes 20000 80000 320000
+
+For each size a synthetic catalog is written as a JSON array (the format of
+data/parts_data.json) and as JSONL, and each run happens in a fresh subprocess that reports its
+peak RSS. "eager" is the old path (`json.load` the file, build every `Document`, then ingest);
+"stream" and "stream-jsonl" read records incrementally and feed bounded batches through
+`sync_namespace`. The index discards vectors and the embedder is a local fake, so what is
+measured is the pipeline itself.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from backend.embedding_cache import CachedEmbeddings
+from benchmarks.bench_ingest_delta import iter_synthetic_parts
+
+
+class NullIndex:
+    def __init__(self):
+        self.vectors = 0
+
+    def upsert(self, vectors, namespace=None, **kwargs):
+        self.vectors += len(vectors)
+
+    def update(self, **kwargs):
+        pass
+
+    def delete(self, **kwargs):
+        pass
+
+
+def write_catalog(n: int, directory: str):
+    array_path = os.path.join(directory, f"parts_{n}.json")
+    jsonl_path = os.path.join(directory, f"parts_{n}.jsonl")
+    with open(array_path, "w") as array, open(jsonl_path, "w") as lines:
+        array.write("[\n")
+        for i, part in enumerate(iter_synthetic_parts(n)):
+            record = json.dumps(part)
+            array.write(("" if i == 0 else ",\n") + record)
+            lines.write(record + "\n")
+        array.write("\n]\n")
+    return array_path, jsonl_path
+
+
+def child(mode: str, path: str):
+    from contextlib import redirect_stdout
+    from io import StringIO
+    from data.pc_vdb import IngestManifest, VectorStore
+
+    store = VectorStore(
+        embeddings=CachedEmbeddings(DeterministicFakeEmbedding(size=64), model_name="fake", max_entries=1000, path=None),
+        index=NullIndex(),
+    )
+    start = time.perf_counter()
+    if mode == "eager":
+        with open(path) as f:
+            docs = [store.product_doc(part) for part in json.load(f)]
+    else:
+        docs = store.iter_product_docs(path)
+    with redirect_stdout(StringIO()):
+        # on disk, as in a real run; an in-memory SQLite manifest would grow with the catalog
+        store.sync_namespace(docs, "products", IngestManifest(f"{path}.{mode}.manifest.sqlite3"))
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"vectors": store.index.vectors, "seconds": elapsed, "peak_mb": peak_mb}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20_000, 80_000, 320_000])
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(*args.child)
+
+    print(f"{'parts':>8} {'mode':>13} {'peak RSS':>10} {'time':>8} {'docs/s':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            array_path, jsonl_path = write_catalog(n, tmp)
+            for mode, path in (("eager", array_path), ("stream", array_path), ("stream-jsonl", jsonl_path)):
+                out = subprocess.run([sys.executable, "-W", "ignore", "-m", "benchmarks.bench_ingest_stream",
+                                      "--child", mode, path], capture_output=True, text=True, check=True)
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{n:>8} {mode:>13} {result['peak_mb']:>8.0f}MB {result['seconds']:>7.1f}s "
+                      f"{result['vectors'] / result['seconds']:>8.0f}")
+            for name in os.listdir(tmp):
+                os.remove(os.path.join(tmp, name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Condense-prompt size and latency by memory mode at turn 1, 10 and 50.
+
+    python -m benchmarks.bench_memory                      # modeled LLM latency
+    python -m benchmarks.bench_memory --live               # real condense call through resources.llm
+
+Tokens are those of the formatted CONDENSE prompt the chain sends. Without --live, latency is
+the local memory/prompt work plus a prefill model of `--prefill-ms-per-1k` per 1k prompt
+tokens; "summary" mode uses a stub summarizer so only "buffer" vs "window" are free of LLM cost.
+"""
+import argparse
+import time
+import warnings
+
+from langchain.chains.conversational_retrieval.base import _get_chat_history
+from langchain_core.language_models import FakeListChatModel
+
+from backend.memory import WindowedSummaryMemory, count_tokens, new_memory
+from backend.resources import build_prompts, get_resources, load_prompt
+
+warnings.filterwarnings("ignore")
+
+QUESTIONS = [
+    "How do I install the door seal gasket PS11752778?",
+    "Does this part fit my WDT780SAEM1?",
+    "My dishwasher won't start, could it be the door latch?",
+    "What does the ice maker assembly PS2375646 cost?",
+    "Is it compatible with WRF555SDFZ?",
+]
+ANSWER = ("Sure. Disconnect power first, remove the old part, clean the mounting area and fit the new one, "
+          "then restore power and run a test cycle. ") * 3
+CHECKPOINTS = (1, 10, 50)
+
+
+def make_memory(mode: str, ctx: dict):
+    if mode == "summary":
+        stub = FakeListChatModel(responses=["The user is replacing refrigerator and dishwasher parts and asked about "
+                                            "installation, compatibility and price of several PS part numbers."])
+        return WindowedSummaryMemory(return_messages=True, output_key="answer", entity_context=ctx, summarizer=stub)
+    return new_memory(ctx, mode=mode)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", default="buffer,window,summary")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=120.0)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    condense = build_prompts(load_prompt()["system_prompt"])["condense"]
+    for mode in args.modes.split(","):
+        ctx = {"active_part": "ps11752778", "active_model": "wdt780saem1", "active_order": None}
+        memory = make_memory(mode, ctx)
+        for turn in range(1, max(CHECKPOINTS) + 1):
+            question = QUESTIONS[turn % len(QUESTIONS)]
+            if turn in CHECKPOINTS:
+                start = time.perf_counter()
+                history = _get_chat_history(memory.load_memory_variables({})["chat_history"])
+                prompt = condense.format(chat_history=history, question=question)
+                local_ms = (time.perf_counter() - start) * 1000
+                tokens = count_tokens(prompt)
+                if not history:
+                    llm_ms = 0.0  # the chain skips condensing on an empty history
+                elif args.live:
+                    start = time.perf_counter()
+                    get_resources().llm.invoke(prompt)
+                    llm_ms = (time.perf_counter() - start) * 1000
+                else:
+                    llm_ms = tokens / 1000 * args.prefill_ms_per_1k
+                print(f"{mode:>7} turn {turn:>2}: condense prompt {tokens:>6} tokens  "
+                      f"local {local_ms:6.2f} ms  condense {llm_ms:8.1f} ms")
+            memory.save_context({"question": question}, {"answer": ANSWER})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Cost of the per-turn observability: stage spans and sampled traces vs dumping every turn.
+
+    python -m benchmarks.bench_metrics --turns 400 --rounds 3
+
+Sends the product questions of benchmarks/data/retrieval_queries.json through /chat with an
+instant stub LLM, BM25 retrieval over data/parts_data.json and the answer cache off, so the
+turn time is mostly the app's own work. stdout goes to a log file, as it would in a deployment.
+For METRICS_SAMPLE_RATE 1 (a trace per turn), 0.01 (the default) and 0, interleaved over
+`--rounds`, it prints the time per turn and the log bytes per turn. It also times the document
+dump /chat printed on every turn before (content and metadata of each retrieved document) over
+the same documents, and one `span` enter/exit.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+import backend.app as app_module
+from backend.bm25_index import BM25Index, set_bm25_index
+from backend.metrics import Metrics, set_metrics
+from backend.resources import set_resources
+from backend.session_store import SessionStore, set_session_store
+from benchmarks.bench_concurrency import stub_resources
+from benchmarks.bench_hybrid import QUERIES_PATH
+
+
+def legacy_dump(docs):
+    print("=== RETRIEVED DOCUMENTS ===")
+    for doc in docs:
+        print("Page content:", doc.page_content)
+        print("Metadata:", doc.metadata)
+        print("-----")
+
+
+async def replay(messages, sample_rate: float, log):
+    set_resources(stub_resources(0.0))
+    set_session_store(SessionStore())
+    set_metrics(Metrics(sample_rate=sample_rate))
+    retrieved = []
+    run_chain = app_module.run_chain
+
+    async def recording_run_chain(plan):
+        response = await run_chain(plan)
+        retrieved.append(response["source_documents"])
+        return response
+
+    app_module.run_chain = recording_run_chain
+    latencies = []
+    try:
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            with contextlib.redirect_stdout(log):
+                for i, message in enumerate(messages):
+                    start = time.perf_counter()
+                    r = await client.post("/chat", json={"session_id": f"metrics-{sample_rate}-{i}", "message": message})
+                    r.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                log.flush()
+    finally:
+        app_module.run_chain = run_chain
+    return latencies, retrieved
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=400)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    set_bm25_index(BM25Index("data/parts_data.json"))
+    app_module.RETRIEVAL_MODE = "lexical"
+    app_module.ANSWER_CACHE = False
+    with open(QUERIES_PATH) as f:
+        queries = [q["query"] for q in json.load(f) if q["type"] != "manufacturer_part_number"]
+    messages = (queries * (args.turns // len(queries) + 1))[: args.turns]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.devnull, "w") as log:
+            await replay(messages[:20], 0.0, log)  # warm-up: classifier, chains, imports
+        rates = (1.0, 0.01, 0.0)
+        latencies = {rate: [] for rate in rates}
+        sizes = {rate: 0 for rate in rates}
+        retrieved = None
+        for _ in range(args.rounds):
+            for rate in rates:
+                path = os.path.join(tmp, f"log-{rate}")
+                with open(path, "w") as log:
+                    turns, retrieved = await replay(messages, rate, log)
+                latencies[rate] += turns
+                sizes[rate] += os.path.getsize(path)
+        print(f"{'traces':<22} {'ms/turn p50':>11} {'mean':>8} {'log bytes/turn':>15}")
+        for rate in rates:
+            print(f"{f'sample rate {rate:g}':<22} {statistics.median(latencies[rate]) * 1000:>11.2f} "
+                  f"{statistics.mean(latencies[rate]) * 1000:>8.2f} {sizes[rate] / len(latencies[rate]):>15.0f}")
+
+        path = os.path.join(tmp, "legacy")
+        with open(path, "w") as log, contextlib.redirect_stdout(log):
+            start = time.perf_counter()
+            for docs in retrieved:
+                legacy_dump(docs)
+            log.flush()
+            seconds = time.perf_counter() - start
+        print(f"{'every turn, before':<22} {'':>11} {seconds / len(retrieved) * 1000:>8.2f} "
+              f"{os.path.getsize(path) / len(retrieved):>15.0f}   (dump alone, on top of the turn)")
+
+    metrics = Metrics(sample_rate=0.0)
+    n = 100_000
+    start = time.perf_counter()
+    for _ in range(n):
+        with metrics.span("bench"):
+            pass
+    print(f"span enter/exit: {(time.perf_counter() - start) / n * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
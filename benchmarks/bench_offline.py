@@ -0,0 +1,86 @@
+"""
+The whole /chat pipeline offline, twice, to check that runs are reproducible.
+
+    python -m benchmarks.bench_offline --llm-ms 300 --tokens-per-second 50 --runs 2
+
+Runs with PROVIDERS=offline (backend/providers.py): the stub chat model with the given latency
+and token rate, the hashed embedder and the in-memory index filled from the data files. Each run
+builds everything through the app's startup as configured (nothing is passed in), replays
+benchmarks/data/conversations.json turn by turn from fresh sessions and caches, and prints the
+turn latency, the upstream calls and how many answers differ from the first run (should be 0).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+
+
+def use_offline_providers(llm_ms: float, tokens_per_second: float, embedding_ms: float):
+    """Select the offline providers; call before backend.resources / backend.providers are imported."""
+    os.environ["PROVIDERS"] = "offline"
+    os.environ["LLM_STUB_LATENCY_MS"] = str(llm_ms)
+    os.environ["LLM_STUB_TOKENS_PER_SECOND"] = str(tokens_per_second)
+    os.environ["EMBEDDING_STUB_LATENCY_MS"] = str(embedding_ms)
+
+
+async def replay(conversations):
+    import backend.app as app_module
+    from backend.answer_cache import set_answer_cache
+    from backend.metrics import set_metrics
+    from backend.resources import Resources, set_resources
+    from backend.session_store import SessionStore, set_session_store
+    from backend.single_flight import set_single_flight
+
+    resources = Resources()
+    set_resources(resources)
+    set_session_store(SessionStore())
+    set_answer_cache(None)
+    set_single_flight(None)
+    set_metrics(None)
+    answers, latencies = [], []
+    async with app_module.app.router.lifespan_context(app_module.app):
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for c, conversation in enumerate(conversations):
+                for turn in conversation["turns"]:
+                    start = time.perf_counter()
+                    r = await client.post("/chat", json={"session_id": f"offline-{c}", "message": turn["message"]})
+                    r.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                    answers.append(r.json()["answer"])
+    calls = {
+        "llm": resources.llm.calls,
+        "llm_open": resources.llm_open.calls,
+        "embeddings": resources.embeddings.underlying.calls,
+    }
+    return answers, latencies, calls
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ms", type=float, default=300)
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument("--embedding-ms", type=float, default=20)
+    parser.add_argument("--runs", type=int, default=2)
+    args = parser.parse_args()
+
+    use_offline_providers(args.llm_ms, args.tokens_per_second, args.embedding_ms)
+
+    with open("benchmarks/data/conversations.json") as f:
+        conversations = json.load(f)
+    first = None
+    for run in range(1, args.runs + 1):
+        answers, latencies, calls = await replay(conversations)
+        ms = sorted(s * 1000 for s in latencies)
+        differ = sum(a != b for a, b in zip(answers, first)) if first else 0
+        first = first or answers
+        print(f"run {run}: {len(ms)} turns, p50 {statistics.median(ms):7.1f} ms, "
+              f"p95 {ms[int(len(ms) * 0.95) - 1]:7.1f} ms, calls {calls}, answers differing from run 1: {differ}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""
+Order lookup latency: local OrderStore vs the zero-vector index query.
+
+    python -m benchmarks.bench_order_lookup --lookups 5000 --rtt-ms 0
+
+The index path runs `pinecone_search_order` against a local stand-in that serialises the
+request payload (1536-float vector + filter) and scans the metadata like a filtered query,
+so the numbers show the client-side cost; pass --rtt-ms to add a simulated network round trip.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from backend.core import pinecone_search_order
+from backend.order_store import OrderStore, TRANSACTIONS_PATH
+from backend.resources import Resources, set_resources
+
+
+class LocalIndexStandIn:
+    def __init__(self, records: list[dict], rtt_ms: float = 0.0):
+        self.records = records
+        self.rtt = rtt_ms / 1000
+
+    def query(self, vector, top_k, namespace, include_metadata, filter):
+        payload = json.dumps({"vector": vector, "top_k": top_k, "namespace": namespace, "filter": filter})
+        request = json.loads(payload)
+        if self.rtt:
+            time.sleep(self.rtt)
+        wanted = request["filter"]["order_id_norm"]["$eq"]
+        matches = [{"id": str(i), "score": 0.0, "metadata": m}
+                   for i, m in enumerate(self.records) if m["order_id_norm"] == wanted]
+        return {"matches": matches[:top_k]}
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def run(label, lookup, ids):
+    timings = []
+    for order_id in ids:
+        start = time.perf_counter()
+        lookup(order_id)
+        timings.append((time.perf_counter() - start) * 1e6)
+    p50, p99 = percentiles(timings)
+    print(f"{label:>12}: p50={p50:9.1f} us  p99={p99:9.1f} us  mean={statistics.mean(timings):9.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--rtt-ms", type=float, default=0.0)
+    parser.add_argument("--path", default=TRANSACTIONS_PATH)
+    args = parser.parse_args()
+
+    store = OrderStore(path=args.path, fallback=None)
+    records = list(store._orders.values())
+    set_resources(Resources(index=LocalIndexStandIn(records, args.rtt_ms)))
+
+    rng = random.Random(0)
+    ids = [rng.choice(records)["order_id"] for _ in range(args.lookups)]
+    print(f"{len(records)} orders, {args.lookups} lookups")
+    run("order store", store.get, ids)
+    run("index query", pinecone_search_order, ids)
+
+
+if __name__ == "__main__":
+    main()
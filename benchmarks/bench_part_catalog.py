@@ -0,0 +1,95 @@
+"""
+Latency saved per part-number question by the keyed part catalog.
+
+    python -m benchmarks.bench_part_catalog --embed-ms 80 --vector-ms 60 --llm-ms 400
+
+Replays part-number and manufacturer-part-number questions built from data/parts_data.json
+through /chat with PART_CATALOG_FAST_PATH off and on. The stub vector store sleeps
+`--embed-ms` (query embedding) plus `--vector-ms` (index round trip) per search and the stub
+LLM `--llm-ms` per call, so the difference is what the catalog takes off each turn.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import httpx
+
+import backend.app as app_module
+from backend.part_catalog import PartCatalog, set_part_catalog
+from backend.resources import set_resources
+from backend.session_store import SessionStore, set_session_store
+from benchmarks.bench_concurrency import StaticVectorStore, stub_resources
+
+
+class SlowVectorStore(StaticVectorStore):
+    delay: float = 0.14
+    searches: int = 0
+
+    def similarity_search(self, query, k=4, **kwargs):
+        self.searches += 1
+        time.sleep(self.delay)
+        return self.docs[:k]
+
+    async def asimilarity_search(self, query, k=4, **kwargs):
+        self.searches += 1
+        await asyncio.sleep(self.delay)
+        return self.docs[:k]
+
+
+def questions(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    with open("data/parts_data.json") as f:
+        parts = json.load(f)
+    templates = ["How do I install {pn}?", "What is the price of {pn}?", "Troubleshooting tips for {pn}",
+                 "Tell me about manufacturer part {mpn}"]
+    for i in range(n):
+        part = rng.choice(parts)
+        yield templates[i % len(templates)].format(pn=part["part_number"], mpn=part["manufacturer_part_number"])
+
+
+async def replay(messages, fast_path: bool, args):
+    resources = stub_resources(args.llm_ms / 1000)
+    store = resources.vector_store("products")
+    slow = SlowVectorStore(store.embeddings, store.docs)
+    slow.delay = (args.embed_ms + args.vector_ms) / 1000
+    resources._vector_stores["products"] = slow
+    set_resources(resources)
+    set_session_store(SessionStore())
+    app_module.PART_CATALOG_FAST_PATH = fast_path
+    latencies = []
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i, message in enumerate(messages):
+            start = time.perf_counter()
+            r = await client.post("/chat", json={"session_id": f"catalog-{fast_path}-{i}", "message": message})
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    return latencies, slow.searches, resources.llm.calls
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embed-ms", type=float, default=80)
+    parser.add_argument("--vector-ms", type=float, default=60)
+    parser.add_argument("--llm-ms", type=float, default=400)
+    parser.add_argument("--questions", type=int, default=40)
+    args = parser.parse_args()
+
+    set_part_catalog(PartCatalog("data/parts_data.json"))
+    messages = list(questions(args.questions))
+    results = {}
+    for fast_path in (False, True):
+        results[fast_path] = await replay(messages, fast_path, args)
+    for fast_path, (latencies, searches, calls) in results.items():
+        label = "catalog" if fast_path else "vector search"
+        print(f"{label:<14} mean {statistics.mean(latencies) * 1000:7.1f} ms  p50 "
+              f"{statistics.median(latencies) * 1000:7.1f} ms  vector searches {searches:>3}  LLM calls {calls}")
+    saved = statistics.mean(results[False][0]) - statistics.mean(results[True][0])
+    print(f"saved per part-number question: {saved * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,260 @@
+"""
+Replay load test for /chat: multi-turn conversation scripts at several concurrency levels, with
+results saved as JSON and compared against a baseline run.
+
+    python -m benchmarks.bench_replay --concurrency 1,8,32 --conversations 64
+    python -m benchmarks.bench_replay --scripts synthetic --conversations 500 --baseline benchmarks/results/replay-before.json
+
+Scripts are benchmarks/data/conversations.json (product lookups, compatibility, order
+status/cancel/return, policy) or, with `--scripts synthetic`, the generated ones
+(data/synthetic/conversations.jsonl if present, otherwise built in memory with
+data/synth_data.py). Each virtual user takes the next script and sends its turns in order on
+one session, so follow-ups see the previous turns. The app runs in process on the offline
+providers (backend/providers.py, see benchmarks/bench_offline.py) with fresh sessions and caches
+(answers, embeddings, in-flight lookups) per level. The run stops first if an order ID in the
+scripts does not parse as an order (backend/extractor.py).
+
+Per level it reports throughput, p50/p95/p99 latency per intent branch (the script's label),
+the turns per routed branch, upstream calls (LLM, embeddings, vector and BM25 queries, order
+lookups) and RSS growth. With `--baseline`, a level is flagged when a p95 (by more than
+`--latency-slack-ms` as well) or the upstream calls per turn grow, or the throughput drops, by
+more than `--tolerance`, when the RSS growth exceeds the baseline's by more than
+`--memory-slack-mib`, or when there are more errors; the exit status is 1 when anything is flagged.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import re
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.bench_offline import use_offline_providers
+from benchmarks.bench_session_soak import rss_mib
+
+STAGE_CALLS = ("embedding", "vector_query", "bm25", "order_lookup")
+# Any generated order ID, wider than the app's ORDER_PATTERN on purpose
+SCRIPT_ORDER_RE = re.compile(r"\bPSO\d+\b")
+
+
+def load_scripts(source: str, count: int) -> list[dict]:
+    if source == "conversations":
+        with open("benchmarks/data/conversations.json") as f:
+            return json.load(f)
+    path = "data/synthetic/conversations.jsonl"
+    if os.path.exists(path):
+        with open(path) as f:
+            return [json.loads(line) for _, line in zip(range(count), f)]
+    from data.synth_data import Generator
+    generator = Generator(5000, 2000, seed=0)
+    return [generator.conversation(c) for c in range(count)]
+
+
+def check_order_ids(scripts: list[dict]):
+    """
+    Stop unless every order ID in the scripts parses as an order in the app, so the order turns
+    measure the order branch rather than the product path an unparsed ID falls into.
+    """
+    from backend.extractor import get_extractor
+
+    extractor = get_extractor()
+    for script in scripts:
+        for turn in script["turns"]:
+            for order in SCRIPT_ORDER_RE.findall(turn["message"]):
+                if extractor.extract(turn["message"]).order != order:
+                    raise SystemExit(f"order ID {order} in script {script.get('name')!r} does not parse as an order: "
+                                     f"{turn['message']!r}")
+
+
+def percentiles(seconds: list[float]) -> dict:
+    ms = np.array(seconds) * 1000
+    return {
+        "count": len(ms),
+        "p50": round(float(np.percentile(ms, 50)), 2),
+        "p95": round(float(np.percentile(ms, 95)), 2),
+        "p99": round(float(np.percentile(ms, 99)), 2),
+    }
+
+
+def upstream_calls(resources, metrics) -> dict:
+    stages = {key[0]: count for key, count in metrics.stage_seconds.counts().items()}
+    calls = {
+        "llm": resources.llm.calls,
+        "llm_open": resources.llm_open.calls,
+        "embeddings": getattr(getattr(resources.embeddings, "underlying", None), "calls", 0),
+    }
+    calls.update({stage: stages.get(stage, 0) for stage in STAGE_CALLS})
+    return calls
+
+
+async def run_level(client, scripts, level: int, conversations: int):
+    from backend.answer_cache import set_answer_cache
+    from backend.metrics import Metrics, set_metrics
+    from backend.resources import get_resources
+    from backend.session_store import SessionStore, get_session_store, set_session_store
+    from backend.single_flight import set_single_flight
+
+    resources = get_resources()
+    metrics = Metrics(sample_rate=0.0)
+    set_metrics(metrics)
+    set_session_store(SessionStore())
+    set_answer_cache(None)
+    set_single_flight(None)
+    if hasattr(resources.embeddings, "clear"):
+        resources.embeddings.clear()
+    gc.collect()
+    rss_before = rss_mib()
+    calls_before = upstream_calls(resources, metrics)
+
+    queue = asyncio.Queue()
+    for i in range(conversations):
+        queue.put_nowait(i)
+    latencies, errors = {}, 0
+
+    async def user():
+        nonlocal errors
+        while not queue.empty():
+            i = queue.get_nowait()
+            script = scripts[i % len(scripts)]
+            for turn in script["turns"]:
+                start = time.perf_counter()
+                r = await client.post("/chat", json={"session_id": f"replay-{level}-{i}", "message": turn["message"]})
+                seconds = time.perf_counter() - start
+                if r.status_code != 200:
+                    errors += 1
+                    continue
+                latencies.setdefault(turn.get("intent", "unlabeled"), []).append(seconds)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(level)))
+    elapsed = time.perf_counter() - start
+
+    sessions = get_session_store().stats()
+    gc.collect()
+    rss_after = rss_mib()
+    calls_after = upstream_calls(resources, metrics)
+    calls = {name: calls_after[name] - calls_before[name] for name in calls_after}
+    turns = sum(len(v) for v in latencies.values())
+    routed = {}
+    for (endpoint, intent), count in metrics.turn_seconds.counts().items():
+        routed[intent or "none"] = routed.get(intent or "none", 0) + count
+    return {
+        "concurrency": level,
+        "conversations": conversations,
+        "turns": turns,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "turns_per_second": round(turns / elapsed, 2),
+        "latency_ms": {"all": percentiles([s for v in latencies.values() for s in v]),
+                       **{intent: percentiles(v) for intent, v in sorted(latencies.items())}},
+        "routed": routed,
+        "upstream_calls": calls,
+        "upstream_calls_per_turn": {name: round(n / turns, 3) for name, n in calls.items()} if turns else {},
+        "sessions": sessions,
+        "rss_mib": {"before": round(rss_before, 1), "after": round(rss_after, 1),
+                    "growth": round(rss_after - rss_before, 1)},
+    }
+
+
+def regressions(result: dict, baseline: dict, tolerance: float, latency_slack_ms: float,
+                memory_slack_mib: float) -> list[str]:
+    """Differences from `baseline` beyond the tolerances, for the levels both runs have."""
+    flags = []
+    before = {level["concurrency"]: level for level in baseline["levels"]}
+    for level in result["levels"]:
+        old = before.get(level["concurrency"])
+        if old is None:
+            continue
+        tag = f"concurrency {level['concurrency']}"
+        if level["turns_per_second"] < old["turns_per_second"] * (1 - tolerance):
+            flags.append(f"{tag}: throughput {old['turns_per_second']} -> {level['turns_per_second']} turns/s")
+        for intent, latency in level["latency_ms"].items():
+            old_latency = old["latency_ms"].get(intent)
+            if old_latency and latency["p95"] > max(old_latency["p95"] * (1 + tolerance),
+                                                    old_latency["p95"] + latency_slack_ms):
+                flags.append(f"{tag}: {intent} p95 {old_latency['p95']} -> {latency['p95']} ms")
+        for name, per_turn in level["upstream_calls_per_turn"].items():
+            old_per_turn = old["upstream_calls_per_turn"].get(name, 0)
+            if per_turn > old_per_turn * (1 + tolerance) and per_turn - old_per_turn > 0.01:
+                flags.append(f"{tag}: {name} calls/turn {old_per_turn} -> {per_turn}")
+        if level["rss_mib"]["growth"] > old["rss_mib"]["growth"] + memory_slack_mib:
+            flags.append(f"{tag}: RSS growth {old['rss_mib']['growth']} -> {level['rss_mib']['growth']} MiB")
+        if level["errors"] > old["errors"]:
+            flags.append(f"{tag}: errors {old['errors']} -> {level['errors']}")
+    return flags
+
+
+def print_level(level: dict):
+    calls = " ".join(f"{name}={n}" for name, n in level["upstream_calls_per_turn"].items())
+    print(f"concurrency {level['concurrency']:>4}: {level['turns']} turns in {level['seconds']:.1f}s, "
+          f"{level['turns_per_second']:.1f} turns/s, {level['errors']} errors, "
+          f"RSS +{level['rss_mib']['growth']} MiB, calls/turn {calls}")
+    for intent, latency in level["latency_ms"].items():
+        print(f"    {intent:<20} n={latency['count']:<6} p50 {latency['p50']:8.1f}  p95 {latency['p95']:8.1f}  "
+              f"p99 {latency['p99']:8.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scripts", choices=("conversations", "synthetic"), default="conversations")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--conversations", type=int, default=64, help="scripts replayed per level (cycled)")
+    parser.add_argument("--llm-ms", type=float, default=300)
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument("--embedding-ms", type=float, default=20)
+    parser.add_argument("--out", default=None, help="results file (default benchmarks/results/replay-<time>.json)")
+    parser.add_argument("--baseline", default=None, help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    # Absolute allowances on top of --tolerance, for branches that take a millisecond or two
+    parser.add_argument("--latency-slack-ms", type=float, default=10)
+    parser.add_argument("--memory-slack-mib", type=float, default=10)
+    args = parser.parse_args()
+
+    use_offline_providers(args.llm_ms, args.tokens_per_second, args.embedding_ms)
+    import backend.app as app_module
+
+    scripts = load_scripts(args.scripts, args.conversations)
+    check_order_ids(scripts)
+    levels = [int(x) for x in args.concurrency.split(",")]
+    result = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {**{k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+                   "scripts_loaded": len(scripts)},
+        "levels": [],
+    }
+    async with app_module.app.router.lifespan_context(app_module.app):
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Warm-up: chains, classifier, tokenizer and the first LLM/embedding calls
+            await run_level(client, scripts, 1, min(len(scripts), 4))
+            rss_start = rss_mib()
+            for level in levels:
+                outcome = await run_level(client, scripts, level, max(args.conversations, level))
+                result["levels"].append(outcome)
+                print_level(outcome)
+    result["rss_mib_growth_total"] = round(rss_mib() - rss_start, 1)
+    print(f"RSS growth over all levels: {result['rss_mib_growth_total']} MiB")
+
+    out = args.out or f"benchmarks/results/replay-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        result["baseline"] = args.baseline
+        result["regressions"] = regressions(result, baseline, args.tolerance, args.latency_slack_ms,
+                                            args.memory_slack_mib)
+        print(f"vs {args.baseline}: " + ("no regressions" if not result["regressions"] else
+                                          f"{len(result['regressions'])} regression(s)"))
+        for flag in result["regressions"]:
+            print(f"  REGRESSION {flag}")
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"results written to {out}")
+    return 1 if result.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
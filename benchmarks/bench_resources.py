@@ -0,0 +1,75 @@
+"""
+Startup and per-new-session cost of the chat chain.
+
+    python -m benchmarks.bench_resources            # live clients, needs the keys in .env
+    python -m benchmarks.bench_resources --offline  # langchain fakes, measures prompt parsing + chain assembly only
+
+"legacy" builds a fresh client stack for every session (what build_chain used to do),
+"shared" builds the registry once and only assembles the chain per session.
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from langchain.memory import ConversationBufferMemory
+from backend.core import build_chain
+from backend.resources import Resources
+
+
+def make_resources(offline: bool) -> Resources:
+    if not offline:
+        return Resources()
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from langchain_core.language_models import FakeListChatModel
+    from langchain_core.vectorstores import InMemoryVectorStore
+    embeddings = DeterministicFakeEmbedding(size=1536)
+    return Resources(
+        index=object(),
+        embeddings=embeddings,
+        llm=FakeListChatModel(responses=["ok"]),
+        llm_open=FakeListChatModel(responses=["ok"]),
+        vector_stores={ns: InMemoryVectorStore(embeddings) for ns in ("products", "transactions")},
+    )
+
+
+def new_memory():
+    return ConversationBufferMemory(memory_key="chat_history", return_messages=True, output_key="answer")
+
+
+def time_sessions(sessions: int, offline: bool, shared: bool):
+    shared_resources = make_resources(offline).warm() if shared else None
+    timings = []
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    keep = []
+    for _ in range(sessions):
+        start = time.perf_counter()
+        resources = shared_resources or make_resources(offline).warm()
+        keep.append(build_chain(memory=new_memory(), namespace="products", resources=resources))
+        timings.append((time.perf_counter() - start) * 1000)
+    per_session = (tracemalloc.get_traced_memory()[0] - base) / sessions
+    tracemalloc.stop()
+    return timings, per_session
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--offline", action="store_true")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    make_resources(args.offline).warm()
+    print(f"startup (registry warm): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    for label, shared in (("legacy", False), ("shared", True)):
+        timings, per_session = time_sessions(args.sessions, args.offline, shared)
+        print(
+            f"{label:>6}: new session p50={statistics.median(timings):.2f} ms "
+            f"max={max(timings):.2f} ms  mem/session={per_session / 1024:.1f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Per-turn read/write cost of the session backends.
+
+    python -m benchmarks.bench_session_backend --turns 50 --sessions 200
+
+Two SessionStores share one backend to play two uvicorn workers that alternate turns of the
+same conversations, so every turn pays a restore (the other worker wrote last) and a commit.
+Reported per turn: get (version check + restore) and commit (encode + write), at several
+conversation lengths, plus the encoded record size.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from backend.session_backends import InMemorySessionBackend, SQLiteSessionBackend, encode_record
+from backend.session_store import SessionStore
+
+QUESTION = "Is the ice maker PS2375646 compatible with my WRF555SDFZ?"
+ANSWER = "Yes, PS2375646 fits the WRF555SDFZ. Disconnect power, remove the old unit, connect the water line and test. " * 2
+
+
+def run(backend, sessions: int, turns: int, report_at):
+    workers = [SessionStore(backend=backend), SessionStore(backend=backend)]
+    get_us, commit_us = {}, {}
+    for turn in range(1, turns + 1):
+        store = workers[turn % 2]
+        gets, commits = [], []
+        for i in range(sessions):
+            session_id = f"bench-{i}"
+            start = time.perf_counter()
+            state = store.get_or_create(session_id)
+            gets.append(time.perf_counter() - start)
+            state.ctx["active_part"] = "ps2375646"
+            state.memory.save_context({"question": QUESTION}, {"answer": ANSWER})
+            start = time.perf_counter()
+            store.commit(session_id)
+            commits.append(time.perf_counter() - start)
+        if turn in report_at:
+            get_us[turn] = statistics.median(gets) * 1e6
+            commit_us[turn] = statistics.median(commits) * 1e6
+    record_bytes = len(encode_record(workers[turns % 2].peek("bench-0").to_record()))
+    return get_us, commit_us, record_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+    report_at = {t for t in (1, 10, 50) if t <= args.turns} | {args.turns}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "memory": InMemorySessionBackend(),
+            "sqlite": SQLiteSessionBackend(os.path.join(tmp, "sessions.sqlite3")),
+        }
+        for name, backend in backends.items():
+            get_us, commit_us, record_bytes = run(backend, args.sessions, args.turns, report_at)
+            for turn in sorted(report_at):
+                print(f"{name:>6} turn {turn:>3}: get p50={get_us[turn]:8.1f} us  commit p50={commit_us[turn]:8.1f} us")
+            print(f"{name:>6} record size after {args.turns} turns: {record_bytes / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Soak test for the session store: create many sessions with one chat turn each and report RSS.
+
+    python -m benchmarks.bench_session_soak --sessions 100000 --max-entries 10000
+    python -m benchmarks.bench_session_soak --sessions 100000 --unbounded
+
+Each session gets the entity context `resolve_entities` fills in and one question/answer
+pair in its memory, which is what a visitor who asks a single question leaves behind.
+"""
+import argparse
+import gc
+import resource
+import time
+
+from backend.session_store import SessionStore
+
+QUESTION = "How do I install the door seal gasket PS11752778 on my WDT780SAEM1?"
+ANSWER = "Disconnect power, remove the old gasket, clean the door frame and press the new gasket in from the top corner. " * 3
+
+
+def rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * resource.getpagesize() / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--max-entries", type=int, default=10_000)
+    parser.add_argument("--max-bytes", type=int, default=0)
+    parser.add_argument("--ttl", type=float, default=3600)
+    parser.add_argument("--unbounded", action="store_true")
+    parser.add_argument("--report-every", type=int, default=20_000)
+    args = parser.parse_args()
+
+    if args.unbounded:
+        store = SessionStore(max_entries=None, max_bytes=None, ttl_seconds=None)
+    else:
+        store = SessionStore(max_entries=args.max_entries, max_bytes=args.max_bytes or None, ttl_seconds=args.ttl)
+
+    gc.collect()
+    base = rss_mib()
+    start = time.perf_counter()
+    for i in range(args.sessions):
+        session_id = f"soak-{i}"
+        state = store.get_or_create(session_id)
+        state.ctx.update(active_part="ps11752778", active_model="wdt780saem1")
+        state.memory.save_context({"question": QUESTION}, {"answer": ANSWER})
+        store.account(session_id)
+        if (i + 1) % args.report_every == 0:
+            stats = store.stats()
+            print(f"{i + 1:>8} sessions: rss=+{rss_mib() - base:7.1f} MiB resident={stats['sessions']:>7} "
+                  f"est={stats['resident_bytes'] / 2**20:6.1f} MiB evictions={stats['evictions']}")
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    print(f"done in {elapsed:.1f}s ({args.sessions / elapsed:,.0f} sessions/s), final rss=+{rss_mib() - base:.1f} MiB")
+    print(store.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Upstream calls and latency for N concurrent identical /chat requests, with and without single-flight.
+
+    python -m benchmarks.bench_single_flight --concurrency 1 10 50 100 --vector-ms 140 --llm-ms 600
+
+Two spikes, each sent as N simultaneous requests from N different sessions:
+
+- a product question ("my ice maker is not making ice ..."): the stub vector store sleeps
+  `--vector-ms` per search (query embedding + index round trip) and the stub LLM `--llm-ms`
+  per call; the answer cache is on in both runs, so without coalescing every request misses it;
+- an order status question for an ID that is not in the local order store, so it goes to the
+  index fallback, stubbed to sleep `--order-ms`.
+
+For each N it prints the vector searches, LLM calls and order-index queries made, and the p50 and
+max latency, with SINGLE_FLIGHT off and on.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+import backend.app as app_module
+from backend.answer_cache import AnswerCache, set_answer_cache
+from backend.order_store import OrderStore, set_order_store
+from backend.resources import set_resources
+from backend.session_store import SessionStore, set_session_store
+from backend.single_flight import SingleFlight, set_single_flight
+from benchmarks.bench_concurrency import stub_resources
+from benchmarks.bench_part_catalog import SlowVectorStore
+
+PRODUCT_QUESTION = "My ice maker is not making ice, which part do I need?"
+ORDER_QUESTION = "What is the status of order PSO9999?"
+
+
+class SlowOrderIndex:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.queries = 0
+
+    def __call__(self, order_id):
+        self.queries += 1
+        time.sleep(self.delay)
+        return {"order_id": order_id.upper(), "status": "shipped", "carrier": "UPS", "address_city": "Dallas"}
+
+
+async def spike(n: int, coalesce: bool, args):
+    resources = stub_resources(args.llm_ms / 1000)
+    store = resources.vector_store("products")
+    slow = SlowVectorStore(store.embeddings, store.docs)
+    slow.delay = args.vector_ms / 1000
+    resources._vector_stores["products"] = slow
+    set_resources(resources)
+    set_session_store(SessionStore())
+    set_answer_cache(AnswerCache())
+    set_single_flight(SingleFlight(enabled=coalesce))
+    order_index = SlowOrderIndex(args.order_ms / 1000)
+    set_order_store(OrderStore(fallback=order_index))
+    app_module.RETRIEVAL_MODE = "vector"
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i, message):
+            start = time.perf_counter()
+            r = await client.post("/chat", json={"session_id": f"spike-{coalesce}-{i}", "message": message})
+            r.raise_for_status()
+            return time.perf_counter() - start
+
+        results = {}
+        for label, message in (("product", PRODUCT_QUESTION), ("order", ORDER_QUESTION)):
+            latencies = await asyncio.gather(*(one(f"{label}-{i}", message) for i in range(n)))
+            results[label] = latencies
+    return results, slow.searches, resources.llm.calls, order_index.queries
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--vector-ms", type=float, default=140)
+    parser.add_argument("--llm-ms", type=float, default=600)
+    parser.add_argument("--order-ms", type=float, default=80)
+    args = parser.parse_args()
+
+    print(f"{'N':>4} {'single-flight':<13} {'searches':>8} {'LLM':>5} {'orders':>6}   "
+          f"{'product p50/max ms':>20}   {'order p50/max ms':>18}")
+    for n in args.concurrency:
+        for coalesce in (False, True):
+            results, searches, calls, orders = await spike(n, coalesce, args)
+            cells = "   ".join(f"{statistics.median(v) * 1000:9.1f}/{max(v) * 1000:8.1f}"
+                               for v in (results["product"], results["order"]))
+            print(f"{n:>4} {'on' if coalesce else 'off':<13} {searches:>8} {calls:>5} {orders:>6}   {cells}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Time-to-first-token of /chat/stream against the buffered /chat endpoint.
+
+    python -m benchmarks.bench_streaming --first-token-ms 300 --token-ms 20 --tokens 120
+
+Uses the stub LLM from bench_concurrency, which waits `first-token-ms` and then emits one
+token every `token-ms`. For /chat the first byte is the whole response. The app is served by
+an in-process uvicorn on a local port (httpx's ASGI transport buffers whole responses).
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from backend.app import app
+from backend.resources import set_resources
+from benchmarks.bench_concurrency import stub_resources
+
+QUESTIONS = [
+    "How do I install a refrigerator door gasket?",   # first turn: no condense step
+    "and what if the door still won't seal?",         # follow-up: condense + answer
+]
+
+
+async def buffered(client, session_id, message):
+    start = time.perf_counter()
+    r = await client.post("/chat", json={"session_id": session_id, "message": message})
+    r.raise_for_status()
+    total = time.perf_counter() - start
+    return total, total
+
+
+async def streamed(client, session_id, message):
+    start = time.perf_counter()
+    first = None
+    async with client.stream("POST", "/chat/stream", json={"session_id": session_id, "message": message}) as r:
+        async for line in r.aiter_lines():
+            if first is None and line in ("event: token", "event: final"):
+                first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def serve_in_background() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--tokens", type=int, default=120)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    reply = " ".join(f"tok{i}" for i in range(args.tokens))
+    set_resources(stub_resources(args.first_token_ms / 1000, args.token_ms / 1000, reply))
+    base_url = serve_in_background()
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        for label, call in (("/chat", buffered), ("/chat/stream", streamed)):
+            for turn, message in enumerate(QUESTIONS):
+                firsts, totals = [], []
+                for run in range(args.runs):
+                    session_id = f"{label}-{run}"
+                    first, total = await call(client, session_id, message)
+                    firsts.append(first * 1000)
+                    totals.append(total * 1000)
+                print(f"{label:>13} turn {turn + 1}: ttft p50={statistics.median(firsts):8.1f} ms  "
+                      f"total p50={statistics.median(totals):8.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,24 +1,170 @@
 import os
+import sys
 import json
+import time
+import hashlib
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from uuid import uuid4
 from pinecone import Pinecone, ServerlessSpec
 from langchain_openai import OpenAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from langchain_core.documents import Document
 # from ..backend.utils import norm
 
+# allow `python data/pc_vdb.py` from the repo root to import the backend package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.embedding_cache import CachedEmbeddings
+from backend.local_index import LocalVectorIndex, LocalVectorStore
+from backend.part_catalog import product_document
+from backend.providers import HashedEmbeddings
+from backend.order_store import transaction_document
+from backend.records import ID_FIELDS, doc_id, iter_records
+
 load_dotenv()
 
+# On-disk embedding cache shared with the backend, so re-ingesting unchanged text is free
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache")
+# Same switch as backend/resources.py: "local" fills the in-process index at LOCAL_INDEX_PATH instead
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "data/local_index")
+# Same switch as backend/resources.py: "hashed" embeds offline with backend/providers.py (pair it with
+# VECTOR_BACKEND=local and `--full` when the index held OpenAI vectors before)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+
+# Ingestion pipeline knobs: texts per embeddings call, parallel embedding calls,
+# vectors per upsert request and attempts per upsert request
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "64"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+INGEST_UPSERT_CHUNK = int(os.getenv("INGEST_UPSERT_CHUNK", "100"))
+INGEST_MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", "5"))
+# Documents read, diffed against the manifest and handed to the embedders per step
+INGEST_SYNC_BATCH = int(os.getenv("INGEST_SYNC_BATCH", "1000"))
+# Hashes of what is currently in the target index; one manifest per index
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH") or (
+    os.path.join(LOCAL_INDEX_PATH, "manifest.sqlite3") if VECTOR_BACKEND == "local" else "data/ingest_manifest.sqlite3"
+)
+# Source files: a JSON array (as written by the *_create_data.py scripts) or JSONL, one record per line
+PARTS_PATH = os.getenv("PARTS_PATH", "data/parts_data.json")
+TRANSACTIONS_PATH = os.getenv("TRANSACTIONS_PATH", "data/transactions_data.json")
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def content_hashes(doc):
+    """(hash of the embedded text, hash of the metadata) for one document."""
+    text_hash = hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+    meta_hash = hashlib.sha1(json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return text_hash, meta_hash
+
+
+class IngestManifest:
+    """
+    Text hash and metadata hash of every vector in the index, in SQLite so a run over a very large
+    catalog only looks up the batch at hand. Each run stamps the rows it sees; rows left with an
+    older stamp at the end belong to documents that were removed from the source.
+    """
+
+    def __init__(self, path=INGEST_MANIFEST_PATH, autocommit=True):
+        self.path = path or ":memory:"
+        # Off for the local index, whose file is only written at the end of the run
+        self.autocommit = autocommit
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest ("
+            "namespace TEXT, id TEXT, text_hash TEXT, meta_hash TEXT, run INTEGER, "
+            "PRIMARY KEY (namespace, id))"
+        )
+        self.conn.commit()
+
+    def begin(self, namespace):
+        row = self.conn.execute("SELECT MAX(run) FROM manifest WHERE namespace = ?", (namespace,)).fetchone()
+        return (row[0] or 0) + 1
+
+    def lookup(self, namespace, ids):
+        """{id: (text_hash, meta_hash, run)} for the ids that are in the manifest."""
+        found = {}
+        for chunk in batched(ids, 500):
+            rows = self.conn.execute(
+                f"SELECT id, text_hash, meta_hash, run FROM manifest WHERE namespace = ? "
+                f"AND id IN ({','.join('?' * len(chunk))})",
+                (namespace, *chunk),
+            )
+            found.update((r[0], r[1:]) for r in rows)
+        return found
+
+    def record(self, namespace, rows, run):
+        """Store `rows` of (id, text_hash, meta_hash) as seen by `run`."""
+        self.conn.executemany(
+            "INSERT INTO manifest (namespace, id, text_hash, meta_hash, run) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (namespace, id) DO UPDATE SET text_hash = excluded.text_hash, "
+            "meta_hash = excluded.meta_hash, run = excluded.run",
+            [(namespace, key, text_hash, meta_hash, run) for key, text_hash, meta_hash in rows],
+        )
+        if self.autocommit:
+            self.conn.commit()
+
+    def stale(self, namespace, run):
+        """Ids not seen by `run`, fetched in chunks."""
+        while True:
+            rows = self.conn.execute(
+                "SELECT id FROM manifest WHERE namespace = ? AND run < ? LIMIT 1000", (namespace, run)
+            ).fetchall()
+            if not rows:
+                return
+            yield [r[0] for r in rows]
+
+    def forget_namespace(self, namespace):
+        self.conn.execute("DELETE FROM manifest WHERE namespace = ?", (namespace,))
+        if self.autocommit:
+            self.conn.commit()
+
+    def forget(self, namespace, ids):
+        self.conn.executemany("DELETE FROM manifest WHERE namespace = ? AND id = ?", [(namespace, i) for i in ids])
+        if self.autocommit:
+            self.conn.commit()
+
+    def commit(self):
+        self.conn.commit()
+
+    def count(self, namespace):
+        return self.conn.execute("SELECT COUNT(*) FROM manifest WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+
 class VectorStore:
-    def __init__(self):
+    def __init__(self, embeddings=None, index=None):
         self.index_name = "partselect-parts"
+        if embeddings is None and EMBEDDING_PROVIDER == "hashed":
+            embeddings = CachedEmbeddings(HashedEmbeddings(1536), model_name="hashed", path=None)
+        self.embeddings = embeddings or CachedEmbeddings(
+            OpenAIEmbeddings(model="text-embedding-3-small"),
+            model_name="text-embedding-3-small",
+            path=EMBEDDING_CACHE_PATH,
+        )
+        if index is not None:
+            self.index = index
+            return
+        if VECTOR_BACKEND == "local":
+            self.index = LocalVectorIndex(dimension=1536, path=LOCAL_INDEX_PATH)
+            return
         self.pinecone_api_key = os.getenv("PINECONE_API_KEY")
         self.pc = Pinecone(api_key=self.pinecone_api_key)
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
         self.setup_index()
         self.index = self.pc.Index(self.index_name)
-        self.vc = PineconeVectorStore(index=self.index, embedding=self.embeddings)
+
+    @property
+    def vc(self):
+        return self.get_vectorstore()
 
     def setup_index(self):
         if not self.pc.has_index(self.index_name):
@@ -34,81 +180,26 @@ class VectorStore:
         return text.lower().replace("-","").replace(" ","")
 
     def prepare_product_docs(self):
-        docs = []
-        with open('./data/parts_data.json') as f:
-            data = json.load(f)
-        for part in data:
-            text = f"""
-            Part Number: {part['part_number']}
-            Name: {part['name']}
-            Category: {part['category']}
-            Manufacturer: {part['manufacturer']}
-            Manufacturer Part Number: {part['manufacturer_part_number']}
-            Price: {part['price']}
-            Description: {part['description']}
-            Installation Guide: {part['installation_guide']}
-            Troubleshooting: {part['troubleshooting']}
-            Compatible Models: {', '.join(part['compatible_models'])}
-            Compatible Brands: {', '.join(part['compatible_brands'])}
-            """
-            metadata = {
-                "part_number": part["part_number"],
-                "part_number_norm": self.norm(part["part_number"]),
-                "name": part["name"],
-                "category": part["category"],
-                "price": part["price"],
-                "manufacturer": part["manufacturer"],
-                "manufacturer_part_number": part["manufacturer_part_number"],
-                "manufacturer_part_number_norm": self.norm(part["manufacturer_part_number"]),
-                "troubleshooting": part["troubleshooting"],
-                "installation_guide": part["installation_guide"],
-                "compatible_models": part["compatible_models"],
-                "compatible_models_norm": [self.norm(model) for model in part["compatible_models"]]
-            }
-            # print("Ingesting metadata keys:", list(metadata.keys()))
-            docs.append(Document(page_content=text, metadata=metadata))
-        return docs
-    
+        return list(self.iter_product_docs())
+
+    def iter_product_docs(self, path=PARTS_PATH):
+        return (self.product_doc(part) for part in iter_records(path))
+
+    # Price, status and carrier change often and do not help similarity search, so they live only in
+    # the metadata (the document prompts still show them). Changing them is a metadata-only update.
+    def product_doc(self, part):
+        # Shared with the backend's keyed part catalog, so both build identical documents
+        return product_document(part)
+
     def prepare_transaction_docs(self):
-        docs = []
-        with open('./data/transactions_data.json') as f:
-            data = json.load(f)
-        for txn in data:
-            items_str = "; ".join(
-                [f"{item['qty']}x {item['part_number']} @ ${item['price']}" for item in txn["items"]]
-            )
-            text = f"""
-            Order ID: {txn['order_id']}
-            Customer ID: {txn['customer_id']}
-            Created Date: {txn['created_id']}
-            Status: {txn['status']}
-            Carrier: {txn['carrier']}
-            Items: {items_str}
-            Address City: {txn['address_city']}
-            """
-            metadata = {
-                "order_id": txn["order_id"],
-                "order_id_norm": self.norm(txn["order_id"]),
-                "customer_id": txn["customer_id"],
-                "customer_id_norm": self.norm(txn["customer_id"]),
-                "created_id": txn["created_id"],
-                "status": txn["status"],
-                "carrier": txn["carrier"],
-                "address_city": txn["address_city"],
-                "category": "transaction",  # for filtering if needed
-                "item_part_numbers_norm": [self.norm(item["part_number"]) for item in txn["items"]]
-                # "items": [
-                #     {
-                #         "part_number": item["part_number"],
-                #         "part_number_norm": self.norm(item["part_number"]),
-                #         "qty": item["qty"],
-                #         "price": item["price"]
-                #     }
-                #     for item in txn["items"]
-                # ]
-            }
-            docs.append(Document(page_content=text, metadata=metadata))
-        return docs
+        return list(self.iter_transaction_docs())
+
+    def iter_transaction_docs(self, path=TRANSACTIONS_PATH):
+        return (self.transaction_doc(txn) for txn in iter_records(path))
+
+    def transaction_doc(self, txn):
+        # Shared with the backend's in-memory index (backend/providers.py)
+        return transaction_document(txn)
 
     # def ingest_documents(self):
     #     docs = self.prepare_docs()
@@ -118,35 +209,194 @@ class VectorStore:
     #         ids=uuids
     #     )
 
-    def ingest_documents(self):
-        # Ingest products
-        product_docs = self.prepare_product_docs()
-        product_uuids = [str(uuid4()) for _ in range(len(product_docs))]
-        self.vc.add_documents(
-            documents=product_docs,
-            ids=product_uuids,
-            namespace="products"
-        )
-        print(f"Ingested {len(product_docs)} product docs to namespace 'products'.")
-
-        # Ingest transactions
-        transaction_docs = self.prepare_transaction_docs()
-        txn_uuids = [str(uuid4()) for _ in range(len(transaction_docs))]
-        self.vc.add_documents(
-            documents=transaction_docs,
-            ids=txn_uuids,
-            namespace="transactions"
+    def with_retry(self, call, what):
+        for attempt in range(1, INGEST_MAX_RETRIES + 1):
+            try:
+                return call()
+            except Exception as e:
+                if attempt == INGEST_MAX_RETRIES:
+                    raise
+                delay = min(2 ** attempt * 0.5, 30)
+                print(f"{what} failed ({e}); retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def upsert_with_retry(self, vectors, namespace):
+        return self.with_retry(
+            lambda: self.index.upsert(vectors=vectors, namespace=namespace),
+            f"Upsert of {len(vectors)} vectors to '{namespace}'",
         )
-        print(f"Ingested {len(transaction_docs)} transaction docs to namespace 'transactions'.")
- 
+
+    def ingest_namespace(self, docs, namespace, workers=INGEST_WORKERS, embed_batch=INGEST_EMBED_BATCH,
+                         upsert_chunk=INGEST_UPSERT_CHUNK, on_written=None):
+        """
+        Embed `docs` (any iterable, consumed lazily) in batches on a thread pool and upsert them
+        under deterministic IDs in bounded chunks. `on_written(batch)` runs on the calling thread
+        after each batch is stored. Returns the number of vectors written.
+        """
+        total = len(docs) if hasattr(docs, "__len__") else None
+        start = time.perf_counter()
+        done = 0
+        step = max(total // 10, 1) if total else 10_000
+
+        def embed_and_upsert(batch):
+            vectors = self.embeddings.embed_documents([d.page_content for d in batch])
+            entries = [
+                (doc_id(namespace, d.metadata), vector, {**d.metadata, "text": d.page_content})
+                for d, vector in zip(batch, vectors)
+            ]
+            for chunk in batched(entries, upsert_chunk):
+                self.upsert_with_retry(chunk, namespace)
+            return batch
+
+        def finish(future):
+            nonlocal done
+            batch = future.result()
+            if on_written:
+                on_written(batch)
+            if (done + len(batch)) // step > done // step or done + len(batch) == total:
+                elapsed = time.perf_counter() - start
+                print(f"  [{namespace}] {done + len(batch)}/{total or '?'} docs, {(done + len(batch)) / elapsed:.1f} docs/s")
+            done += len(batch)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            # At most 2 * workers batches are queued, so memory stays bounded by the batch size
+            in_flight = []
+            for batch in batched(docs, embed_batch):
+                in_flight.append(pool.submit(embed_and_upsert, batch))
+                while len(in_flight) >= 2 * workers or (in_flight and in_flight[0].done()):
+                    finish(in_flight.pop(0))
+            for future in in_flight:
+                finish(future)
+        elapsed = time.perf_counter() - start
+        if done:
+            print(f"Ingested {done} docs to namespace '{namespace}' in {elapsed:.1f}s "
+                  f"({done / elapsed if elapsed else 0:.1f} docs/s).")
+        return done
+
+    def sync_namespace(self, docs, namespace, manifest, full=False, workers=INGEST_WORKERS):
+        """
+        Bring `namespace` in line with `docs` (streamed in INGEST_SYNC_BATCH steps) using the
+        manifest from the previous run: re-embed documents that are new or whose text changed,
+        patch the metadata of documents where only the metadata changed, and delete documents
+        that are gone. `full` re-embeds everything. A repeated id keeps its first document.
+        """
+        start = time.perf_counter()
+        run = manifest.begin(namespace)
+        counts = {"embedded": 0, "patched": 0, "unchanged": 0, "duplicates": 0, "removed": 0}
+
+        def record(batch):
+            manifest.record(namespace, [(doc_id(namespace, d.metadata), *content_hashes(d)) for d in batch], run)
+
+        def patch(doc):
+            key = doc_id(namespace, doc.metadata)
+            self.with_retry(
+                lambda: self.index.update(id=key, set_metadata=doc.metadata, namespace=namespace),
+                f"Metadata update of {key} in '{namespace}'",
+            )
+
+        def changed_docs(pool):
+            for batch in batched(docs, INGEST_SYNC_BATCH):
+                keys = [doc_id(namespace, d.metadata) for d in batch]
+                known = manifest.lookup(namespace, keys)
+                seen, to_embed, to_patch, unchanged = set(), [], [], []
+                for doc, key in zip(batch, keys):
+                    before = known.get(key)
+                    if key in seen or (before and before[2] == run):
+                        counts["duplicates"] += 1
+                        continue
+                    seen.add(key)
+                    text_hash, meta_hash = content_hashes(doc)
+                    if full or before is None or before[0] != text_hash:
+                        to_embed.append(doc)
+                    elif before[1] != meta_hash:
+                        to_patch.append(doc)
+                    else:
+                        unchanged.append((key, text_hash, meta_hash))
+                # Claim the ids for this run without hashes: a later duplicate is skipped, and if the
+                # run dies before the vectors are written the next run still re-embeds them
+                manifest.record(namespace, [(doc_id(namespace, d.metadata), None, None) for d in to_embed], run)
+                counts["embedded"] += len(to_embed)
+                yield from to_embed
+                list(pool.map(patch, to_patch))
+                record(to_patch)
+                manifest.record(namespace, unchanged, run)
+                counts["patched"] += len(to_patch)
+                counts["unchanged"] += len(unchanged)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            self.ingest_namespace(changed_docs(pool), namespace, workers=workers, on_written=record)
+        for ids in manifest.stale(namespace, run):
+            self.with_retry(lambda: self.index.delete(ids=ids, namespace=namespace),
+                            f"Delete of {len(ids)} vectors from '{namespace}'")
+            manifest.forget(namespace, ids)
+            counts["removed"] += len(ids)
+        print(f"Synced '{namespace}' in {time.perf_counter() - start:.1f}s: "
+              + ", ".join(f"{v} {k}" for k, v in counts.items()))
+        return counts
+
+    def namespace_count(self, namespace):
+        stats = self.index.describe_index_stats()
+        summary = stats["namespaces"].get(namespace)
+        return summary["vector_count"] if summary else 0
+
+    def purge_namespace(self, namespace, manifest):
+        """Empty `namespace` before a full rebuild (`--full`)."""
+        count = self.namespace_count(namespace)
+        if not count:
+            return
+        print(f"Deleting {count} vectors from '{namespace}' (--full) before re-ingesting.")
+        self.with_retry(lambda: self.index.delete(delete_all=True, namespace=namespace),
+                        f"Delete of all vectors in '{namespace}'")
+        manifest.forget_namespace(namespace)
+
+    def purge_unknown(self, namespace, manifest):
+        """
+        Delete the vectors of `namespace` whose IDs are not of the deterministic `part-` / `order-`
+        form (`backend.records.doc_id`): the uuid4-keyed vectors of ingestion runs before those
+        IDs, which would otherwise stay next to their re-ingested copies. Returns how many went.
+        """
+        prefix = f"{ID_FIELDS[namespace][0]}-"
+        unknown = [i for page in self.index.list(namespace=namespace) for i in page if not i.startswith(prefix)]
+        for ids in batched(unknown, INGEST_UPSERT_CHUNK):
+            self.with_retry(lambda ids=ids: self.index.delete(ids=ids, namespace=namespace),
+                            f"Delete of {len(ids)} vectors from '{namespace}'")
+            manifest.forget(namespace, ids)
+        print(f"Deleted {len(unknown)} vectors with unknown IDs from '{namespace}'.")
+        return len(unknown)
+
+    def ingest_documents(self, full=False, purge_unknown=False):
+        local = isinstance(self.index, LocalVectorIndex)
+        manifest = IngestManifest(autocommit=not local)
+        for namespace in ("products", "transactions"):
+            if full:
+                self.purge_namespace(namespace, manifest)
+            elif purge_unknown:
+                self.purge_unknown(namespace, manifest)
+            elif not manifest.count(namespace) and self.namespace_count(namespace):
+                # A fresh checkout or a lost manifest: the sync overwrites the vectors it knows by ID
+                print(f"'{namespace}' holds vectors the manifest has no rows for; "
+                      "pass --purge-unknown to delete those with non-deterministic (uuid4) IDs.")
+        self.sync_namespace(self.iter_product_docs(), "products", manifest, full=full)
+        self.sync_namespace(self.iter_transaction_docs(), "transactions", manifest, full=full)
+        self.embeddings.flush()
+        print("Embedding cache:", self.embeddings.stats())
+        if local:
+            self.index.save()
+            print(f"Saved local index to {self.index.path}.")
+        manifest.commit()
 
     def get_vectorstore(self):
+        if isinstance(self.index, LocalVectorIndex):
+            return LocalVectorStore(self.index, self.embeddings)
         return PineconeVectorStore(
             index=self.index,
             embedding=self.embeddings
         )
 
 if __name__ == "__main__":
+    # `--full` empties both namespaces and re-ingests every document instead of applying the diff.
+    # `--purge-unknown` first deletes the vectors whose IDs are not `part-...` / `order-...`, such as
+    # the uuid4-keyed ones of runs before the deterministic IDs. Neither happens without the flag.
     vector_store = VectorStore()
-    vector_store.ingest_documents()
-    print("Documents ingested successfully.")
\ No newline at end of file
+    vector_store.ingest_documents(full="--full" in sys.argv[1:], purge_unknown="--purge-unknown" in sys.argv[1:])
+    print("Documents ingested successfully.")
@@ -0,0 +1,191 @@
+"""
+Scalable, seeded generator for synthetic parts, orders and a matching query workload.
+
+    python data/synth_data.py --parts 1000000 --orders 10000000 --workers 8 --out data/synthetic
+
+Writes JSONL (one record per line) that `data/pc_vdb.py` and the backend read through
+`backend.records.iter_records` (point PARTS_PATH / TRANSACTIONS_PATH at the files):
+
+- parts.jsonl         same record shape as data/parts_data.json, built from the templates in
+                      prod_create_data.py
+- transactions.jsonl  same record shape as data/transactions_data.json
+- conversations.jsonl one multi-turn conversation per line, `{"name", "turns": [{"message",
+                      "intent"}]}` like benchmarks/data/conversations.json, for replay benchmarks
+
+Every record is a pure function of (--seed, its index), so the output is identical for any
+--workers; shards are generated in parallel processes and concatenated in order. --skew
+concentrates picks on hot parts and models (0 = uniform), --dup-ratio re-emits an earlier part
+number with a new price (what the ingestion dedupe has to handle). Dates count back from --as-of.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+# allow `python data/synth_data.py` from the repo root to import the data helpers
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.prod_create_data import DISHWASHER_PARTS, MANUFACTURERS, REF_PARTS
+from data.transactions_create_data import (
+    generate_carrier, generate_city, generate_customer_id, generate_order_id, generate_status,
+    random_date_within_last_year,
+)
+
+TEMPLATES = REF_PARTS + DISHWASHER_PARTS
+MODEL_PREFIXES = ["WDT", "WRF", "WRS", "FFTR", "FGID", "GDF", "KDTM", "MDB", "LFX", "RF"]
+SHARD_SIZE = 50_000
+
+
+def skewed_index(rng, n, skew):
+    """Index in [0, n); low indices are hot when skew > 0 (u ** (1 + skew) piles up near 0)."""
+    return min(int(n * rng.random() ** (1 + skew)), n - 1)
+
+
+def model_name(i):
+    return f"{MODEL_PREFIXES[i % len(MODEL_PREFIXES)]}{100000 + i}"
+
+
+class Generator:
+    def __init__(self, parts, orders, seed=0, skew=1.0, dup_ratio=0.0, models=None, as_of=None):
+        self.parts = parts
+        self.orders = orders
+        self.seed = seed
+        self.skew = skew
+        self.dup_ratio = dup_ratio
+        self.models = models or max(50, parts // 5)
+        self.as_of = as_of or datetime.now()
+
+    def rng(self, kind, i):
+        return random.Random(f"{self.seed}:{kind}:{i}")
+
+    def base_part(self, i):
+        """Part `i` of the catalog before duplication; orders refer to parts through this."""
+        rng = self.rng("part", i)
+        template = TEMPLATES[i % len(TEMPLATES)]
+        mfr = rng.choice(list(MANUFACTURERS.keys()))
+        part = dict(template)
+        part["part_number"] = f"PS{10000000 + i}"
+        part["name"] = f"{template['name']} - Model {i + 1}"
+        part["price"] = f"${rng.uniform(5, 250):.2f}"
+        part["manufacturer"] = mfr
+        part["manufacturer_part_number"] = f"{240000000 + i}"
+        part["compatible_brands"] = MANUFACTURERS[mfr]
+        part["compatible_models"] = sorted({model_name(skewed_index(rng, self.models, self.skew)) for _ in range(3)})
+        return part
+
+    def part(self, i):
+        """Record `i` of parts.jsonl: usually part i, sometimes a re-listing of an earlier part."""
+        rng = self.rng("dup", i)
+        if i and rng.random() < self.dup_ratio:
+            part = self.base_part(skewed_index(rng, i, self.skew))
+            part["price"] = f"${rng.uniform(5, 250):.2f}"
+            return part
+        return self.base_part(i)
+
+    def order(self, k):
+        rng = self.rng("order", k)
+        items = []
+        for j in {skewed_index(rng, self.parts, self.skew) for _ in range(rng.randint(1, 3))}:
+            part = self.base_part(j)
+            qty = rng.randint(1, 3)
+            items.append({
+                "part_number": part["part_number"],
+                "qty": qty,
+                "price": round(float(part["price"].replace("$", "").replace(",", "")) * qty, 2),
+            })
+        return {
+            "order_id": generate_order_id(k),
+            "customer_id": generate_customer_id(rng),
+            "created_id": random_date_within_last_year(rng, self.as_of),
+            "status": generate_status(rng),
+            "carrier": generate_carrier(rng),
+            "items": items,
+            "address_city": generate_city(rng),
+        }
+
+    def conversation(self, c):
+        rng = self.rng("conversation", c)
+        part = self.base_part(skewed_index(rng, self.parts, self.skew))["part_number"]
+        model = model_name(skewed_index(rng, self.models, self.skew))
+        order = generate_order_id(skewed_index(rng, self.orders, self.skew)) if self.orders else "PSO1000"
+        kind = rng.choices(["part", "compatibility", "model", "order", "policy"], weights=[4, 3, 2, 3, 1])[0]
+        if kind == "part":
+            turns = [(f"How do I install {part}?", "products"),
+                     ("How much does it cost?", "products"),
+                     (f"Is it compatible with my {model}?", "products")]
+        elif kind == "compatibility":
+            turns = [(f"Does {part} fit my {model}?", "products"),
+                     ("How do I install it?", "products")]
+        elif kind == "model":
+            turns = [(f"What parts fit my {model}?", "products"),
+                     (f"My {model} ice maker is not working. How can I fix it?", "products")]
+        elif kind == "order":
+            turns = [(f"What's the status of order {order}?", "transactions_order"),
+                     (f"Can I cancel order {order}?", "transactions_order"),
+                     ("What is your return policy?", "transactions_policy")]
+        else:
+            turns = [("What is your return policy?", "transactions_policy"),
+                     ("How long does shipping take?", "transactions_policy")]
+        turns = turns[:rng.randint(1, len(turns))]
+        return {"name": f"{kind}-{c}", "turns": [{"message": m, "intent": intent} for m, intent in turns]}
+
+
+def write_shard(job):
+    generator, kind, start, stop, path = job
+    make = getattr(generator, kind)
+    with open(path, "w") as f:
+        for i in range(start, stop):
+            f.write(json.dumps(make(i), separators=(",", ":")) + "\n")
+    return stop - start
+
+
+def generate(generator, kind, count, path, workers):
+    """Write `count` records of `kind` to `path`, SHARD_SIZE records per job across `workers` processes."""
+    start = time.perf_counter()
+    jobs = [(generator, kind, lo, min(lo + SHARD_SIZE, count), f"{path}.{n:05d}.part")
+            for n, lo in enumerate(range(0, count, SHARD_SIZE))]
+    if workers > 1 and len(jobs) > 1:
+        with Pool(workers) as pool:
+            for _ in pool.imap_unordered(write_shard, jobs):
+                pass
+    else:
+        for job in jobs:
+            write_shard(job)
+    with open(path, "w") as out:
+        for *_, shard in jobs:
+            with open(shard) as f:
+                shutil.copyfileobj(f, out)
+            os.remove(shard)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {count} {kind} records to {path} in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.0f}/s).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--parts", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--conversations", type=int, default=1_000)
+    parser.add_argument("--models", type=int, default=None, help="distinct appliance models (default parts / 5)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skew", type=float, default=1.0, help="0 = uniform; higher = more traffic on hot parts/models")
+    parser.add_argument("--dup-ratio", type=float, default=0.0, help="share of part records that repeat a part number")
+    parser.add_argument("--as-of", default=None, help="YYYY-MM-DD that order dates count back from (default today)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", default="data/synthetic")
+    args = parser.parse_args()
+
+    as_of = datetime.strptime(args.as_of, "%Y-%m-%d") if args.as_of else None
+    generator = Generator(args.parts, args.orders, seed=args.seed, skew=args.skew,
+                          dup_ratio=args.dup_ratio, models=args.models, as_of=as_of)
+    os.makedirs(args.out, exist_ok=True)
+    generate(generator, "part", args.parts, os.path.join(args.out, "parts.jsonl"), args.workers)
+    generate(generator, "order", args.orders, os.path.join(args.out, "transactions.jsonl"), args.workers)
+    generate(generator, "conversation", args.conversations, os.path.join(args.out, "conversations.jsonl"), args.workers)
+
+
+if __name__ == "__main__":
+    main()
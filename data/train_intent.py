@@ -0,0 +1,329 @@
+"""
+Train and evaluate the local intent classifier (backend/intent_classifier.py), offline.
+
+    python data/train_intent.py                  # train, evaluate, write data/intent_model.npz
+    python data/train_intent.py --write-labels   # regenerate data/intent_labels.jsonl first
+
+The labeled file has one `{"text", "intent", "group"}` record per line. It is generated from
+the templates below, each filled with a few random parts, models, orders and phrasings; the
+templates include the phrasings the keyword router gets wrong ("return to my question",
+"the status light", "change the shipping address on my order"). Records from the same template
+share a `group`, and evaluation holds out whole groups (--holdout of them), so the held-out
+accuracy is measured on phrasings the model has not seen. The status / cancel / return requests
+naming an order ID ("return PSO1001") are always held out and are also scored on their own.
+benchmarks/data/conversations.json is scored as a second, hand-written test set.
+
+For each set it prints the accuracy of the keyword router and of the classifier, then, per
+confidence threshold, the share of turns escalated, the accuracy on the rest, and the accuracy
+if the escalated turns went to the keyword router instead (lower than keeping the classifier's
+guess, which is what the router does when the LLM gives no answer). The classifier's time per
+turn is printed too. With the LLM fallback on, the
+added latency per turn is about classifier time + escalated share x one LLM call (--llm-ms).
+The final model is trained on every record.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import zlib
+
+# allow `python data/train_intent.py` from the repo root to import the backend package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.intent_classifier import INTENT_LABELS_PATH, INTENT_MODEL_PATH, LABELS, IntentClassifier, load_examples
+from backend.utils import route_intent
+
+COMPONENTS = [
+    "ice maker", "door seal gasket", "water filter", "drain pump", "spray arm", "water inlet valve",
+    "defrost heater", "door bin", "thermostat", "dishwasher rack", "upper rack adjuster", "evaporator fan",
+    "control board", "door latch", "crisper drawer", "detergent dispenser", "float switch", "shelf",
+]
+APPLIANCES = ["fridge", "refrigerator", "dishwasher", "freezer"]
+SYMPTOMS = [
+    "is leaking", "won't drain", "is not cooling", "is making a loud noise", "stopped making ice",
+    "won't start", "is not cleaning the dishes", "keeps tripping the breaker", "has frost buildup",
+]
+PREFIXES = ["", "", "", "Hi, ", "Hello! ", "Quick question: ", "hey ", "Sorry, ", "Thanks. "]
+SUFFIXES = ["", "", "", " thanks", " please", "?", " Thank you!", " asap"]
+
+TEMPLATES = {
+    "products": [
+        "How do I install the {component} {part}?",
+        "Does {part} fit my {model}?",
+        "Is {part} compatible with model {model}?",
+        "My {appliance} {symptom}, which part do I need?",
+        "My {appliance} {symptom}. What should I check first?",
+        "I want to return to my question about the {component}",
+        "Going back to the {component}, how long does it take to install?",
+        "Let's return to the {component} issue, is it easy to replace?",
+        "Can we go back to the {component} on my {model}?",
+        "The status light on my {appliance} keeps blinking, what part fixes that?",
+        "What does the blinking status indicator on my {appliance} mean?",
+        "The {appliance} rack slides off the track, which rollers do I need?",
+        "Is there a replacement track for the {appliance} drawer?",
+        "In order to replace the {component}, do I need to remove the door?",
+        "What order should I take the {component} apart in?",
+        "Water keeps returning to the bottom of my {appliance}, what should I check?",
+        "We have hard city water, which {component} works best?",
+        "What's the price of {part}?",
+        "How much does the {component} cost?",
+        "Is {part} in stock?",
+        "Which {component} is compatible with {model}?",
+        "What tools do I need to replace the {component}?",
+        "How do I reset the {appliance} after changing the {component}?",
+        "Pressing cancel on my {appliance} does nothing, what part should I replace?",
+        "The {appliance} won't cancel the cycle, is the {component} bad?",
+        "Where is the model number on my {appliance}?",
+        "Who makes {part}?",
+        "Tell me more about the {component}",
+        "What does the {component} do?",
+        "Is the {component} for {model} an OEM part?",
+        "The water delivery to my ice maker is slow, is it the inlet valve?",
+        "Help me keep track of which {component} fits {model}",
+        "I need to track down a {component} for my {appliance}",
+        "Should I swap the {component} or just clean it?",
+        "Is it better to replace the {component} myself or call a technician?",
+        "How long does the {component} usually last?",
+        "What's the difference between {part} and {part2}?",
+        "Can you recommend a {component} for {model}?",
+        "Is the {component} easy to install?",
+        "What if the {component} still doesn't work after installing it?",
+        "My {model} {symptom}",
+        "Do you have troubleshooting steps for a {appliance} that {symptom}?",
+        "Is there a cheaper alternative to {part}?",
+        "Thanks, and how do I install it?",
+        "Does it come with instructions?",
+        "Does the {component} come with screws?",
+        "Which way does the {component} go in?",
+    ],
+    "transactions_order": [
+        "What's the status of my order {order}?",
+        "Where is my package?",
+        "Where's my {component}? It's been a week since I ordered it",
+        "Has {order} shipped yet?",
+        "Can I cancel {order}?",
+        "Please cancel my order {order}",
+        "I want to return the {component} from order {order}",
+        "Can I get a refund for {order}?",
+        "Track {order}",
+        "When will my {component} arrive?",
+        "Which carrier is delivering {order}?",
+        "What city is {order} going to?",
+        "Is {order} out for delivery yet?",
+        "I received the wrong part in {order}, what now?",
+        "The {component} I ordered arrived damaged",
+        "What items were in {order}?",
+        "When did I place {order}?",
+        "Can you change the shipping address on {order}?",
+        "Has my refund for {order} been processed?",
+        "My package hasn't arrived yet",
+        "It says delivered but I didn't get my {component}",
+        "Can I still cancel it?",
+        "What's the tracking number for my order?",
+        "I'd like to exchange the {component} I bought for a different one",
+        "Is {order} on its way?",
+        "How many items are in my order {order}?",
+        "{order}",
+        "order {order} please",
+        "I placed an order for {part} yesterday, has it shipped?",
+        "Did my {component} ship?",
+        "Who is delivering my package?",
+        "Why hasn't {order} been delivered?",
+        "Please start a return for my last purchase",
+        "I never received my {component}",
+        "Can you check on my purchase {order}?",
+        "I want my money back for {order}",
+        "I bought a {component} last week and want to send it back",
+        "Can I swap the {component} in my order for a different size?",
+        "Exchange the {component} I purchased",
+        "Is it shipped yet?",
+        "When is it going to be delivered?",
+        "Where is my order being shipped to?",
+        "Did you send my order to the right city?",
+        "Send me an update on my order",
+        "My order number is {order}",
+        "The package from {order} is missing an item",
+        "Can you update the delivery address for my order?",
+        "What's the ETA on my {component}?",
+    ],
+    "transactions_policy": [
+        "What is your return policy?",
+        "How long does shipping take?",
+        "Do you offer free shipping?",
+        "How many days do I have to return a part?",
+        "Can I return a part after installing it?",
+        "What's your cancellation policy?",
+        "How long do I have to cancel an order?",
+        "Do you ship to Canada?",
+        "Is there a warranty on your parts?",
+        "How much is shipping for orders under $50?",
+        "Do you ship internationally?",
+        "What are your delivery options?",
+        "Can I get expedited shipping?",
+        "Do I have to pay for return shipping?",
+        "How long do refunds usually take?",
+        "Are returns free?",
+        "What's the minimum order for free shipping?",
+        "Which carriers do you use?",
+        "Do you deliver on weekends?",
+        "Can I return an opened item?",
+        "Is there a restocking fee?",
+        "What happens if a part arrives damaged?",
+        "How fast is standard shipping?",
+        "Can orders be cancelled after they ship?",
+        "Do you refund the original shipping cost?",
+        "What is your policy on exchanges?",
+        "How does the returns process work?",
+        "Do you charge sales tax on shipping?",
+        "Can I pick up my order in store?",
+        "What's the return window for a {component}?",
+        "Can I return a {component} if it doesn't fit?",
+        "Do you price match?",
+        "And the return policy?",
+        "What about your refund policy?",
+        "Tell me about your shipping policy",
+        "Tell me about the policy for cancellations",
+        "How long does delivery usually take?",
+        "Is shipping free over $50?",
+        "What if I change my mind after buying?",
+        "Do you accept returns on electrical parts?",
+        "How do cancellations work?",
+        "How soon do parts ship after I buy them?",
+        "What are the shipping costs?",
+        "Is there a time limit for returns?",
+        "What's the policy on damaged items?",
+        "Do you have a satisfaction guarantee?",
+        "How long is the warranty?",
+        "Can I cancel after placing an order?",
+    ],
+}
+# Status, cancel and return requests that name an order ID. The router sends these to the order
+# branch by rule (backend/intent_classifier.py); they are labeled as transactions_order, always held
+# out and scored as their own set, to show how the classifier alone does on them.
+ORDER_ID_TEMPLATES = [
+    "What is the status of {order}?",
+    "status of {order}",
+    "{order} status",
+    "Check the status on {order}",
+    "Return {order}",
+    "I want to return {order}",
+    "Start a return for {order}",
+    "Cancel {order}",
+    "Can {order} still be cancelled?",
+    "Refund {order}",
+]
+
+def fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        component=rng.choice(COMPONENTS), appliance=rng.choice(APPLIANCES), symptom=rng.choice(SYMPTOMS),
+        part=f"PS{rng.randint(10_000_000, 19_999_999)}", part2=f"PS{rng.randint(10_000_000, 19_999_999)}",
+        model=f"{rng.choice(['WDT', 'WRF', 'FGID', 'GDF', 'KDTM', 'LFX'])}{rng.randint(100, 999)}{rng.choice(['SAEM1', 'PAX', 'SF', 'B'])}",
+        order=f"PSO{rng.randint(1000, 9999)}",
+    )
+
+
+def phrase(text: str, rng: random.Random) -> str:
+    text = rng.choice(PREFIXES) + text + rng.choice(SUFFIXES)
+    roll = rng.random()
+    if roll < 0.15:
+        return text.lower()
+    if roll < 0.2:
+        return text.rstrip("?!.")
+    return text
+
+
+def build_labels(per_template: int = 12, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    records = []
+    for intent, templates in TEMPLATES.items():
+        for t, template in enumerate(templates):
+            texts = {phrase(fill(template, rng), rng) for _ in range(per_template)}
+            records += [{"text": text, "intent": intent, "group": f"{intent}:{t}"} for text in sorted(texts)]
+    for t, template in enumerate(ORDER_ID_TEMPLATES):
+        texts = {phrase(fill(template, rng), rng) for _ in range(per_template)}
+        records += [{"text": text, "intent": "transactions_order", "group": f"order_id:{t}"} for text in sorted(texts)]
+    return records
+
+
+def split(records, holdout: float):
+    """Whole template groups go to the test side, chosen by a stable hash of the group name."""
+    held = lambda r: r["group"].startswith("order_id:") or zlib.crc32(r["group"].encode()) % 1000 < holdout * 1000
+    return [r for r in records if not held(r)], [r for r in records if held(r)]
+
+
+def conversation_set(path="benchmarks/data/conversations.json"):
+    with open(path) as f:
+        return [{"text": t["message"], "intent": t["intent"]} for c in json.load(f) for t in c["turns"]]
+
+
+def evaluate(name, classifier, records, thresholds, llm_ms):
+    if not records:
+        return
+    start = time.perf_counter()
+    predictions = [classifier.predict(r["text"]) for r in records]
+    per_turn = (time.perf_counter() - start) / len(records)
+    keywords = [route_intent(r["text"]) for r in records]
+    truth = [r["intent"] for r in records]
+    accuracy = lambda guesses: sum(g == t for g, t in zip(guesses, truth)) / len(truth)
+    print(f"\n{name}: {len(records)} turns")
+    print(f"  keyword router  accuracy {accuracy(keywords):6.1%}")
+    print(f"  classifier      accuracy {accuracy([p for p, _ in predictions]):6.1%}   {per_turn * 1e6:.0f} us/turn")
+    for label in LABELS:
+        rows = [i for i, t in enumerate(truth) if t == label]
+        if rows:
+            ok = lambda guesses: sum(guesses[i] == label for i in rows) / len(rows)
+            print(f"    {label:<20} n={len(rows):<4} keywords {ok(keywords):6.1%}  classifier {ok([p for p, _ in predictions]):6.1%}")
+    print(f"  {'threshold':>9} {'escalated':>9} {'acc. confident':>14} {'acc. w/ keyword fallback':>24} {'added ms/turn':>13}")
+    for threshold in thresholds:
+        confident = [i for i, (_, c) in enumerate(predictions) if c >= threshold]
+        escalated = 1 - len(confident) / len(records)
+        confident_acc = sum(predictions[i][0] == truth[i] for i in confident) / len(confident) if confident else float("nan")
+        combined = [p if c >= threshold else k for (p, c), k in zip(predictions, keywords)]
+        added = per_turn * 1000 + escalated * llm_ms
+        print(f"  {threshold:>9.2f} {escalated:>9.1%} {confident_acc:>14.1%} {accuracy(combined):>24.1%} {added:>13.1f}")
+    # One example per template (or per message, for sets without groups)
+    mistakes = {}
+    for r, (p, c) in zip(records, predictions):
+        if p != r["intent"]:
+            mistakes.setdefault(r.get("group", r["text"]), (r["text"], r["intent"], p, c))
+    for text, intent, predicted, confidence in list(mistakes.values())[:10]:
+        print(f"    miss: {text!r} is {intent}, predicted {predicted} ({confidence:.2f})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labels", default=INTENT_LABELS_PATH)
+    parser.add_argument("--model", default=INTENT_MODEL_PATH)
+    parser.add_argument("--write-labels", action="store_true", help="regenerate --labels from the templates")
+    parser.add_argument("--per-template", type=int, default=12)
+    parser.add_argument("--holdout", type=float, default=0.25, help="share of template groups held out")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.6, 0.7, 0.8, 0.9])
+    parser.add_argument("--llm-ms", type=float, default=600, help="latency of one LLM fallback call")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.write_labels:
+        records = build_labels(args.per_template, args.seed)
+        with open(args.labels, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        print(f"wrote {len(records)} labeled turns to {args.labels}")
+    records = load_examples(args.labels)
+
+    train, test = split(records, args.holdout)
+    start = time.perf_counter()
+    classifier = IntentClassifier.train(train, seed=args.seed)
+    print(f"trained on {len(train)} turns ({len({r['group'] for r in train})} templates) in {time.perf_counter() - start:.2f}s")
+    evaluate("held-out templates", classifier, test, args.thresholds, args.llm_ms)
+    evaluate("held-out order-ID requests", classifier, [r for r in test if r["group"].startswith("order_id:")],
+             args.thresholds, args.llm_ms)
+    evaluate("benchmarks/data/conversations.json", classifier, conversation_set(), args.thresholds, args.llm_ms)
+
+    final = IntentClassifier.train(records, seed=args.seed)
+    final.save(args.model)
+    print(f"\nsaved a model trained on all {len(records)} turns to {args.model}")
+
+
+if __name__ == "__main__":
+    main()
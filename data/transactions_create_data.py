@@ -2,29 +2,30 @@ import json
 import random
 from datetime import datetime, timedelta
 
-def random_date_within_last_year():
-    days_ago = random.randint(0, 364)
-    date = datetime.now() - timedelta(days=days_ago)
+# The helpers take an optional `rng` (a random.Random) so data/synth_data.py can seed them per shard
+def random_date_within_last_year(rng=random, today=None):
+    days_ago = rng.randint(0, 364)
+    date = (today or datetime.now()) - timedelta(days=days_ago)
     return date.strftime("%Y-%m-%d")
 
 def generate_order_id(i):
     return f"PSO{1000 + i}"
 
-def generate_customer_id():
-    return str(random.randint(10000, 99999))
+def generate_customer_id(rng=random):
+    return str(rng.randint(10000, 99999))
 
-def generate_status():
-    return random.choice(["order_placed", "shipped", "out for delivery"])
+def generate_status(rng=random):
+    return rng.choice(["order_placed", "shipped", "out for delivery"])
 
-def generate_carrier():
-    return random.choice(["UPS", "Delivery"])
+def generate_carrier(rng=random):
+    return rng.choice(["UPS", "Delivery"])
 
-def generate_city():
+def generate_city(rng=random):
     cities = [
         "New York", "Los Angeles", "Chicago", "Houston", "Phoenix", "Philadelphia",
         "San Antonio", "San Diego", "Dallas", "San Jose", "Austin", "Jacksonville"
     ]
-    return random.choice(cities)
+    return rng.choice(cities)
 
 def generate_items(parts, max_items=3):
     num_items = random.randint(1, max_items)
@@ -61,15 +61,30 @@ const ChatInterface: React.FC = () => {
         setLoading(true);
         setError(null);
 
+        // Bot bubble that fills in as tokens stream from the backend
+        const llm_response: ChatMessage = {
+            id: (Date.now() + 1).toString(),
+            message: "",
+            sender: "bot",
+            timestamp: new Date(),
+        };
+        let streaming = false;
+
         try {
-            const response = await chatApi.sendMessage(text, updatedChats[activeChatIdx].session_id);
-            const llm_response: ChatMessage = {
-                id: Date.now().toString(),
-                message: response.answer,
-                sender: "bot",
-                timestamp: new Date(),
-            };
-            updatedChats[activeChatIdx].messages.push(llm_response);
+            const response = await chatApi.streamMessage(text, updatedChats[activeChatIdx].session_id, {
+                onToken: (token: string) => {
+                    if (!streaming) {
+                        streaming = true;
+                        updatedChats[activeChatIdx].messages.push(llm_response);
+                    }
+                    llm_response.message += token;
+                    setChats([...updatedChats]);
+                },
+            });
+            llm_response.message = response.answer;
+            if (!streaming) {
+                updatedChats[activeChatIdx].messages.push(llm_response);
+            }
 
             // If there is a new session_id returned, then update the updatedchats
             if (!updatedChats[activeChatIdx].session_id && response.session_id) {
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import type {ChatRequest, api_response, ErrorResponse} from '../types/chats' 
+import type {ChatRequest, api_response, ErrorResponse, StreamEventName, StreamHandlers} from '../types/chats' 
 // When "verbatimModuleSyntax": true, TS will refuse to erase an import you wrote as a normal 
 // import if that imported symbol is never used as a value, because it has 
 // to preserve module syntax exactly as you wrote it. Since marked import type, the compiler knows it can completely drop that statement in the emitted JS, avoiding any runtime “undefined” errors 
@@ -41,5 +41,57 @@ export const chatApi = {
         } catch (error:any) {
             throw new Error(error.message || 'Failed to send message');
         }
+    },
+
+    /*
+    Streaming version of sendMessage. Reads the Server-Sent Events from /chat/stream and calls the
+    handlers as tokens arrive; resolves with the same shape as sendMessage once the `final` event lands.
+    axios can't read a response body incrementally in the browser, so this one uses fetch.
+    */
+    streamMessage: async (message:string, session_id: string | null | undefined, handlers: StreamHandlers = {}): Promise<api_response> => {
+        const request: ChatRequest = {message, session_id}
+        const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(request),
+        });
+        if (!response.ok || !response.body) {
+            throw new Error(`Failed to send message (${response.status})`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const {value, done} = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, {stream: true});
+
+            // SSE frames are separated by a blank line
+            let boundary = buffer.indexOf('\n\n');
+            while (boundary !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                boundary = buffer.indexOf('\n\n');
+
+                let event: StreamEventName | null = null;
+                let data = '';
+                for (const line of frame.split('\n')) {
+                    if (line.startsWith('event: ')) event = line.slice(7) as StreamEventName;
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                }
+                if (!event) continue;
+                const payload = JSON.parse(data || '{}');
+
+                if (event === 'condensed') handlers.onCondensed?.(payload.question);
+                else if (event === 'retrieval') handlers.onRetrieval?.(payload.documents);
+                else if (event === 'token') handlers.onToken?.(payload.text);
+                else if (event === 'error') throw new Error(payload.answer || 'Failed to send message');
+                else if (event === 'final') {
+                    return {answer: payload.answer, session_id: payload.session_id, source_doc: []};
+                }
+            }
+        }
+        throw new Error('Stream ended before the answer was complete');
     }
-};
\ No newline at end of file
+};
@@ -21,6 +21,15 @@ export interface ChatRequest {
     session_id?: string | null; // optional, if not provided, a new chat session will be created
 }
 
+// Events sent by POST /chat/stream (Server-Sent Events). `final` always closes a turn.
+export type StreamEventName = 'condensed' | 'retrieval' | 'token' | 'final' | 'error';
+
+export interface StreamHandlers {
+    onCondensed?: (question: string) => void;
+    onRetrieval?: (documents: number) => void;
+    onToken?: (text: string) => void;
+}
+
 export interface ErrorResponse {
     "internal server error" ?: string;
     error?: string;